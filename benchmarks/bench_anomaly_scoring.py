@@ -0,0 +1,51 @@
+"""
+異常検知のベンチマーク
+1フレーム分（トラック数 n）の判定を, トラックごとのスカラー版・打ち切り版と配列版で比較する
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_anomaly_scoring --tracks 10 100 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.anomaly_detectors import (detect_combined_anomalies, detect_combined_anomalies_fast,
+                                   detect_combined_anomalies_batch)
+
+
+def make_frame(rng, num_tracks):
+    x1 = rng.uniform(0, 1800, num_tracks)
+    y1 = rng.uniform(0, 1000, num_tracks)
+    current = np.stack([x1, y1, x1 + rng.uniform(20, 120, num_tracks), y1 + rng.uniform(20, 120, num_tracks)], axis=1)
+    previous = current + rng.normal(0, 1.5, current.shape)
+    predicted = current + rng.normal(0, 1.5, current.shape)
+    return current, previous, predicted
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for num_tracks in args.tracks:
+        current, previous, predicted = make_frame(rng, num_tracks)
+        rows = list(zip(current.tolist(), previous.tolist(), predicted.tolist()))
+
+        scalar_time, scalar = measure(lambda: [detect_combined_anomalies(c, p, q)[0] for c, p, q in rows], args.repeat)
+        fast_time, fast = measure(lambda: [detect_combined_anomalies_fast(c, p, q) for c, p, q in rows], args.repeat)
+        batch_time, (batch, _) = measure(lambda: detect_combined_anomalies_batch(current, previous, predicted),
+                                         args.repeat)
+        same = scalar == fast == batch.tolist()
+        print(f"トラック数 {num_tracks:5d}: スカラー {scalar_time * 1e3:.3f} ms, 打ち切り {fast_time * 1e3:.3f} ms, "
+              f"配列 {batch_time * 1e3:.3f} ms, 判定一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+バッチ推論のベンチマーク（CPU）
+逐次処理 (perform_yolo) とバッチ処理 (perform_yolo_batch) のフレーム/秒を比較し,
+トラックIDと座標が逐次処理と一致するかも確認する
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_batch_inference --video videos/street1_sample_01.mp4 --model models/yolov8x.pt
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.load_video import load_video
+from src.yolo_handler import load_yolo_model, perform_yolo, perform_yolo_batch, create_tracker
+
+
+def read_frames(video_path, num_frames):
+    cap = load_video(video_path)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def same_detections(expected, actual, atol=1.0):
+    for a, b in zip(expected, actual):
+        if [int(t) for t, _ in a] != [t for t, _ in b]:
+            return False
+        if a and not np.allclose([bbox for _, bbox in a], [bbox for _, bbox in b], atol=atol):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="models/yolov8x.pt")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--classes", type=int, nargs="*", default=[2])
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    print(f"フレーム数: {len(frames)}, 解像度: {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    # 逐次処理（基準）
+    model = load_yolo_model(args.model)
+    model.to("cpu")
+    perform_yolo(frames[0], model, args.classes)    # ウォームアップ
+    model = load_yolo_model(args.model)             # トラッカーの状態をリセット
+    model.to("cpu")
+    start = time.perf_counter()
+    sequential = [perform_yolo(frame, model, args.classes) for frame in frames]
+    elapsed = time.perf_counter() - start
+    print(f"{'mode':>12} {'batch':>6} {'fps':>8} {'same':>6}")
+    print(f"{'sequential':>12} {1:>6} {len(frames) / elapsed:8.2f} {'-':>6}")
+
+    for batch_size in args.batch_sizes:
+        model = load_yolo_model(args.model)
+        model.to("cpu")
+        perform_yolo_batch(frames[:batch_size], model, create_tracker(model=model), args.classes)  # ウォームアップ
+        tracker = create_tracker(model=model)
+        start = time.perf_counter()
+        batched = []
+        for i in range(0, len(frames), batch_size):
+            batched.extend(perform_yolo_batch(frames[i:i + batch_size], model, tracker, args.classes))
+        elapsed = time.perf_counter() - start
+        same = same_detections(sequential, batched)
+        print(f"{'batched':>12} {batch_size:>6} {len(frames) / elapsed:8.2f} {str(same):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+フレームの間引き方のベンチマーク
+従来の process_frame（int(元FPS // 目標FPS) ごとに grab()）と FrameSource の "grab" / "seek" / "auto" で,
+動画を最後まで読んだときの時間と取り出したフレーム数/秒を比較する
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_frame_source --video videos/minokamo_08_hide2.mp4 --target-fps 10 2 0.5
+"""
+import argparse
+import time
+
+from src.frame_source import FrameSource
+from src.get_fps import calculate_frame_skip_interval
+from src.load_video import load_video
+from src.yolo_handler import process_frame
+
+
+def measure(video_path, target_fps, mode, max_frames):
+    cap = load_video(video_path)
+    original_fps = cap.get(5)   # cv2.CAP_PROP_FPS
+    if mode == "legacy":
+        source, interval = cap, max(calculate_frame_skip_interval(original_fps, target_fps), 1)
+    else:
+        source, interval = FrameSource(cap, original_fps, target_fps, mode), 1
+    kept = 0
+    start = time.perf_counter()
+    while kept < max_frames:
+        ret, _ = process_frame(source, interval)
+        if not ret:
+            break
+        kept += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return kept, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--target-fps", type=float, nargs="+", default=[10, 2, 0.5])
+    parser.add_argument("--modes", nargs="+", default=["legacy", "grab", "seek", "auto"])
+    parser.add_argument("--max-frames", type=int, default=10 ** 9)
+    args = parser.parse_args()
+
+    for target_fps in args.target_fps:
+        print(f"--- 目標 FPS: {target_fps} ---")
+        for mode in args.modes:
+            kept, elapsed = measure(args.video, target_fps, mode, args.max_frames)
+            print(f"{mode:7s}: {kept:6d} フレーム, {elapsed:7.2f} 秒, {kept / elapsed:8.1f} フレーム/秒")
+
+
+if __name__ == "__main__":
+    main()
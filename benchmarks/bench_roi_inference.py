@@ -0,0 +1,99 @@
+"""
+ROI・推論解像度のベンチマーク
+フレーム全体・既定解像度での検出を基準に, ROI の切り出しや推論解像度の変更による
+1フレームあたりの処理時間と検出結果の一致率（IoU 0.5 以上で対応づけた再現率・適合率）を比較する
+（ROI を指定したときは, 基準の検出のうち中心が ROI の内側にあるものだけと比べる）
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_roi_inference --video videos/minokamo_08_hide2.mp4 --roi 0 400 1920 1080 --imgsz 1280 640 320
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.load_video import load_video
+from src.prediction_evaluator import calculate_iou_batch
+from src.roi import make_roi
+from src.yolo_handler import load_yolo_model, perform_yolo
+
+
+def read_frames(video_path, num_frames, step):
+    cap = load_video(video_path)
+    frames = []
+    index = 0
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % step == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+def run(frames, model_path, classes, roi, imgsz):
+    model = load_yolo_model(model_path)     # トラッカーの状態を共有しないように毎回読み込む
+    perform_yolo(frames[0], model, classes, roi=roi, imgsz=imgsz)     # ウォームアップ
+    model = load_yolo_model(model_path)
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        results.append([bbox for _, bbox in perform_yolo(frame, model, classes, roi=roi, imgsz=imgsz)])
+    return results, (time.perf_counter() - start) / len(frames)
+
+def match_counts(expected, actual, iou_threshold=0.5):
+    """貪欲に IoU の大きい順に対応づけ, 対応した数を返す"""
+    if not expected or not actual:
+        return 0
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    pairs = [(i, j) for i in range(len(expected)) for j in range(len(actual))]
+    ious = calculate_iou_batch(expected[[i for i, _ in pairs]], actual[[j for _, j in pairs]])
+    used_expected, used_actual = set(), set()
+    for k in np.argsort(-ious):
+        i, j = pairs[k]
+        if ious[k] < iou_threshold:
+            break
+        if i not in used_expected and j not in used_actual:
+            used_expected.add(i)
+            used_actual.add(j)
+    return len(used_expected)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="models/yolov8x.pt")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--step", type=int, default=3)
+    parser.add_argument("--classes", type=int, nargs="*", default=[2])
+    parser.add_argument("--roi", type=float, nargs=4, default=None, metavar=("X1", "Y1", "X2", "Y2"))
+    parser.add_argument("--imgsz", type=int, nargs="*", default=[1280, 640, 320])
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.step)
+    print(f"フレーム数: {len(frames)}, 解像度: {frames[0].shape[1]}x{frames[0].shape[0]}")
+    baseline, baseline_time = run(frames, args.model, args.classes, None, None)
+    print(f"{'フレーム全体':16s}: {baseline_time * 1e3:8.1f} ms/frame（基準）")
+
+    configs = [(None, imgsz) for imgsz in args.imgsz]
+    if args.roi is not None:
+        configs += [(args.roi, None)] + [(args.roi, imgsz) for imgsz in args.imgsz]
+    for roi_spec, imgsz in configs:
+        roi = make_roi(roi_spec)
+        results, elapsed = run(frames, args.model, args.classes, roi, imgsz)
+        matched = expected_total = actual_total = 0
+        for expected, actual in zip(baseline, results):
+            if roi is not None and expected:
+                expected = [bbox for bbox, inside in zip(expected, roi.contains(expected)) if inside]
+            matched += match_counts(expected, actual)
+            expected_total += len(expected)
+            actual_total += len(actual)
+        recall = matched / expected_total if expected_total else 1.0
+        precision = matched / actual_total if actual_total else 1.0
+        label = f"{'ROI' if roi is not None else '全体'} imgsz={imgsz or '既定'}"
+        print(f"{label:16s}: {elapsed * 1e3:8.1f} ms/frame ({baseline_time / elapsed:4.2f}x), "
+              f"再現率 {recall:.3f}, 適合率 {precision:.3f}")
+
+
+if __name__ == "__main__":
+    main()
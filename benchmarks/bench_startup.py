@@ -0,0 +1,65 @@
+"""
+起動時間のベンチマーク
+毎回新しいプロセスで src.main の import 時間と, モデル読み込みから最初の検出までの時間を計測する
+（ウォームアップあり/なしで最初の検出にかかる時間を比較）
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_startup --video videos/street1_sample_01.mp4 --model models/yolov8x.pt
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_CODE = """
+import json, time
+start = time.perf_counter()
+import src.main
+print(json.dumps({"import": time.perf_counter() - start}))
+"""
+
+FIRST_DETECTION_CODE = """
+import json, time
+start = time.perf_counter()
+from src.load_video import load_video
+from src.yolo_handler import get_yolo_model, warm_up_model, perform_yolo
+imported = time.perf_counter()
+model = get_yolo_model({model!r})
+loaded = time.perf_counter()
+cap = load_video({video!r})
+ret, frame = cap.read()
+cap.release()
+warm_up = warm_up_model(model, frame.shape[1], frame.shape[0], [2]) if {warm_up!r} else 0.0
+ready = time.perf_counter()
+perform_yolo(frame, model, [2])
+done = time.perf_counter()
+print(json.dumps({{"import": imported - start, "load_model": loaded - imported, "warm_up": warm_up,
+                  "first_detection": done - ready, "time_to_first_detection": done - start}}))
+"""
+
+
+def run(code):
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def report(label, results):
+    print(label)
+    for key in results[0]:
+        values = [result[key] for result in results]
+        print(f"  {key:24s}: 中央値 {statistics.median(values) * 1e3:9.1f} ms  (最小 {min(values) * 1e3:.1f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="models/yolov8x.pt")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    report("import src.main", [run(IMPORT_CODE) for _ in range(args.repeat)])
+    for warm_up in (False, True):
+        code = FIRST_DETECTION_CODE.format(model=args.model, video=args.video, warm_up=warm_up)
+        report(f"最初の検出まで（ウォームアップ{'あり' if warm_up else 'なし'}）", [run(code) for _ in range(args.repeat)])
+
+
+if __name__ == "__main__":
+    main()
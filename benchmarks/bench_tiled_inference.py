@@ -0,0 +1,62 @@
+"""
+タイル分割の検出のベンチマーク
+フレーム全体を拡大して推論した検出（imgsz を大きくする）を基準に, 既定解像度の全体推論とタイル分割の推論の
+1フレームあたりの処理時間と検出結果の一致率（IoU 0.5 以上で対応づけた再現率）を比較する
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_tiled_inference --video videos/minokamo_08_hide2.mp4 --upscale 1920 --tile-size 640
+"""
+import argparse
+import time
+
+from benchmarks.bench_roi_inference import read_frames, match_counts
+from src.yolo_handler import load_yolo_model, detect_tiled
+
+
+def detect_full(frame, model, classes, conf, imgsz):
+    result = model.predict(frame, conf=conf, classes=classes, verbose=False, **({"imgsz": imgsz} if imgsz else {}))[0]
+    return result.boxes.xyxy.cpu().numpy().tolist()
+
+def run(frames, detect):
+    detect(frames[0])   # ウォームアップ
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        results.append(detect(frame))
+    return results, (time.perf_counter() - start) / len(frames)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="models/yolov8x.pt")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--step", type=int, default=3)
+    parser.add_argument("--classes", type=int, nargs="*", default=[2])
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--upscale", type=int, default=1920, help="基準の全体推論の入力解像度")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.step)
+    model = load_yolo_model(args.model)
+    print(f"フレーム数: {len(frames)}, 解像度: {frames[0].shape[1]}x{frames[0].shape[0]}")
+    baseline, baseline_time = run(frames, lambda f: detect_full(f, model, args.classes, args.conf, args.upscale))
+    print(f"{f'全体 imgsz={args.upscale}':20s}: {baseline_time * 1e3:8.1f} ms/frame（基準）")
+
+    configs = {
+        "全体 imgsz=既定": lambda f: detect_full(f, model, args.classes, args.conf, None),
+        f"タイル {args.tile_size}": lambda f: detect_tiled(f, model, args.classes, args.conf, args.tile_size,
+                                                           args.overlap)[0].tolist(),
+    }
+    for label, detect in configs.items():
+        results, elapsed = run(frames, detect)
+        matched = sum(match_counts(expected, actual) for expected, actual in zip(baseline, results))
+        expected_total = sum(len(expected) for expected in baseline)
+        recall = matched / expected_total if expected_total else 1.0
+        detections = sum(len(actual) for actual in results)
+        print(f"{label:20s}: {elapsed * 1e3:8.1f} ms/frame ({baseline_time / elapsed:4.2f}x), "
+              f"再現率 {recall:.3f}, 検出数 {detections}")
+
+
+if __name__ == "__main__":
+    main()
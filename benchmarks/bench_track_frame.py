@@ -0,0 +1,88 @@
+"""
+1フレーム分の追跡処理のベンチマーク
+トラック数 n の合成データで, 以前の処理（トラックごとのループの中で handle_replace を呼び, 履歴に重複して追加する）と
+現在の track_frame（異常判定の後に1トラック1つだけ追加する）の1フレームあたりの時間と履歴の長さを比較する
+実行例（リポジトリのルートで）:
+    python -m benchmarks.bench_track_frame --tracks 10 100 --frames 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+import src.anomaly_handler as anomaly
+from src.anomaly_detectors import detect_combined_anomalies_fast
+from src.histogram_generator import update_metrics
+from src.prediction import predict_tracks
+from src.tracking import new_tracking_state, track_frame
+from src.yolo_handler import update_tracked_data
+
+
+def make_detections(rng, num_tracks, num_frames):
+    """等速で動くボックスに ±1 画素のノイズを加えた検出値（フレームごとのリスト）"""
+    start = rng.uniform(0, 1500, (num_tracks, 2))
+    velocity = rng.uniform(-5, 5, (num_tracks, 2))
+    size = rng.uniform(40, 120, (num_tracks, 2))
+    frames = []
+    for frame_number in range(1, num_frames + 1):
+        top_left = start + velocity * frame_number + rng.normal(0, 1, (num_tracks, 2))
+        bboxes = np.hstack([top_left, top_left + size]).tolist()
+        frames.append(list(enumerate(bboxes)))
+    return frames
+
+def legacy_process_detections(detections, tracked_data, predict_bbox):
+    """以前の yolo_handler.process_detections（検出結果を履歴に追加してから全トラックを予測する）"""
+    detection_dict = {track_id: bbox for track_id, bbox in detections}
+    update_tracked_data(tracked_data, detections)
+    track_ids = tracked_data.keys()
+    if hasattr(predict_bbox, "observe"):
+        predict_bbox.observe(detection_dict, track_ids)
+    predictions = predict_tracks(tracked_data, predict_bbox, list(track_ids))
+    return detection_dict, predictions
+
+def legacy_track_frame(frame_number, detections, state):
+    """以前の track_frame（handle_replace がトラックごとのループの中にある）"""
+    params = state["params"]
+    tracked_data = state["tracked_data"]
+    detection_dict, predictions = legacy_process_detections(detections, tracked_data, state["predict_bbox"])
+    anomalies = {}
+    for track_id in list(tracked_data.keys()):
+        current_bbox = detection_dict.get(track_id)
+        predicted_bbox = predictions.get(track_id)
+        previous_bbox = tracked_data[track_id][-2] if len(tracked_data[track_id]) > 1 else None
+        if current_bbox and predicted_bbox:
+            update_metrics(state["metrics"], track_id, current_bbox, predicted_bbox, previous_bbox,
+                           params["metric_ids"])
+            anomalies[track_id] = detect_combined_anomalies_fast(current_bbox, previous_bbox, predicted_bbox)
+        anomaly.handle_replace(detection_dict, predictions, anomalies, tracked_data)
+    return detection_dict, predictions
+
+def run(frames, function, method):
+    state = new_tracking_state({"prediction_method": method, "track_history_size": len(frames), "verbose": False,
+                                "metric_ids": []})
+    start = time.perf_counter()
+    for frame_number, detections in enumerate(frames, start=1):
+        function(frame_number, detections, state)
+    elapsed = (time.perf_counter() - start) / len(frames)
+    totals = [history.total for _, history in state["tracked_data"].items()]
+    return elapsed, max(totals)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--method", default="linear")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for num_tracks in args.tracks:
+        frames = make_detections(rng, num_tracks, args.frames)
+        legacy_time, legacy_length = run(frames, legacy_track_frame, args.method)
+        current_time, current_length = run(frames, track_frame, args.method)
+        print(f"トラック数 {num_tracks:4d}: 以前 {legacy_time * 1e3:8.2f} ms/frame（履歴 {legacy_length} 件）, "
+              f"現在 {current_time * 1e3:6.2f} ms/frame（履歴 {current_length} 件）, "
+              f"{legacy_time / current_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
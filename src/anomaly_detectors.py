@@ -1,3 +1,5 @@
+import numpy as np
+
 import src.prediction_evaluator as evaluator
 
 """　0に近いほど検出結果と予測値（あるいは過去値）は異なる　"""
@@ -53,6 +55,33 @@ def detect_combined_anomalies(current_bbox, previous_bbox, predicted_bbox, iou_t
     is_anomaly = anomaly_count >= 2     # Trueが２以上かどうか
     return is_anomaly, anomalies
 
+def detect_combined_anomalies_fast(current_bbox, previous_bbox, predicted_bbox, iou_threshold=0.98, area_threshold=0.98, ratio_threshold=0.98):
+    """
+    detect_combined_anomalies と同じ判定を, 計算の軽い順（面積比 → 縦横比 → IoU）に行い
+    2/3 の多数決が決まった時点で打ち切る（判定結果のみ返す）
+    """
+    if not current_bbox or not previous_bbox:
+        return False    # 面積比・縦横比は判定できないので2票にならない
+    votes = (detect_area_anomaly(current_bbox, previous_bbox, area_threshold)
+             + detect_aspect_ratio_anomaly(current_bbox, previous_bbox, ratio_threshold))
+    if votes != 1:
+        return votes == 2
+    return detect_iou_anomaly(current_bbox, predicted_bbox, iou_threshold)
+
+def detect_combined_anomalies_batch(current_bboxes, previous_bboxes, predicted_bboxes, iou_threshold=0.98, area_threshold=0.98, ratio_threshold=0.98):
+    """
+    複数トラックの異常検知をまとめて行う
+    :param current_bboxes, previous_bboxes, predicted_bboxes: (n, 4) の配列（前回値がない行は NaN）
+    :return: (異常かどうかの (n,) bool 配列, {"iou": (n,), "area": (n,), "aspect": (n,)})
+    """
+    iou = evaluator.calculate_iou_batch(current_bboxes, predicted_bboxes)
+    area = evaluator.calculate_area_ratio_batch(current_bboxes, previous_bboxes)
+    aspect = evaluator.calculate_aspect_ratio_batch(current_bboxes, previous_bboxes)
+    # NaN（前回値なし）との比較は False になるので, スカラー版と同じく異常なしとして数えられる
+    with np.errstate(invalid="ignore"):
+        votes = (iou < iou_threshold).astype(int) + (area < area_threshold) + (aspect < ratio_threshold)
+    return votes >= 2, {"iou": iou, "area": area, "aspect": aspect}
+
 if __name__ == "__main__":
     current_bbox = [10, 10, 50, 50]
     predicted_bbox = [15, 15, 55, 55]
@@ -1,8 +1,15 @@
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
+import numpy as np
 
 from src.yolo_handler import update_tracked_data
 
+logger = logging.getLogger(__name__)
+
 
 def save_anomaly_frame(frame, frame_number, track_id, output_folder):
     """異常検知フレームを画像データとして保存"""
@@ -11,6 +18,105 @@ def save_anomaly_frame(frame, frame_number, track_id, output_folder):
     filename = os.path.join(output_folder, f"frame_{frame_number}_track_{track_id}.jpg")
     cv2.imwrite(filename, frame)
 
+def crop_around(frame, bboxes, padding=0.5):
+    """
+    複数のバウンディングボックスを囲む矩形を padding（幅・高さに対する割合）だけ広げて切り出す
+    :return: (切り出した画像（コピー）, 切り出した矩形の左上 (x, y))
+    """
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    x1, y1 = bboxes[:, :2].min(axis=0)
+    x2, y2 = bboxes[:, 2:].max(axis=0)
+    pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+    height, width = frame.shape[:2]
+    x1, y1 = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+    x2, y2 = min(int(np.ceil(x2 + pad_x)), width), min(int(np.ceil(y2 + pad_y)), height)
+    return frame[y1:y2, x1:x2].copy(), (x1, y1)
+
+
+class AnomalySnapshotWriter:
+    """
+    異常検知フレームの画像をワーカースレッドで JPEG に変換して保存する
+    同じトラックは min_interval フレームに1枚まで（長く続く異常でほぼ同じ画像を大量に保存しないため）
+    :param crop: True なら検出値と予測値の周りだけを切り出して保存（False ならフレーム全体）
+    :param padding: 切り出すときの余白（ボックスの幅・高さに対する割合）
+    :param jpeg_quality: JPEG の品質（0~100）
+    :param max_pending: 書き込み待ちの上限（超えた分は保存せずに捨てる）
+    保存する画像には検出値（緑）と予測値（青）の枠を描く
+    """
+
+    def __init__(self, output_folder, crop=False, padding=0.5, jpeg_quality=90, min_interval=10, workers=2,
+                 max_pending=64):
+        os.makedirs(output_folder, exist_ok=True)
+        self.output_folder = output_folder
+        self.crop = crop
+        self.padding = padding
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.saved = 0
+        self.skipped = 0            # min_interval 以内なので保存しなかった数
+        self.dropped = 0            # 書き込みが追いつかず捨てた数
+        self.errors = 0             # 変換・書き込みに失敗した数（ログに出して処理は続ける）
+        self._last_saved = {}       # track_id -> 最後に保存したフレーム番号
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="anomaly_snapshot")
+
+    def submit(self, frame, frame_number, track_id, current_bbox, predicted_bbox):
+        """
+        1トラック分の異常を保存する（画像のコピーまでを呼び出し元で行い, 描画・変換・書き込みはワーカーで行う）
+        :return: 保存を予約したら True
+        """
+        last = self._last_saved.get(track_id)
+        if last is not None and frame_number - last < self.min_interval:
+            self.skipped += 1
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self._last_saved[track_id] = frame_number
+        bboxes = [current_bbox, predicted_bbox]
+        if self.crop:
+            image, (x, y) = crop_around(frame, bboxes, self.padding)
+            bboxes = np.asarray(bboxes, dtype=float) - [x, y, x, y]
+        else:
+            image = frame.copy()
+        filename = os.path.join(self.output_folder, f"frame_{frame_number}_track_{track_id}.jpg")
+        self._executor.submit(self._write, image, bboxes, filename)
+        return True
+
+    def close(self):
+        """
+        残りの画像を書き込んで終了
+        保存に失敗した画像があっても例外は送出しない（数は stats() の errors）
+        """
+        self._executor.shutdown(wait=True)
+        return self.stats()
+
+    def stats(self):
+        return {"saved": self.saved, "skipped": self.skipped, "dropped": self.dropped, "errors": self.errors}
+
+    def _write(self, image, bboxes, filename):
+        try:
+            for (x1, y1, x2, y2), color in zip(bboxes, [(0, 255, 0), (255, 0, 0)]):
+                cv2.rectangle(image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+            ok, encoded = cv2.imencode(".jpg", image, self.params)
+            if not ok:
+                raise IOError(f"JPEG に変換できません: {filename}")
+            encoded.tofile(filename)
+            with self._lock:
+                self.saved += 1
+        except Exception as e:     # 1枚の失敗で動画全体の結果を失わないようにする
+            logger.warning("異常検知フレームを保存できません: %s: %r", filename, e)
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
 def log_anomaly_info(frame_number, track_id, current_bbox, predicted_bbox, anomalies):
     """異常検知結果をターミナルに出力"""
     print(f"\n[Frame {frame_number}] Track ID: {track_id}")
@@ -27,7 +133,7 @@ def replace_with_prediction(detections, predictions, anomalies):
         if anomalies.get(track_id, False):  # 異常と判定された場合
             updated_bbox = predictions.get(track_id, bbox)  # 予測値があれば置き換える
             updated_detections.append((track_id, updated_bbox))
-            print(f"異常検出： {track_id}: {updated_bbox}")  # debug
+            logger.debug("異常検出： %s: %s", track_id, updated_bbox)
         else:
             updated_detections.append((track_id, bbox))  # 異常がない場合はそのまま
             # print(f"異常なし: {track_id}")              # debug
@@ -35,7 +141,7 @@ def replace_with_prediction(detections, predictions, anomalies):
     for track_id, predicted_bbox in predictions.items():
         if track_id not in detections and predicted_bbox is not None:
             updated_detections.append((track_id, predicted_bbox))
-            print(f"未検出車両： {track_id}: {predicted_bbox}")           # debug
+            logger.debug("未検出車両： %s: %s", track_id, predicted_bbox)
     return updated_detections
 
 def handle_replace(detections, predictions, anomalies, tracked_data):
@@ -0,0 +1,115 @@
+"""
+フォルダ内の動画をプロセスプールでまとめて処理する
+各ワーカーは YOLO モデルを1回だけロードし, 割り当てられた動画を順に処理する
+ワーカーごとにモデルを読み込む（yolov8x なら1つあたり数 GB）ので, 既定は1ワーカーにし, 並列数は --workers で明示する
+結果は動画ごとのフォルダ（anomalies, histograms, summary.json）に保存し, 最後に全体の概要をまとめる
+実行例（src で）: python batch_runner.py ../videos/2024-05-01 --workers 4
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.load_video import load_video_files_from_folder
+from src.yolo_handler import load_yolo_model
+
+SUMMARY_FILE = "summary.json"
+BATCH_SUMMARY_FILE = "batch_summary.json"
+
+_model = None   # ワーカープロセスごとに1つだけロードするモデル
+_model_path = None
+
+
+def video_results_folder(results_folder, video_path):
+    """動画ごとの結果フォルダ（拡張子を除いたファイル名）"""
+    return os.path.join(results_folder, os.path.splitext(os.path.basename(video_path))[0])
+
+def is_processed(results_folder, video_path):
+    """summary.json は処理の最後に書くので, あれば処理済み"""
+    return os.path.exists(os.path.join(video_results_folder(results_folder, video_path), SUMMARY_FILE))
+
+def _init_worker(model_path, num_threads):
+    global _model, _model_path
+    import torch
+    torch.set_num_threads(num_threads)     # ワーカー同士で CPU コアを取り合わないようにする
+    _model = load_yolo_model(model_path)
+    _model_path = model_path
+
+def _process_one(video_path, results_folder):
+    from src.main import process_video
+    output_folder = video_results_folder(results_folder, video_path)
+    summary = process_video(
+        video_path, _model,
+        anomalies_folder=os.path.join(output_folder, "anomalies"),
+        histograms_folder=os.path.join(output_folder, "histograms"),
+        show_frame=False,
+        model_path=_model_path,
+        histogram_workers=0,    # 動画ごとにプロセスを分けているので描画は並列にしない
+    )
+    with open(os.path.join(output_folder, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=4)
+    return summary
+
+def merge_summaries(results_folder, video_paths, failed=()):
+    """動画ごとの summary.json をまとめて batch_summary.json に保存"""
+    videos = []
+    for video_path in video_paths:
+        summary_path = os.path.join(video_results_folder(results_folder, video_path), SUMMARY_FILE)
+        if os.path.exists(summary_path):
+            with open(summary_path, encoding="utf-8") as f:
+                videos.append(json.load(f))
+    merged = {
+        "videos": len(videos),
+        "frames": sum(v["frames"] for v in videos),
+        "tracks": sum(v["tracks"] for v in videos),
+        "anomalies": sum(v["anomalies"] for v in videos),
+        "elapsed_sec": sum(v["elapsed_sec"] for v in videos),
+        "failed": list(failed),
+        "per_video": videos,
+    }
+    with open(os.path.join(results_folder, BATCH_SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+    return merged
+
+def run_batch(folder_path, results_folder, model_path, workers=1, resume=True):
+    """
+    フォルダ内の動画をプロセスプールで処理
+    :param workers: ワーカー数（ワーカーごとにモデルを読み込むのでメモリに合わせて指定する）
+    :param resume: True なら結果がある動画はスキップ
+    """
+    video_paths = load_video_files_from_folder(folder_path)
+    pending = [v for v in video_paths if not (resume and is_processed(results_folder, v))]
+    print(f"動画数: {len(video_paths)}, 処理対象: {len(pending)}, スキップ: {len(video_paths) - len(pending)}")
+    os.makedirs(results_folder, exist_ok=True)
+    failed = []
+    if pending:
+        if workers < 1:
+            raise ValueError(f"ワーカー数は1以上: {workers}")
+        num_threads = max(1, os.cpu_count() // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, num_threads)) as pool:
+            futures = {pool.submit(_process_one, v, results_folder): v for v in pending}
+            for future in as_completed(futures):
+                video_path = futures[future]
+                try:
+                    summary = future.result()
+                    print(f"完了: {video_path} ({summary['frames']} frames, {summary['anomalies']} anomalies)")
+                except Exception as e:
+                    failed.append(video_path)
+                    print(f"失敗: {video_path}: {e}")
+    merged = merge_summaries(results_folder, video_paths, failed)
+    print(f"合計: {merged['videos']} videos, {merged['frames']} frames, {merged['anomalies']} anomalies")
+    return merged
+
+
+if __name__ == "__main__":
+    from src.main import RESULTS_FOLDER, YOLO_MODEL_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder")
+    parser.add_argument("--results", default=RESULTS_FOLDER)
+    parser.add_argument("--model", default=YOLO_MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=1, help="ワーカー数（ワーカーごとにモデルを読み込む）")
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+    run_batch(args.folder, args.results, args.model, workers=args.workers, resume=not args.no_resume)
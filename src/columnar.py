@@ -0,0 +1,113 @@
+"""
+列ごとに1つのバイナリファイルへ書き出す簡易カラムナ形式
+<folder>/<列名>.bin に値をそのまま追記し, 最後に meta.json（行数, 型, 任意のメタ情報）を書く
+読み込みは np.memmap で行うので, ファイル全体を読み込まずに列単位でアクセスできる
+"""
+import json
+import os
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+class ColumnarWriter:
+    """
+    カラムナ形式の書き出し
+    :param columns: {列名: dtype} または {列名: (dtype, 幅)}（幅があると (rows, 幅) の2次元列）
+    :param chunk_rows: この行数たまったらファイルに書き出す
+    """
+
+    def __init__(self, folder, columns, chunk_rows=65536):
+        os.makedirs(folder, exist_ok=True)
+        meta_path = os.path.join(folder, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)    # 書き込み中は meta.json を置かない（未完了と判別できるように）
+        self.folder = folder
+        self.chunk_rows = chunk_rows
+        self.columns = {}
+        for name, spec in columns.items():
+            dtype, width = spec if isinstance(spec, tuple) else (spec, 1)
+            self.columns[name] = (np.dtype(dtype), width)
+        self.rows = 0
+        self._buffered_rows = 0
+        self._buffers = {name: [] for name in self.columns}
+        self._files = {name: open(os.path.join(folder, f"{name}.bin"), "wb") for name in self.columns}
+
+    def append(self, **values):
+        """全列に同じ行数の値を追加"""
+        lengths = set()
+        for name, (dtype, width) in self.columns.items():
+            array = np.asarray(values[name], dtype=dtype)
+            array = array.reshape(-1, width) if width > 1 else array.reshape(-1)
+            self._buffers[name].append(array)
+            lengths.add(len(array))
+        if len(lengths) != 1:
+            raise ValueError(f"列の長さが揃っていません: {lengths}")
+        n = lengths.pop()
+        self.rows += n
+        self._buffered_rows += n
+        if self._buffered_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        for name, chunks in self._buffers.items():
+            if chunks:
+                np.concatenate(chunks).tofile(self._files[name])
+                chunks.clear()
+            self._files[name].flush()
+        self._buffered_rows = 0
+
+    def close(self, **meta):
+        """残りを書き出して meta.json を保存（meta は任意の追加情報）"""
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        columns = {name: {"dtype": dtype.str, "width": width} for name, (dtype, width) in self.columns.items()}
+        with open(os.path.join(self.folder, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"rows": self.rows, "columns": columns, **meta}, f, ensure_ascii=False, indent=4)
+
+    def abort(self):
+        """meta.json を書かずに閉じる（未完了のまま残す）"""
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:    # 例外で抜けたら未完了のまま残す
+            self.abort()
+        else:
+            self.close()
+
+
+class ColumnarReader:
+    """カラムナ形式の読み込み（各列は np.memmap）"""
+
+    def __init__(self, folder):
+        with open(os.path.join(folder, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.folder = folder
+        self.rows = self.meta["rows"]
+        self.columns = {}
+        for name, spec in self.meta["columns"].items():
+            shape = (self.rows, spec["width"]) if spec["width"] > 1 else (self.rows,)
+            dtype = np.dtype(spec["dtype"])
+            if self.rows == 0:
+                self.columns[name] = np.empty(shape, dtype=dtype)   # 空ファイルは memmap できない
+            else:
+                self.columns[name] = np.memmap(os.path.join(folder, f"{name}.bin"), dtype=dtype, mode="r",
+                                               shape=shape)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @staticmethod
+    def exists(folder):
+        """書き込みが完了している（meta.json がある）か"""
+        return os.path.exists(os.path.join(folder, META_FILE))
@@ -0,0 +1,107 @@
+"""
+YOLO の検出結果（frame_number, track_id, xyxy, conf）のキャッシュ
+動画パス・モデル・設定からキーを作り, カラムナ形式で保存する
+キャッシュから再生すれば検出器を動かさずに予測・異常検知だけをやり直せる
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.columnar import ColumnarWriter, ColumnarReader
+
+DETECTION_COLUMNS = {
+    "frame": "int32",
+    "track_id": "int32",
+    "xyxy": ("float32", 4),
+    "conf": "float32",
+}
+
+
+def cache_key(video_path, model_path, settings):
+    """動画（パス・サイズ・更新時刻）, モデル, 設定から決まるキー"""
+    stat = os.stat(video_path)
+    source = {
+        "video": os.path.abspath(video_path),
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "model": os.path.abspath(model_path) if os.path.exists(model_path) else model_path,
+        "settings": settings,
+    }
+    return hashlib.sha1(json.dumps(source, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def cache_folder(cache_root, video_path, model_path, settings):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_root, f"{name}_{cache_key(video_path, model_path, settings)}")
+
+
+class DetectionCacheWriter:
+    """フレームごとの検出結果をキャッシュに書き出す"""
+
+    def __init__(self, folder, video_path, model_path, settings):
+        self.folder = folder
+        self.source = {"video": video_path, "model": model_path, "settings": settings}
+        self._writer = ColumnarWriter(folder, DETECTION_COLUMNS)
+        self.frames = 0
+
+    def write_frame(self, frame_number, scored_detections):
+        """
+        1フレーム分を追加
+        :param scored_detections: [(track_id, [x1, y1, x2, y2], conf), ...]
+        """
+        self.frames = max(self.frames, frame_number)
+        if not scored_detections:
+            return
+        track_ids, bboxes, confs = zip(*scored_detections)
+        self._writer.append(frame=np.full(len(track_ids), frame_number), track_id=track_ids, xyxy=bboxes,
+                            conf=confs)
+
+    def close(self, complete=True):
+        """complete=False（途中終了）のときは meta.json を書かず, 次回は作り直す"""
+        if complete:
+            self._writer.close(frames=self.frames, **self.source)
+        else:
+            self._writer.abort()
+
+
+class DetectionCache:
+    """キャッシュの読み込み（列は memmap）"""
+
+    def __init__(self, folder):
+        self._reader = ColumnarReader(folder)
+        self.meta = self._reader.meta
+        self.frames = self.meta["frames"]
+        self.frame = self._reader["frame"]
+        self.track_id = self._reader["track_id"]
+        self.xyxy = self._reader["xyxy"]
+        self.conf = self._reader["conf"]
+        # フレーム番号 n の行は offsets[n-1]:offsets[n]（書き込みはフレーム順）
+        self._offsets = np.searchsorted(self.frame, np.arange(1, self.frames + 2), side="left")
+
+    def __len__(self):
+        return self.frames
+
+    def frame_rows(self, frame_number):
+        return slice(self._offsets[frame_number - 1], self._offsets[frame_number])
+
+    def detections(self, frame_number, with_conf=False):
+        """perform_yolo と同じ形式 [(track_id, [x1, y1, x2, y2]), ...]"""
+        rows = self.frame_rows(frame_number)
+        track_ids = self.track_id[rows].tolist()
+        bboxes = self.xyxy[rows].tolist()
+        if with_conf:
+            return list(zip(track_ids, bboxes, self.conf[rows].tolist()))
+        return list(zip(track_ids, bboxes))
+
+    def iter_frames(self, with_conf=False):
+        """(frame_number, detections) を先頭フレームから順に返す"""
+        for frame_number in range(1, self.frames + 1):
+            yield frame_number, self.detections(frame_number, with_conf)
+
+
+def open_detection_cache(folder):
+    """完了済みのキャッシュがあれば DetectionCache, なければ None"""
+    if not ColumnarReader.exists(folder):
+        return None
+    return DetectionCache(folder)
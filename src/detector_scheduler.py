@@ -0,0 +1,58 @@
+"""
+検出器（YOLO）を動かすフレームの選択
+縮小したグレースケール画像で最後に検出したフレームとの差分をとり,
+動きが小さいフレームは検出せずに予測値でつなぐ（連続して飛ばすのは max_gap フレームまで）
+"""
+import cv2
+import numpy as np
+
+
+class DetectorScheduler:
+    """
+    :param threshold: 差分（画素値 0~255 の平均絶対差）がこれ以上なら検出する
+    :param max_gap: 検出せずにつなぐ最大の連続フレーム数（0 なら毎フレーム検出）
+    :param size: 差分を計算する縮小画像の (幅, 高さ)
+    """
+
+    def __init__(self, threshold=3.0, max_gap=5, size=(64, 36)):
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.size = size
+        self.frames = 0
+        self.detections = 0
+        self.last_score = None
+        self._reference = None  # 最後に検出したフレームの縮小画像
+        self._gap = 0           # 最後に検出してから飛ばしたフレーム数
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def should_detect(self, frame):
+        """このフレームで検出器を動かすか"""
+        self.frames += 1
+        thumbnail = self._thumbnail(frame)
+        if self._reference is None or self._gap >= self.max_gap:
+            self.last_score = None
+            return self._detect(thumbnail)
+        self.last_score = float(np.abs(thumbnail - self._reference).mean())
+        if self.last_score >= self.threshold:
+            return self._detect(thumbnail)
+        self._gap += 1
+        return False
+
+    def _detect(self, thumbnail):
+        self._reference = thumbnail
+        self._gap = 0
+        self.detections += 1
+        return True
+
+    def stats(self):
+        """検出器の呼び出し回数と削減率"""
+        skipped = self.frames - self.detections
+        return {
+            "frames": self.frames,
+            "detector_calls": self.detections,
+            "bridged_frames": skipped,
+            "savings": skipped / self.frames if self.frames else 0.0,
+        }
@@ -0,0 +1,77 @@
+"""
+元動画から目標 FPS になるようにフレームを間引いて取り出す
+元 FPS / 目標 FPS の比を分数のまま扱うので, 29.97fps → 10fps のような割り切れない場合も正確に間引く
+（k 番目（0始まり）に取り出すのは元動画の floor((k+1) * 比) - 1 番目のフレーム）
+飛ばすフレームが多いときは grab() で1枚ずつ進める代わりにフレーム番号でシークする
+"""
+from fractions import Fraction
+
+import cv2
+
+from src.profiler import NULL_PROFILER
+
+FRAME_SOURCE_MODES = ("grab", "seek", "auto")
+SEEK_THRESHOLD = 30     # "auto" でこの枚数以上飛ばすときはシークする
+
+
+def frame_ratio(original_fps, target_fps):
+    """元 FPS / 目標 FPS（1未満なら1: 全フレームを使う）"""
+    ratio = Fraction(original_fps).limit_denominator(1001) / Fraction(target_fps).limit_denominator(1001)
+    return max(ratio, Fraction(1))
+
+
+class FrameSource:
+    """
+    VideoCapture を包んで間引き済みのフレームを返す（isOpened / read / release / get は VideoCapture と同じ）
+    :param mode: "grab"（grab() で飛ばす）, "seek"（毎回シーク）, "auto"（SEEK_THRESHOLD 枚以上ならシーク）
+    """
+
+    def __init__(self, cap, original_fps, target_fps, mode="auto", seek_threshold=SEEK_THRESHOLD):
+        if mode not in FRAME_SOURCE_MODES:
+            raise ValueError(f"Unknown mode:{mode}")
+        self.cap = cap
+        self.ratio = frame_ratio(original_fps, target_fps)
+        self.mode = mode
+        self.seek_threshold = seek_threshold
+        self.kept = 0           # 取り出したフレーム数
+        self.index = -1         # 最後に取り出したフレームの元動画での番号
+        self.grabbed = 0        # grab() で飛ばしたフレーム数
+        self.seeks = 0          # シークした回数
+        self._position = 0      # 次に cap が返すフレームの番号
+
+    def next_index(self):
+        """次に取り出すフレームの元動画での番号"""
+        return (self.kept + 1) * self.ratio.numerator // self.ratio.denominator - 1
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, profiler=NULL_PROFILER):
+        target = self.next_index()
+        gap = target - self._position
+        if gap > 0 and (self.mode == "seek" or (self.mode == "auto" and gap >= self.seek_threshold)):
+            with profiler.stage("seek"):
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self.seeks += 1
+        else:
+            with profiler.stage("skip"):
+                for _ in range(gap):
+                    if not self.cap.grab():
+                        return False, None
+                    self.grabbed += 1
+        with profiler.stage("decode"):
+            success, frame = self.cap.read()
+        if success:
+            self.kept += 1
+            self.index = target
+            self._position = target + 1
+        return success, frame
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def release(self):
+        self.cap.release()
+
+    def stats(self):
+        return {"kept": self.kept, "grabbed": self.grabbed, "seeks": self.seeks, "ratio": str(self.ratio)}
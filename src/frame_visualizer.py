@@ -1,7 +1,5 @@
 import cv2
 
-from src.histogram_generator import save_all_histograms
-
 def annotate_frame_with_tracking(frame, detections, predictions=None, tracked_data=None):
     """検出、予測、確定バウンディングボックスを表示"""
     # 検出されたバウンディングボックスを描画(緑)
@@ -54,15 +52,23 @@ def draw_tracking_data(frame, tracked_data=None):
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
     return frame
 
-def display_frame(frame, frame_number, pause, metrics, histograms_folder):
+def display_frame(frame, frame_number, pause):
     cv2.imshow("Result", frame)
     key = cv2.waitKey(10) & 0xFF
     if key == ord(' '):  # スペースキーで一時停止
         pause = not pause
         if pause:
             print(f"PAUSE : Frame {frame_number}")
-    elif key == ord('q'):  # 'q'キーで強制終了
-        save_all_histograms(metrics, histograms_folder)
+    elif key == ord('q'):  # 'q'キーで強制終了（ヒストグラムは終了後に保存）
         print("強制終了しました。")
         return pause, True  # 終了フラグをTrueに
-    return pause, False  # 終了フラグをFalseに
\ No newline at end of file
+    return pause, False  # 終了フラグをFalseに
+
+def draw_text_overlay(frame, lines, origin=(10, 20), line_height=18):
+    """左上に複数行の文字列を表示（処理時間など）"""
+    x, y = origin
+    for i, line in enumerate(lines):
+        position = (x, y + i * line_height)
+        cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)        # 縁取り
+        cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return frame
@@ -1,17 +1,19 @@
 import json
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-import matplotlib.pyplot as plt
 import numpy as np
-import prediction_evaluator as evaluator
+import src.prediction_evaluator as evaluator
+from src.streaming_metrics import StreamingMetric
 
 def update_metrics(metrics, track_id, current_bbox, predicted_bbox, previous_bbox, target_ids=None):
     if target_ids is not None and track_id not in target_ids:
         return
     if track_id not in metrics["iou"]:
-        metrics["iou"][track_id] = []
-        metrics["area"][track_id] = []
-        metrics["aspect"][track_id] = []
+        metrics["iou"][track_id] = StreamingMetric()
+        metrics["area"][track_id] = StreamingMetric()
+        metrics["aspect"][track_id] = StreamingMetric()
     iou = evaluator.calculate_iou(current_bbox, predicted_bbox)
     if iou is not None:
         metrics["iou"][track_id].append(iou)
@@ -24,82 +26,137 @@ def update_metrics(metrics, track_id, current_bbox, predicted_bbox, previous_bbo
     # print(metrics)  # デバッグ
 
 
+THRESHOLD_COLORS = ["maroon", "firebrick", "red", "coral", "gold"]
+
+
+def _pyplot():
+    """matplotlib は描画するときに初めて読み込む（非対話の Agg バックエンド）"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def _draw_histogram(ax, hist, bin_edges, thresholds, legend_fontsize=None):
+    ax.hist(bin_edges[:-1], bins=bin_edges, weights=hist, edgecolor="black", color="blue", alpha=0.7)
+    # 各閾値をプロット
+    for i, (label, value) in enumerate(thresholds.items()):
+        if value is not None:
+            ax.axvline(value, color=THRESHOLD_COLORS[i], linestyle="--", label=f"{label}: {value:.2f}")
+    ax.legend(fontsize=legend_fontsize)
+    ax.grid(True, alpha=0.5)
+
+def save_histogram_stats(data, stats_path):
+    """統計データを JSON に保存して返す"""
+    stats = data.stats()
+    os.makedirs(os.path.dirname(stats_path), exist_ok=True)
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f, indent=4)
+    print(f"統計情報を保存しました: {stats_path}")
+    return stats
+
+def plot_histogram(hist, bin_edges, thresholds, title, xlabel, ylabel, output_path):
+    """ビンごとの個数からヒストグラムを描画して保存"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    _draw_histogram(ax, hist, bin_edges, thresholds)
+    # グラフ設定
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    # 保存
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fig.savefig(output_path)
+    plt.close(fig)
+    print(f"ヒストグラムを保存しました: {output_path}")
+
+def plot_combined_histograms(panels, metric_name, output_path):
+    """
+    1つのメトリクスの全トラックを1枚の図にまとめて描画
+    :param panels: [(track_id, hist, bin_edges, thresholds), ...]
+    """
+    plt = _pyplot()
+    cols = math.ceil(math.sqrt(len(panels)))
+    rows = math.ceil(len(panels) / cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(4 * cols, 3 * rows), squeeze=False)
+    for ax, (track_id, hist, bin_edges, thresholds) in zip(axes.flat, panels):
+        _draw_histogram(ax, hist, bin_edges, thresholds, legend_fontsize="xx-small")
+        ax.set_title(f"Track ID: {track_id}", fontsize="small")
+    for ax in axes.flat[len(panels):]:
+        ax.axis("off")
+    fig.suptitle(f"Histogram for {metric_name.upper()}")
+    fig.supxlabel(metric_name.upper())
+    fig.supylabel("Frame Count")
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fig.savefig(output_path)
+    plt.close(fig)
+    print(f"ヒストグラムを保存しました: {output_path}")
+
 def generate_histogram(data, title, xlabel, ylabel, output_path, stats_path):
     """
     ヒストグラムを生成して保存し、統計データを記録する関数
-    :param data: ヒストグラム用データ（リスト形式）
+    :param data: ヒストグラム用データ（StreamingMetric またはリスト形式）
     :param title: ヒストグラムのタイトル
     :param xlabel: 横軸のラベル
     :param ylabel: 縦軸のラベル
     :param output_path: 保存先の画像パス
     :param stats_path: 保存先の統計データパス
     """
-    bins = [i / 100 for i in range(101)]  # 0.00~1.00を0.01刻みにするビン
-    hist, bin_edges = np.histogram(data, bins=bins)
-    # 累積頻度の計算
-    # print(f"HIST: {hist}, SUM_HIST: {sum(hist)}")     # デバッグ
-    # print(f"cumsum: {np.cumsum(hist)}")               # デバッグ
-    cdf = np.cumsum(hist) / sum(hist)   # CDF(昇順)
-    # print(f"CDF  : {cdf}")
-    # 閾値を設定
-    percentages = [0.5, 0.4, 0.3, 0.2, 0.1]
-    thresholds = {f"{int(p * 100)}%": find_threshold_bin(cdf, bin_edges, p) for p in percentages}
-    # print(f"BIN_EDGE: {thresholds}")
-    # 統計情報をjsonファイルに記録
-    stats = {
-        "mean": np.mean(data),
-        "median": np.median(data),
-        "std_dev": np.std(data),
-        "threshold_top_10%": thresholds,
-        "histogram": {f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}": int(hist[i]) for i in range(len(hist))},
-        "cdf": cdf.tolist()
-    }
-    os.makedirs(os.path.dirname(stats_path), exist_ok=True)
-    with open(stats_path, 'w') as f:
-        json.dump(stats, f, indent=4)
-    print(f"統計情報を保存しました: {stats_path}")
-    # ヒストグラムをプロット
-    plt.figure(figsize=(10, 6))
-    plt.hist(data, bins=bins, edgecolor="black", color="blue", alpha=0.7)
-    # 各閾値をプロット
-    colors = ["maroon", "firebrick", "red", "coral", "gold"]
-    for i, (label, value) in enumerate(thresholds.items()):
-        if value is not None:
-            # print(f"Label: {label}, Value: {value}")        # デバッグ
-            plt.axvline(value, color=colors[i], linestyle="--", label=f"{label}: {value:.2f}")
-    # グラフ設定
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.legend()
-    plt.grid(True, alpha=0.5)
-    # 保存
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path)
-    plt.close()
-    print(f"ヒストグラムを保存しました: {output_path}")
+    if not isinstance(data, StreamingMetric):
+        data = StreamingMetric.from_values(data)
+    stats = save_histogram_stats(data, stats_path)
+    hist, bin_edges = data.histogram()
+    plot_histogram(hist, bin_edges, stats["threshold_top_10%"], title, xlabel, ylabel, output_path)
 
 def find_threshold_bin(cdf, bin_edges, target_percent):
     threshold_idx = np.searchsorted(cdf, target_percent, side="left")
     return bin_edges[threshold_idx]
 
-def save_all_histograms(metrics, output_folder):
+def run_render_jobs(jobs, workers=None):
+    """
+    描画をプロセスプールで並列に行う（workers=0 なら呼び出し元で順に描画）
+    :param jobs: [(描画関数, 引数のタプル), ...]
+    """
+    if workers == 0 or len(jobs) <= 1:
+        for function, args in jobs:
+            function(*args)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(jobs))) as pool:
+        for future in [pool.submit(function, *args) for function, args in jobs]:
+            future.result()
+
+def save_all_histograms(metrics, output_folder, workers=None, combined=False):
     """
     各トラックIDのヒストグラムと統計データを保存
+    統計データ（JSON）は呼び出し元で書き, 図の描画はプロセスプールで並列に行う
     :param metrics: 各トラックIDのメトリクス辞書
-                    {"iou": {"id1": [...], ...}, "area": {...}, "aspect": {...}}
+                    {"iou": {"id1": StreamingMetric, ...}, "area": {...}, "aspect": {...}}
     :param output_folder: 保存先のフォルダ
+    :param workers: 描画するプロセス数（None なら CPU 数, 0 なら並列にしない）
+    :param combined: True ならメトリクスごとに全トラックを1枚にまとめた図（<metric>_all.png）を描画
     """
+    jobs = []
     for metric_name, track_data in metrics.items():
+        panels = []
         for track_id, values in track_data.items():
             if not values:
                 continue
-            output_path = os.path.join(output_folder, f"{metric_name}_{track_id}.png")
+            if not isinstance(values, StreamingMetric):
+                values = StreamingMetric.from_values(values)
             stats_path = os.path.join(output_folder, f"{metric_name}_{track_id}_stats.json")
+            thresholds = save_histogram_stats(values, stats_path)["threshold_top_10%"]
+            hist, bin_edges = values.histogram()
+            if combined:
+                panels.append((track_id, hist, bin_edges, thresholds))
+                continue
+            output_path = os.path.join(output_folder, f"{metric_name}_{track_id}.png")
             title = f"Histogram for {metric_name.upper()} - Track ID: {track_id}"
             xlabel = metric_name.upper()
             ylabel = "Frame Count"
-            generate_histogram(values, title, xlabel, ylabel, output_path, stats_path)
+            jobs.append((plot_histogram, (hist, bin_edges, thresholds, title, xlabel, ylabel, output_path)))
+        if panels:
+            jobs.append((plot_combined_histograms, (panels, metric_name, os.path.join(output_folder, f"{metric_name}_all.png"))))
+    run_render_jobs(jobs, workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+import logging
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_POWER = 4   # 二次フィット + 重み（t の2次式）で t^4 までのモーメントが必要
+
+
+@lru_cache(maxsize=None)
+def _shift_matrix():
+    """t -> t-1 の原点移動をモーメントに適用する行列 (Σ(t-1)^k y = Σ_j C(k,j)(-1)^(k-j) Σ t^j y)"""
+    size = MAX_POWER + 1
+    return np.array([[comb(k, j) * (-1) ** (k - j) if j <= k else 0 for j in range(size)] for k in range(size)],
+                    dtype=np.float64)
+
+@lru_cache(maxsize=None)
+def _weight_polynomial(num_frames, weighting):
+    """
+    polyfit に渡す重み w の二乗を t の多項式 c0 + c1 t + c2 t^2 で表した係数
+    "none": w = 1, "linspace": w = linspace(1, 2, num_frames)（最新フレームが 2）
+    """
+    if weighting == "none":
+        return np.array([1.0, 0.0, 0.0])
+    if weighting == "linspace":
+        # t = i - (n-1) のとき w = 2 + t / (n-1)
+        a = 1 / (num_frames - 1)
+        return np.array([4.0, 4 * a, a * a])
+    raise ValueError(f"Unknown weighting:{weighting}")
+
+@lru_cache(maxsize=None)
+def _prediction_vector(num_frames, weighting):
+    """重み付きモーメント [Σw²y, Σw²ty, Σw²t²y] から t=1 の予測値を求める係数"""
+    frames = np.arange(-num_frames + 1, 1, dtype=np.float64)
+    c = _weight_polynomial(num_frames, weighting)
+    w2 = c[0] + c[1] * frames + c[2] * frames ** 2
+    normal = np.array([[np.sum(w2 * frames ** (a + b)) for b in range(3)] for a in range(3)])
+    return np.linalg.solve(normal, np.ones(3))      # 正規方程式は対称なので [1,1,1] A^-1 = A^-1 [1,1,1]
+
+
+class IncrementalQuadraticPredictor:
+    """
+    スライディングウィンドウの二次フィットをモーメントの逐次更新で行う予測器
+    トラック・座標ごとに Σ t^k y (k=0..4, 最新フレームを t=0) を保持し,
+    1フレーム進むごとに原点移動・古い値の削除・新しい値の追加を定数時間で行う
+    :param weighting: "none"（predict_bbox_quadratic 相当）, "linspace"（外れ値除去版の重み）
+    :param outlier_threshold: 指定時はウィンドウ内に IQR 外れ値があれば fallback で計算する
+    :param fallback: 外れ値があったときに使う従来の予測関数
+    :param refresh_interval: 誤差の蓄積を防ぐため, この回数スライドしたらウィンドウから再計算
+    """
+
+    def __init__(self, num_frames=10, weighting="none", outlier_threshold=None, fallback=None,
+                 refresh_interval=256):
+        self.num_frames = num_frames
+        self.weighting = weighting
+        self.outlier_threshold = outlier_threshold
+        self.fallback = fallback
+        self.refresh_interval = refresh_interval
+        self._shift = _shift_matrix().T
+        self._leaving_powers = float(-num_frames) ** np.arange(MAX_POWER + 1)   # 抜ける値は t=-num_frames
+        self._powers = np.arange(-num_frames + 1, 1, dtype=np.float64)[:, None] ** np.arange(MAX_POWER + 1)
+        self._states = {}   # track_id -> [moments (4, 5), 追加総数, スライド回数]
+
+    def __call__(self, tracked_data, track_id):
+        if track_id not in tracked_data or len(tracked_data[track_id]) < self.num_frames:
+            logger.debug("データ不足；%s", track_id)
+            self._states.pop(track_id, None)
+            return None
+        history = tracked_data[track_id]
+        total = getattr(history, "total", len(history))
+        state = self._states.get(track_id)
+        if state is not None and total == state[1]:
+            pass    # このフレームは計算済み
+        elif (state is not None and total == state[1] + 1 and len(history) > self.num_frames
+              and state[2] < self.refresh_interval):
+            self._slide(state, history[-self.num_frames - 1], history[-1])
+            state[1] = total
+        else:
+            state = self._rebuild(track_id, history, total)
+            if len(self._states) > 2 * len(tracked_data) + 64:    # 消えたトラックの状態を掃除
+                self._states = {t: s for t, s in self._states.items() if t in tracked_data}
+        if self.outlier_threshold is not None and self._has_outliers(history[-self.num_frames:]):
+            return self.fallback(tracked_data, track_id, self.num_frames)
+        return self._predict(state[0]).tolist()
+
+    def _rebuild(self, track_id, history, total):
+        window = np.asarray(history[-self.num_frames:], dtype=np.float64)    # (num_frames, 4)
+        state = [window.T @ self._powers, total, 0]
+        self._states[track_id] = state
+        return state
+
+    def _slide(self, state, leaving, entering):
+        moments = state[0] @ self._shift
+        moments -= np.outer(np.asarray(leaving, dtype=np.float64), self._leaving_powers)
+        moments[:, 0] += np.asarray(entering, dtype=np.float64)
+        state[0] = moments
+        state[2] += 1
+
+    def _predict(self, moments):
+        c = _weight_polynomial(self.num_frames, self.weighting)
+        weighted = c[0] * moments[:, 0:3] + c[1] * moments[:, 1:4] + c[2] * moments[:, 2:5]
+        return weighted @ _prediction_vector(self.num_frames, self.weighting)
+
+    def _has_outliers(self, window):
+        q1, q3 = np.percentile(window, [25, 75], axis=0)
+        iqr = q3 - q1
+        lower = q1 - self.outlier_threshold * iqr
+        upper = q3 + self.outlier_threshold * iqr
+        return bool(np.any((window < lower) | (window > upper)))
+
+    def forget(self, track_id):
+        """消えたトラックの状態を破棄"""
+        self._states.pop(track_id, None)
@@ -0,0 +1,132 @@
+import numpy as np
+
+# 状態: [cx, cy, w, h, vcx, vcy, vw, vh]（等速度モデル, 1フレーム = 1ステップ）
+STATE_DIM = 8
+MEASUREMENT_DIM = 4
+
+_F = np.eye(STATE_DIM)
+_F[:MEASUREMENT_DIM, MEASUREMENT_DIM:] = np.eye(MEASUREMENT_DIM)
+
+# ノイズの標準偏差はバウンディングボックスの大きさに比例させる（[w, h, w, h] を掛ける）
+STD_WEIGHT_POSITION = 1 / 20
+STD_WEIGHT_VELOCITY = 1 / 160
+
+
+def xyxy_to_state(bboxes):
+    """(n, 4) の (x1, y1, x2, y2) を (cx, cy, w, h) に変換"""
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    wh = bboxes[:, 2:] - bboxes[:, :2]
+    return np.hstack([bboxes[:, :2] + wh / 2, wh])
+
+def state_to_xyxy(states):
+    """(n, 4以上) の状態から (x1, y1, x2, y2) を計算"""
+    center, wh = states[:, :2], states[:, 2:4]
+    return np.hstack([center - wh / 2, center + wh / 2])
+
+
+class KalmanBoxPredictor:
+    """
+    全トラックの状態と共分散を (n, 8), (n, 8, 8) の配列にまとめて持つカルマンフィルター
+    observe() で1フレーム分の予測・更新を全トラックまとめて行い,
+    未検出のトラックは予測ステップのみ進める
+    :param min_hits: 予測値を返すのに必要な観測回数
+    """
+
+    def __init__(self, min_hits=3, max_tracks=64):
+        self.min_hits = min_hits
+        self._x = np.zeros((max_tracks, STATE_DIM))
+        self._P = np.zeros((max_tracks, STATE_DIM, STATE_DIM))
+        self._hits = np.zeros(max_tracks, dtype=np.int64)
+        self._slots = {}                        # track_id -> スロット番号
+        self._free = list(range(max_tracks - 1, -1, -1))
+        self._next = None                       # 次フレーム予測のキャッシュ
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    def __call__(self, tracked_data, track_id):
+        """他の予測関数と同じ呼び出し形式 (tracked_data, track_id) で次フレームを予測"""
+        return self.predict_all([track_id])[track_id]
+
+    def observe(self, detections, track_ids=None):
+        """
+        1フレーム分の状態更新
+        :param detections: {track_id: [x1, y1, x2, y2]} 現フレームの検出値
+        :param track_ids: 保持するトラックID（指定時はこれにも検出にも含まれないトラックを破棄）
+        """
+        if self._slots:
+            self._predict(np.fromiter(self._slots.values(), dtype=np.int64))
+        if track_ids is not None:
+            keep = set(track_ids)
+            for track_id in [t for t in self._slots if t not in keep and t not in detections]:
+                self.remove(track_id)
+        measured = [(track_id, bbox) for track_id, bbox in detections.items() if bbox is not None]
+        existing = [(self._slots[t], bbox) for t, bbox in measured if t in self._slots]
+        new = [(t, bbox) for t, bbox in measured if t not in self._slots]
+        if existing:
+            slots, bboxes = zip(*existing)
+            self._update(np.array(slots), xyxy_to_state(bboxes))
+        if new:
+            track_ids_new, bboxes = zip(*new)
+            self._initiate([self._allocate(t) for t in track_ids_new], xyxy_to_state(bboxes))
+        self._next = None
+
+    def predict_all(self, track_ids=None):
+        """次フレームの予測値 {track_id: [x1, y1, x2, y2] or None}"""
+        if self._next is None:
+            self._next = {}
+            if self._slots:
+                ids = list(self._slots.keys())
+                slots = np.fromiter(self._slots.values(), dtype=np.int64)
+                bboxes = state_to_xyxy(self._x[slots] @ _F.T).tolist()
+                ready = self._hits[slots] >= self.min_hits
+                self._next = {t: (b if r else None) for t, b, r in zip(ids, bboxes, ready)}
+        if track_ids is None:
+            return dict(self._next)
+        return {track_id: self._next.get(track_id) for track_id in track_ids}
+
+    def remove(self, track_id):
+        self._free.append(self._slots.pop(track_id))
+        self._next = None
+
+    def _allocate(self, track_id):
+        if not self._free:
+            old_size = len(self._x)
+            self._x = np.concatenate([self._x, np.zeros_like(self._x)])
+            self._P = np.concatenate([self._P, np.zeros_like(self._P)])
+            self._hits = np.concatenate([self._hits, np.zeros_like(self._hits)])
+            self._free.extend(range(2 * old_size - 1, old_size - 1, -1))
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+        return slot
+
+    @staticmethod
+    def _size_scale(states):
+        """状態の (w, h) から [w, h, w, h] を作る"""
+        wh = np.maximum(states[:, 2:4], 1.0)
+        return np.hstack([wh, wh])
+
+    def _initiate(self, slots, measurements):
+        scale = self._size_scale(measurements)
+        std = np.hstack([2 * STD_WEIGHT_POSITION * scale, 10 * STD_WEIGHT_VELOCITY * scale])
+        self._x[slots] = np.hstack([measurements, np.zeros_like(measurements)])
+        self._P[slots] = std[:, :, None] ** 2 * np.eye(STATE_DIM)
+        self._hits[slots] = 1
+
+    def _predict(self, slots):
+        x = self._x[slots]
+        scale = self._size_scale(x)
+        q = np.hstack([STD_WEIGHT_POSITION * scale, STD_WEIGHT_VELOCITY * scale]) ** 2
+        self._x[slots] = x @ _F.T
+        self._P[slots] = _F @ self._P[slots] @ _F.T + q[:, :, None] * np.eye(STATE_DIM)
+
+    def _update(self, slots, measurements):
+        x, P = self._x[slots], self._P[slots]
+        r = (STD_WEIGHT_POSITION * self._size_scale(x)) ** 2
+        S = P[:, :MEASUREMENT_DIM, :MEASUREMENT_DIM] + r[:, :, None] * np.eye(MEASUREMENT_DIM)
+        # K = P H^T S^-1 （S は対称なので K^T = S^-1 H P を解く）
+        gain = np.linalg.solve(S, P[:, :MEASUREMENT_DIM, :]).transpose(0, 2, 1)
+        innovation = measurements - x[:, :MEASUREMENT_DIM]
+        self._x[slots] = x + (gain @ innovation[:, :, None])[:, :, 0]
+        self._P[slots] = P - gain @ P[:, :MEASUREMENT_DIM, :]
+        self._hits[slots] += 1
@@ -1,32 +1,111 @@
+"""
+ログ出力
+各モジュールは logging.getLogger(__name__) で "src" 以下のロガーを使い, 出力するレベルは configure() でまとめて決める
+フレームごと・トラックごとの出力は DEBUG にし, 引数は %s で渡して出力するときだけ文字列にする
+（configure() を呼ばなければ WARNING 未満は出力されず, 文字列の組み立ても行わない）
+フレームごとの記録（検出値・予測値・異常判定）は FrameRecordSink で JSON Lines にまとめて書き出す
+"""
+import json
+import logging
+import sys
+
+ROOT_LOGGER = "src"
+
+logger = logging.getLogger(__name__)
+
+
+def configure(level="INFO", stream=None):
+    """"src" 以下のロガーの出力レベルと出力先（既定は標準出力, 書式はメッセージのみ）を設定"""
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+    root.propagate = False
+    return root
+
 def display_latest_tracked_data(tracked_data, frame_number):
-    print(f"=== Final Tracked Data for Frame {frame_number} ===")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("=== Final Tracked Data for Frame %s ===", frame_number)
     for track_id, history in tracked_data.items():
         if history:  # 履歴が空でない場合
             latest_bbox = history[-1]
-            print(f"  Track ID: {track_id}, Final BBox: {latest_bbox}")
+            logger.debug("  Track ID: %s, Final BBox: %s", track_id, latest_bbox)
 
 def log_predictions_and_detections(detection_dict, predictions):
     """フレームごとの検出値と予測値を表示"""
-    print(f"Detections: {detection_dict}")
-    print(f"Predictions: {predictions}")
+    logger.debug("Detections: %s", detection_dict)
+    logger.debug("Predictions: %s", predictions)
 
 def log_frame_info(frame_number, detection_dict, predictions, anomalies, tracked_data):
     """フレームごとの情報を整理して表示"""
-    print(f"=== Frame {frame_number} ===")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("=== Frame %s ===", frame_number)
 
-    print("Detections:")
+    logger.debug("Detections:")
     for track_id, bbox in detection_dict.items():
-        print(f"  Track ID: {track_id}, BBox: {bbox}")
+        logger.debug("  Track ID: %s, BBox: %s", track_id, bbox)
 
-    print("Predictions:")
+    logger.debug("Predictions:")
     for track_id, bbox in predictions.items():
-        print(f"  Track ID: {track_id}, BBox: {bbox}")
+        logger.debug("  Track ID: %s, BBox: %s", track_id, bbox)
 
-    print("Anomalies:")
+    logger.debug("Anomalies:")
     for track_id, status in anomalies.items():
         anomaly_status = "Anomaly" if status else "Normal"
-        print(f"  Track ID: {track_id}, Status: {anomaly_status}")
+        logger.debug("  Track ID: %s, Status: %s", track_id, anomaly_status)
 
-    print("Tracked Data:")
+    logger.debug("Tracked Data:")
     for track_id, history in tracked_data.items():
-        print(f"  Track ID: {track_id}, History: {history[-3:]}")  # 最新3フレームだけ表示
\ No newline at end of file
+        logger.debug("  Track ID: %s, History: %s", track_id, history[-3:])  # 最新3フレームだけ表示
+
+
+def _bbox(bbox):
+    return None if bbox is None else [round(float(v), 2) for v in bbox]
+
+
+class FrameRecordSink:
+    """
+    フレームごと・トラックごとの記録を JSON Lines で書き出す
+    1行: {"frame": n, "track": id, "det": [x1, y1, x2, y2] or null, "pred": [...] or null, "anomaly": bool}
+    buffer_size 行たまるまでメモリに置き, まとめて書き込む
+    """
+
+    def __init__(self, path, buffer_size=1000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer = []
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write_frame(self, frame_number, detection_dict, predictions, anomalies=None):
+        """1フレーム分（検出値か予測値のあるトラック）を記録"""
+        anomalies = anomalies or {}
+        for track_id in sorted(detection_dict.keys() | predictions.keys()):
+            if detection_dict.get(track_id) is None and predictions.get(track_id) is None:
+                continue
+            self._buffer.append(json.dumps({
+                "frame": frame_number,
+                "track": track_id,
+                "det": _bbox(detection_dict.get(track_id)),
+                "pred": _bbox(predictions.get(track_id)),
+                "anomaly": bool(anomalies.get(track_id, False)),
+            }))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self.records += len(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        return self.records
@@ -1,15 +1,32 @@
+import json
+import logging
 import os
+import time
+
 import cv2
 
 from src.load_video import load_video                                               # 動画の読み込み
 from src.get_fps import get_fps, calculate_frame_skip_interval                      # フレームスキップ関連
-from src.yolo_handler import load_yolo_model, process_frame, process_frame_data     # YOLO実行関連
-from src.prediction import get_prediction_function                                  # 予測
-from src.anomaly_detectors import detect_combined_anomalies                         # 異常検出
-import src.anomaly_handler as anomaly                                               # 異常判定時
-from src.frame_visualizer import annotate_frame_with_tracking, display_frame, draw_predictions, draw_tracking_data  # フレーム表示
-from src.histogram_generator import save_all_histograms, update_metrics             # ヒストグラム作成, 保存
-import src.log as log                                                               # log
+from src.frame_source import FrameSource
+from src.yolo_handler import (get_yolo_model, warm_up_model, process_frame,      # YOLO実行関連
+                              perform_yolo, reset_tracker, create_tracker, perform_yolo_batch, perform_yolo_tiled)
+from src.pipeline import run_pipeline                                               # 並行実行
+from src.tracking import new_tracking_state, track_frame, bridge_frame              # 予測・異常検知・置き換え
+from src.detector_scheduler import DetectorScheduler                                 # 検出するフレームの選択
+from src.frame_visualizer import (annotate_frame_with_tracking, display_frame, draw_predictions,   # フレーム表示
+                                  draw_tracking_data, draw_text_overlay)
+from src.histogram_generator import save_all_histograms                             # ヒストグラム作成, 保存
+from src.detection_cache import cache_folder, DetectionCacheWriter, open_detection_cache  # 検出結果のキャッシュ
+from src.track_export import TrackExportWriter                                      # 追跡結果の保存
+from src.profiler import create_profiler                                            # 処理時間の計測
+from src.roi import make_roi                                                        # 検出する領域
+from src.video_writer import AsyncVideoWriter                                       # 描画結果の動画保存
+from src.anomaly_handler import AnomalySnapshotWriter                               # 異常検知フレームの保存
+from src.viewer import FrameViewer                                                  # 処理と切り離した表示
+import src.log as log                                                               # ログ出力
+
+
+logger = logging.getLogger("src.main")     # python -m src.main で実行しても "src" 以下のロガーにする
 
 
 # 設定
@@ -21,103 +38,449 @@ ANOMALIES_FOLDER = os.path.join(RESULTS_FOLDER, "anomalies")
 HISTOGRAMS_FOLDER = os.path.join(RESULTS_FOLDER, "histograms")
 
 TARGET_FPS = 10
+FRAME_SOURCE_MODE = "auto"      # 間引き方 grab():"grab", シーク:"seek", 間隔で切り替え:"auto",
+                                # None なら従来どおり int(元FPS // TARGET_FPS) フレームごと
 
 PREDICTION_METHOD = "quadratic_weight"        # 線形:"linear", 曲線:"quadratic", カルマン:"kalman"
+                                              # 逐次更新版:"quadratic_incremental", "quadratic_weight_incremental"
 
 SHOW_FRAME = True
-SAVE_VIDEO = False
+VIEWER = True                       # 処理を別スレッドで行い, 表示はメインスレッドで一番新しいフレームだけを VIEWER_MAX_FPS まで
+VIEWER_MAX_FPS = 30                 # 描画・表示する（False なら処理したフレームをすべて描画・表示する）
+SAVE_VIDEO = False                  # 描画したフレームを動画として保存（エンコードは別スレッド）
+SAVE_ANOMALIES = True               # 異常と判定したフレームを ANOMALIES_FOLDER に JPEG で保存（書き込みは別スレッド）
+ANOMALY_CROP = False                # 検出値と予測値の周りだけを切り出して保存
+ANOMALY_CROP_PADDING = 0.5          # 切り出すときの余白（ボックスの幅・高さに対する割合）
+ANOMALY_JPEG_QUALITY = 90
+ANOMALY_MIN_INTERVAL = 10           # 同じトラックは このフレーム数に1枚まで保存
+ANOMALY_WORKERS = 2                 # JPEG の変換と書き込みを行うスレッド数
+VIDEO_FOLDER = os.path.join(RESULTS_FOLDER, "videos")
+VIDEO_CONTAINER = "mp4"             # 出力動画の拡張子
+VIDEO_CODEC = None                  # FourCC（例: "mp4v", "avc1", "XVID"）。None なら拡張子から決める
+VIDEO_QUEUE_SIZE = 32               # エンコード待ちのフレーム数の上限
+VIDEO_QUEUE_POLICY = "block"        # エンコードが追いつかないとき 待つ:"block", 古いフレームを捨てる:"drop_oldest"
+
+PIPELINE = False                    # デコード・推論・後処理をスレッドで並行に実行
+PIPELINE_QUEUE_SIZE = 8
+PIPELINE_QUEUE_POLICY = "block"     # キューが満杯のとき 待つ:"block", 古いフレームを捨てる:"drop_oldest"
+
+BATCH_SIZE = 1                      # 2以上でオフライン処理: BATCH_SIZE フレームずつまとめて検出
+
+DETECTION_CACHE = True              # 検出結果（frame, track_id, xyxy, conf）をキャッシュに保存
+REPLAY_FROM_CACHE = False           # キャッシュがあれば検出器を使わずにキャッシュから再生
+DETECTION_CACHE_FOLDER = os.path.join(RESULTS_FOLDER, "detection_cache")
+
+HISTOGRAM_WORKERS = None            # ヒストグラムを描画するプロセス数（None: CPU 数, 0: 並列にしない）
+HISTOGRAM_COMBINED = False          # メトリクスごとに全トラックを1枚の図にまとめる
+
+SCHEDULE_DETECTOR = False           # 動きの小さいフレームは検出せずに予測値でつなぐ（検出結果のキャッシュは保存しない）
+SCHEDULE_MOTION_THRESHOLD = 3.0     # 最後に検出したフレームとの差分（縮小グレースケールの平均絶対差）がこれ以上なら検出
+SCHEDULE_MAX_GAP = 5                # 検出せずにつなぐ最大の連続フレーム数
+
+LOG_LEVEL = "INFO"                  # "DEBUG" ならフレームごとの検出値・予測値・確定値も出力する
+TRACK_EXPORT = True                 # 追跡結果（フレーム・トラックごとのボックス, 判定値）を結果フォルダの tracks に保存
+FRAME_LOG = False                   # フレームごと・トラックごとの記録を結果フォルダの frames.jsonl に保存
+
+PROFILE = False                     # 段階ごとの処理時間を計測し, 結果フォルダに profile.csv / profile.json を保存
+PROFILE_OVERLAY = False             # 表示中のフレームに処理時間（p50/p95）を重ねる
+PROFILE_WINDOW = 300                # パーセンタイルを計算する直近のフレーム数
 
 YOLO_MODEL_PATH = "../models/yolov8x.pt"
 YOLO_CLASSES = [2]
-YOLO_MODEL = load_yolo_model(YOLO_MODEL_PATH)
+YOLO_CONF = 0.5
+YOLO_ROI = None             # 検出する領域 None:フレーム全体, (x1, y1, x2, y2):矩形, [(x, y), ...]:多角形
+YOLO_IMGSZ = None           # 推論時の入力解像度（例: 640）。None ならモデルの既定値
+TILED_INFERENCE = False     # 重なりのあるタイルに分けて検出する（遠くの小さい車両用。フレーム全体を拡大するより軽い）
+TILE_SIZE = 640             # タイルの一辺の画素数
+TILE_OVERLAP = 0.2          # 隣り合うタイルの重なりの割合
+WARM_UP = True              # 最初のフレームの前にダミーフレームで推論して初期化を済ませる
 
 MAX_MISSED_FRAME = TARGET_FPS * 1.5
+TRACK_HISTORY_SIZE = 30     # 1トラックあたりに保持する履歴フレーム数（予測は直近10フレームまで使用）
 
-TARGET_IDS = []
+TARGET_IDS = []         # 異常検知の対象トラック
+METRIC_IDS = [1]        # メトリクス（ヒストグラム）を記録するトラック
 
-def main():
-    os.makedirs(ANOMALIES_FOLDER, exist_ok=True)
-    os.makedirs(HISTOGRAMS_FOLDER, exist_ok=True)
+def tracking_params():
+    """追跡・予測・異常検知の設定"""
+    return {
+        "prediction_method": PREDICTION_METHOD,
+        "max_missed_frame": MAX_MISSED_FRAME,
+        "target_ids": TARGET_IDS,
+        "metric_ids": METRIC_IDS,
+        "track_history_size": TRACK_HISTORY_SIZE,
+    }
 
-    input_video_path = f"../videos/{INPUT_VIDEO_NAME}"
-    cap =   load_video(input_video_path)
-    original_fps = get_fps(cap)
-    frame_skip_interval = calculate_frame_skip_interval(original_fps, TARGET_FPS)
+def new_video_state(model, show_frame=SHOW_FRAME):
+    """1本の動画を処理する間の状態"""
+    state = new_tracking_state(tracking_params())
+    state.update({
+        "model": model,
+        "show_frame": show_frame,
+        "detection_cache": None,    # DetectionCacheWriter
+        "video_writer": None,       # AsyncVideoWriter（SAVE_VIDEO のとき）
+        "snapshots": None,          # AnomalySnapshotWriter（SAVE_ANOMALIES のとき）
+        "viewer": None,             # FrameViewer（表示するとき VIEWER なら）
+        "stopped": False,           # 'q' で途中終了したか
+        "profiler": create_profiler(PROFILE, PROFILE_WINDOW),
+        "roi": make_roi(YOLO_ROI),
+        "scheduler": DetectorScheduler(SCHEDULE_MOTION_THRESHOLD, SCHEDULE_MAX_GAP) if SCHEDULE_DETECTOR else None,
+        "tracker": create_tracker(model=model) if TILED_INFERENCE else None,  # タイル分割の検出で使う
+    })
+    return state
+
+def record_detections(frame_number, scored_detections, state):
+    """検出結果をキャッシュに書き出し, 信頼度を除いた (track_id, xyxy) のリストを返す"""
+    if state["detection_cache"] is not None:
+        state["detection_cache"].write_frame(frame_number, scored_detections)
+    return [(track_id, bbox) for track_id, bbox, _ in scored_detections]
+
+def should_detect(frame, state):
+    """このフレームで検出器を動かすか（SCHEDULE_DETECTOR でなければ毎フレーム）"""
+    return state["scheduler"] is None or state["scheduler"].should_detect(frame)
+
+def detect(frame, state):
+    """1フレームの検出（TILED_INFERENCE ならタイル分割で検出）"""
+    if TILED_INFERENCE:
+        return perform_yolo_tiled(frame, state["model"], state["tracker"], YOLO_CLASSES, YOLO_CONF, with_conf=True,
+                                  roi=state["roi"], imgsz=YOLO_IMGSZ, tile_size=TILE_SIZE, overlap=TILE_OVERLAP)
+    return perform_yolo(frame, state["model"], YOLO_CLASSES, YOLO_CONF, with_conf=True,
+                        roi=state["roi"], imgsz=YOLO_IMGSZ)
+
+def detect_and_track(frame_number, scored_detections, state):
+    """検出結果から予測・異常検知・置き換え（scored_detections が None なら検出しなかったフレーム）"""
+    if scored_detections is None:
+        return bridge_frame(frame_number, state)
+    detections = record_detections(frame_number, scored_detections, state)
+    return track_frame(frame_number, detections, state)
+
+def draw_frame(frame, detection_dict, predictions, state):
+    """フレームの描画"""
+    with state["profiler"].stage("draw"):
+        # frame = annotate_frame_with_tracking(frame, detection_dict, predictions, state["tracked_data"])  # すべて描画
+        # frame = annotate_frame_with_tracking(frame, detection_dict)     # YOLO検出値のみ描画
+        # frame = draw_predictions(frame, predictions)                    # 予測値のみ描画
+        # frame = draw_tracking_data(frame, state["tracked_data"])        # 確定値のみ描画
+        frame = annotate_frame_with_tracking(frame, detection_dict, predictions)
+        if PROFILE_OVERLAY:
+            frame = draw_text_overlay(frame, state["profiler"].overlay_lines())
+    return frame
+
+def save_anomalies(frame, frame_number, state):
+    """このフレームで異常と判定したトラックの画像を保存（描画前のフレームを渡す）"""
+    if state["snapshots"] is None or not state["frame_anomalies"]:
+        return
+    with state["profiler"].stage("snapshot"):
+        for track_id, (current_bbox, predicted_bbox) in state["frame_anomalies"].items():
+            state["snapshots"].submit(frame, frame_number, track_id, current_bbox, predicted_bbox)
+
+def save_frame(frame, state):
+    """描画したフレームを動画の書き込みキューに渡す"""
+    if state["video_writer"] is not None:
+        state["video_writer"].write(frame)
+
+def present(frame, frame_number, detection_dict, predictions, state):
+    """
+    フレームの描画・動画保存・ビューアーへの受け渡し
+    ビューアーで表示するだけなら描画はビューアーが表示するフレームだけ行う
+    :return: (描画したフレーム, 終了フラグ)（ビューアーを使わないときの表示は呼び出し側で行う）
+    """
+    viewer = state["viewer"]
+    render = None
+    if SAVE_VIDEO or (state["show_frame"] and viewer is None):
+        frame = draw_frame(frame, detection_dict, predictions, state)
+        save_frame(frame, state)
+    elif viewer is not None:
+        def render(image):
+            return draw_frame(image, detection_dict, predictions, state)
+    if viewer is None:
+        return frame, False
+    viewer.submit(frame_number, frame, render)
+    if viewer.wait_if_paused():     # 一時停止中はここで待つ
+        state["stopped"] = True
+        return frame, True
+    return frame, False
+
+def show(frame, frame_number, pause, state):
+    """フレームの表示 (一時停止フラグ, 終了フラグ) を返す"""
+    with state["profiler"].stage("display"):
+        pause, should_exit = display_frame(frame, frame_number, pause)
+    if should_exit:
+        state["stopped"] = True
+    return pause, should_exit
+
+def run_pipelined(cap, frame_skip_interval, state):
+    """デコード・推論・後処理を並行に実行"""
+    profiler = state["profiler"]
+
+    def detect_scheduled(frame):
+        if not should_detect(frame, state):
+            return None
+        with profiler.stage("inference"):
+            return detect(frame, state)
+
+    def postprocess(frame_number, frame, scored_detections):
+        logger.debug("=== Frame %s ===", frame_number)
+        profiler.start_frame(frame_number)
+        detection_dict, predictions = detect_and_track(frame_number, scored_detections, state)
+        save_anomalies(frame, frame_number, state)
+        pause = False
+        try:
+            frame, should_exit = present(frame, frame_number, detection_dict, predictions, state)
+            if should_exit:
+                return True
+            # 一時停止中は同じフレームを表示し続ける（後段が止まるので上流も待つ）
+            while state["show_frame"] and state["viewer"] is None:
+                pause, should_exit = show(frame, frame_number, pause, state)
+                if should_exit:
+                    return True
+                if not pause:
+                    break
+            return False
+        finally:
+            profiler.end_frame(len(state["tracked_data"]))
+
+    stats = run_pipeline(cap, frame_skip_interval, detect_scheduled, postprocess,
+                         queue_size=PIPELINE_QUEUE_SIZE, policy=PIPELINE_QUEUE_POLICY, profiler=profiler)
+    print(f"処理フレーム数: {stats['frames']}, "
+          f"破棄フレーム数 (デコード/推論): {stats['dropped_decode']}/{stats['dropped_inference']}")
 
-    tracked_data = {}
-    missed_frames = {}
-    metrics = {"iou":{}, "area":{}, "aspect":{}}    # 初期化
+def run_offline_batched(cap, frame_skip_interval, state):
+    """BATCH_SIZE フレームずつまとめて検出し, 後処理はフレーム順に行う"""
+    tracker = None if TILED_INFERENCE else create_tracker(model=state["model"])
+    profiler = state["profiler"]
     frame_number = 0
-    pause = False
-    predict_bbox = get_prediction_function(PREDICTION_METHOD)
+    while cap.isOpened():
+        frames = []
+        batch_start = time.perf_counter()
+        while len(frames) < BATCH_SIZE:
+            ret, frame = process_frame(cap, frame_skip_interval)
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            break
+        decode_time = time.perf_counter() - batch_start
+        detect_flags = [should_detect(frame, state) for frame in frames]
+        inference_start = time.perf_counter()
+        targets = [frame for frame, run_detector in zip(frames, detect_flags) if run_detector]
+        if TILED_INFERENCE:     # タイルは1フレーム分を1回のバッチで推論する
+            batch_detections = iter([detect(frame, state) for frame in targets])
+        else:
+            batch_detections = iter(perform_yolo_batch(targets, state["model"], tracker, YOLO_CLASSES, YOLO_CONF,
+                                                       with_conf=True, roi=state["roi"], imgsz=YOLO_IMGSZ)
+                                    if targets else [])
+        inference_time = time.perf_counter() - inference_start
+        for frame, run_detector in zip(frames, detect_flags):
+            scored_detections = next(batch_detections) if run_detector else None
+            frame_number += 1
+            logger.debug("=== Frame %s ===", frame_number)
+            profiler.start_frame(frame_number)
+            # デコードと推論はバッチ単位なので1フレームあたりに按分
+            profiler.add("decode", decode_time / len(frames))
+            profiler.add("inference", inference_time / len(frames))
+            detection_dict, predictions = detect_and_track(frame_number, scored_detections, state)
+            save_anomalies(frame, frame_number, state)
+            frame, _ = present(frame, frame_number, detection_dict, predictions, state)
+            if state["show_frame"] and state["viewer"] is None:
+                show(frame, frame_number, False, state)
+            profiler.end_frame(len(state["tracked_data"]))
+            if state["stopped"]:
+                return
+        if len(frames) < BATCH_SIZE:
+            break
 
+def run_serial(cap, frame_skip_interval, state):
+    """1フレームずつ デコード → 検出 → 後処理 → 表示 を順に実行"""
+    profiler = state["profiler"]
+    frame_number = 0
+    pause = False
     while cap.isOpened():
         if not pause:
-            ret, frame = process_frame(cap, frame_skip_interval)
+            profiler.start_frame(frame_number + 1)
+            ret, frame = process_frame(cap, frame_skip_interval, profiler)
             if not ret:
                 break
             frame_number += 1
-            print(f"=== Frame {frame_number} ===")
-
-            # 検出と予測
-            detection_dict, predictions = process_frame_data(frame, YOLO_MODEL, YOLO_CLASSES, tracked_data, predict_bbox)
-
-            # 検出値と予測値を確認
-            log.log_predictions_and_detections(detection_dict, predictions)
-
-            anomalies = {}
-            for track_id in list(tracked_data.keys()):
-                # 各トラックIDに対して未検出フレームをカウント
-                if track_id not in detection_dict:  # 現在検出されていない場合
-                    missed_frames[track_id] = missed_frames.get(track_id, 0) + 1
-                    if missed_frames[track_id] > MAX_MISSED_FRAME:
-                        # print(f"Track ID {track_id} removed after {MAX_MISSED_FRAME} missed frames")
-                        del tracked_data[track_id]  # `tracked_data`から削除
-                        del missed_frames[track_id]  # `missed_frames`からも削除
-                        continue  # 次のトラックIDの処理に移る
-                else:
-                    missed_frames[track_id] = 0  # 検出された場合はカウンタをリセット
-                if track_id not in TARGET_IDS:
-                    continue
-                current_bbox = detection_dict.get(track_id)
-                predicted_bbox = predictions.get(track_id)
-                previous_bbox = (
-                    tracked_data[track_id][-2]
-                    if len(tracked_data[track_id]) > 1
-                    else None
-                )
-                if current_bbox and predicted_bbox:
-                    target_ids = [1]
-                    update_metrics(metrics, track_id, current_bbox, predicted_bbox, previous_bbox, target_ids)
-                    # 異常検知
-                    is_anomaly, _ = detect_combined_anomalies(current_bbox, previous_bbox, predicted_bbox)
-                    anomalies[track_id] = is_anomaly
-
-                # 異常時の置き換え処理
-                anomaly.handle_replace(detection_dict, predictions, anomalies, tracked_data)
-
-            # 確定情報の確認
-            log.display_latest_tracked_data(tracked_data, frame_number)
+            logger.debug("=== Frame %s ===", frame_number)
+
+            # 検出と予測, 異常検知
+            scored_detections = None
+            if should_detect(frame, state):
+                with profiler.stage("inference"):
+                    scored_detections = detect(frame, state)
+            detection_dict, predictions = detect_and_track(frame_number, scored_detections, state)
+            save_anomalies(frame, frame_number, state)
 
             # フレームの描画
-            if SHOW_FRAME or SAVE_VIDEO:
-                # frame = annotate_frame_with_tracking(frame, detection_dict, predictions, tracked_data)  # すべて描画
-                # frame = annotate_frame_with_tracking(frame, detection_dict)     # YOLO検出値のみ描画
-                # frame = draw_predictions(frame, predictions)                    # 予測値のみ描画
-                # frame = draw_tracking_data(frame, tracked_data)                 # 確定値のみ描画
-                frame = annotate_frame_with_tracking(frame, detection_dict, predictions)
+            frame, should_exit = present(frame, frame_number, detection_dict, predictions, state)
+            if should_exit:
+                profiler.end_frame(len(state["tracked_data"]))
+                break
         # フレームの表示
-        if SHOW_FRAME:
-            pause, should_exit = display_frame(
-                frame, frame_number, pause, metrics, HISTOGRAMS_FOLDER
-            )
+        if state["show_frame"] and state["viewer"] is None:
+            pause, should_exit = show(frame, frame_number, pause, state)
             if should_exit:
                 break
+        profiler.end_frame(len(state["tracked_data"]))
+
+def run_replay(cache, state):
+    """キャッシュした検出結果から予測・異常検知・置き換え・メトリクス更新をやり直す（デコード・検出なし）"""
+    profiler = state["profiler"]
+    for frame_number, detections in cache.iter_frames():
+        profiler.start_frame(frame_number)
+        track_frame(frame_number, detections, state)
+        profiler.end_frame(len(state["tracked_data"]))
 
-    save_all_histograms(metrics, HISTOGRAMS_FOLDER)     # ヒストグラムの作成と保存
+def detection_settings():
+    """キャッシュのキーに含める設定"""
+    settings = {"classes": YOLO_CLASSES, "conf": YOLO_CONF, "target_fps": TARGET_FPS}
+    if FRAME_SOURCE_MODE is not None:   # FrameSource は TARGET_FPS ちょうどに間引く（従来の int(元FPS // TARGET_FPS) ごととは別のフレーム）
+        settings["sampling"] = "exact"  # grab / seek / auto は同じフレームを選ぶので区別しない
+    if YOLO_ROI is not None or YOLO_IMGSZ is not None:  # 未指定なら以前のキャッシュと同じキー
+        settings.update({"roi": YOLO_ROI, "imgsz": YOLO_IMGSZ})
+    if TILED_INFERENCE:
+        settings.update({"tile_size": TILE_SIZE, "tile_overlap": TILE_OVERLAP})
+    return settings
 
-    cap.release()
-    cv2.destroyAllWindows()
+def close_outputs(state, failed=False):
+    """
+    検出結果のキャッシュ・動画・異常検知フレーム・フレームごとの記録・追跡結果を閉じる
+    :param failed: 処理が例外で止まったか（キャッシュは未完了にし, 閉じるときの例外はログに出すだけにする）
+    """
+    stopped = state["stopped"] or failed
+
+    def close_video_writer(writer):
+        video_stats = writer.close()
+        print(f"動画を保存しました: {video_stats['path']} "
+              f"(書き込み {video_stats['written']} / 破棄 {video_stats['dropped']} フレーム)")
+
+    closers = {
+        "detection_cache": lambda cache: cache.close(complete=not stopped),
+        "video_writer": close_video_writer,
+        "snapshots": lambda snapshots: snapshots.close(),   # 保存に失敗した画像は数えるだけ（動画の保存の失敗は送出）
+        "frame_log": lambda frame_log: frame_log.close(),
+        "track_export": lambda export: export.close(frames=state["frame_count"], stopped=stopped),
+    }
+    errors = []
+    for key, close in closers.items():
+        if state[key] is None:
+            continue
+        try:
+            close(state[key])
+        except Exception as e:  # 1つ閉じられなくても残りは閉じる
+            logger.error("%s を閉じられませんでした: %r", key, e)
+            errors.append(e)
+    if errors and not failed:
+        raise errors[0]
+
+def process_video(input_video_path, model, anomalies_folder=ANOMALIES_FOLDER, histograms_folder=HISTOGRAMS_FOLDER,
+                  show_frame=SHOW_FRAME, model_path=YOLO_MODEL_PATH, histogram_workers=HISTOGRAM_WORKERS):
+    """
+    1本の動画を処理して結果を保存する
+    REPLAY_FROM_CACHE で検出結果のキャッシュがあれば, フレームを読まずにキャッシュから再生する
+    :return: 処理結果の概要（フレーム数, トラック数, 異常検知数, 処理時間）
+    """
+    os.makedirs(anomalies_folder, exist_ok=True)
+    os.makedirs(histograms_folder, exist_ok=True)
+    start = time.perf_counter()
+    state = new_video_state(model, show_frame)
+    results_folder = os.path.dirname(os.path.abspath(histograms_folder))     # 結果フォルダ（histograms_folder の親）
+    if FRAME_LOG:
+        state["frame_log"] = log.FrameRecordSink(os.path.join(results_folder, "frames.jsonl"))
+    if TRACK_EXPORT:
+        state["track_export"] = TrackExportWriter(os.path.join(results_folder, "tracks"))
+        state["track_export"].begin_video(input_video_path)
+
+    cap = None
+    failed = False
+    try:
+        cap = load_video(input_video_path)
+        if cap is None:
+            raise ValueError(f"動画を開けません: {input_video_path}")
+        # キャッシュのキーは動画ファイルの情報を使うので, 動画を開けてから決める
+        detection_cache_folder = cache_folder(DETECTION_CACHE_FOLDER, input_video_path, model_path,
+                                              detection_settings())
+        cache = open_detection_cache(detection_cache_folder) if REPLAY_FROM_CACHE else None
+        if cache is not None:
+            cap.release()   # キャッシュから再生するときはフレームを読まない
+            cap = None
+            print(f"キャッシュから再生します: {detection_cache_folder}")
+            run_replay(cache, state)
+        else:
+            original_fps = get_fps(cap)
+            reset_tracker(model)    # 同じモデルで前に処理した動画のトラックを引き継がない
+            if WARM_UP:
+                width, height = cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                warm_up_time = warm_up_model(   # 検出と同じ入力（ROI, imgsz, タイル, バッチ）で推論する
+                    model, width, height, YOLO_CLASSES, YOLO_CONF, roi=state["roi"], imgsz=YOLO_IMGSZ,
+                    tile_size=TILE_SIZE if TILED_INFERENCE else None, overlap=TILE_OVERLAP,
+                    batch_size=BATCH_SIZE if not PIPELINE and not TILED_INFERENCE and BATCH_SIZE > 1 else 1)
+                print(f"ウォームアップ: {warm_up_time:.2f} 秒")
+            frame_skip_interval = calculate_frame_skip_interval(original_fps, TARGET_FPS)
+            if FRAME_SOURCE_MODE is not None:
+                cap = FrameSource(cap, original_fps, TARGET_FPS, FRAME_SOURCE_MODE)
+            if DETECTION_CACHE and state["scheduler"] is None:  # 飛ばしたフレームは検出結果がないのでキャッシュしない
+                state["detection_cache"] = DetectionCacheWriter(
+                    detection_cache_folder, input_video_path, model_path, detection_settings())
+            if SAVE_VIDEO:      # 出力 FPS は間引き後の TARGET_FPS
+                name = os.path.splitext(os.path.basename(input_video_path))[0]
+                state["video_writer"] = AsyncVideoWriter(
+                    os.path.join(VIDEO_FOLDER, f"{name}_tracked.{VIDEO_CONTAINER}"), TARGET_FPS, VIDEO_CODEC,
+                    VIDEO_QUEUE_SIZE, VIDEO_QUEUE_POLICY)
+
+            if SAVE_ANOMALIES:
+                state["snapshots"] = AnomalySnapshotWriter(
+                    anomalies_folder, ANOMALY_CROP, ANOMALY_CROP_PADDING, ANOMALY_JPEG_QUALITY, ANOMALY_MIN_INTERVAL,
+                    ANOMALY_WORKERS)
+
+            if show_frame and VIEWER:
+                state["viewer"] = FrameViewer(VIEWER_MAX_FPS)
+
+            if PIPELINE:
+                runner = run_pipelined
+            elif BATCH_SIZE > 1:
+                runner = run_offline_batched
+            else:
+                runner = run_serial
+            if state["viewer"] is not None:     # 表示はこのスレッド（メインスレッド）, 処理は処理スレッドで行う
+                state["viewer"].run(lambda: runner(cap, frame_skip_interval, state))
+            else:
+                runner(cap, frame_skip_interval, state)
+    except BaseException:
+        failed = True
+        raise
+    finally:    # 例外で止まっても書きかけの出力を閉じる（検出結果のキャッシュは未完了のまま残す）
+        close_outputs(state, failed)
+        if cap is not None:
+            cap.release()
+            if show_frame and state["viewer"] is None:  # ビューアーのウィンドウはビューアーが閉じる
+                cv2.destroyAllWindows()
+
+    save_all_histograms(state["metrics"], histograms_folder,     # ヒストグラムの作成と保存
+                        workers=histogram_workers, combined=HISTOGRAM_COMBINED)
+    state["profiler"].save(results_folder)  # 処理時間（結果フォルダに保存）
+
+    summary = {
+        "video": input_video_path,
+        "frames": state["frame_count"],
+        "tracks": len(state["track_ids"]),
+        "anomalies": int(state["anomaly_count"]),
+        "elapsed_sec": time.perf_counter() - start,
+    }
+    if state["scheduler"] is not None:
+        summary["detector"] = state["scheduler"].stats()     # 検出器の呼び出し回数と削減率
+    if state["snapshots"] is not None:
+        summary["snapshots"] = state["snapshots"].stats()    # 保存した・間引いた・捨てた・保存に失敗した異常検知フレーム数
+    if state["video_writer"] is not None:
+        summary["video_output"] = state["video_writer"].stats()  # 書き込んだ・捨てたフレーム数
+    return summary
+
+def main():
+    log.configure(LOG_LEVEL)
+    input_video_path = f"../videos/{INPUT_VIDEO_NAME}"
+    summary = process_video(input_video_path, get_yolo_model(YOLO_MODEL_PATH))   # モデルはここで初めて読み込む
+    print(json.dumps(summary, ensure_ascii=False, indent=4))
 
 
 if __name__ == "__main__":
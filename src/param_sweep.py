@@ -0,0 +1,120 @@
+"""
+キャッシュした検出結果を使った閾値・パラメータの探索
+探索空間（グリッド or ランダム）の各設定で検出キャッシュを再生し,
+異常検知数と IoU / 面積比 / 縦横比の分布を表（CSV）にまとめる
+実行例（リポジトリのルートで）:
+    python -m src.param_sweep results/detection_cache/minokamo_08_hide2_* --output results/sweep.csv --workers 8
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from src.detection_cache import open_detection_cache
+from src.streaming_metrics import StreamingMetric
+from src.tracking import new_tracking_state, track_frame
+
+# 既定の探索空間（tracking.DEFAULT_PARAMS のキー -> 候補）
+DEFAULT_SPACE = {
+    "iou_threshold": [0.90, 0.95, 0.98],
+    "area_threshold": [0.90, 0.95, 0.98],
+    "ratio_threshold": [0.90, 0.95, 0.98],
+    "outlier_threshold": [1.0, 1.5, 2.0],
+    "num_frames": [6, 10],
+    "max_missed_frame": [10, 15, 30],
+}
+METRIC_QUANTILES = [0.1, 0.5, 0.9]
+
+
+def grid_space(space):
+    """探索空間の全組み合わせ"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_space(space, num_samples, seed=0):
+    """
+    探索空間からランダムに num_samples 個の設定を選ぶ
+    候補がリストならその中から, (low, high) のタプルなら一様分布から選ぶ
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(num_samples):
+        config = {}
+        for name, candidates in space.items():
+            if isinstance(candidates, tuple):
+                low, high = candidates
+                config[name] = rng.randint(low, high) if isinstance(low, int) else rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(candidates)
+        configs.append(config)
+    return configs
+
+def summarize_metric(metric):
+    """1つのメトリクス（StreamingMetric）の分布（平均と分位点）"""
+    if len(metric) == 0:
+        return {"mean": None, **{f"p{int(q * 100)}": None for q in METRIC_QUANTILES}}
+    return {"mean": metric.mean, **{f"p{int(q * 100)}": metric.quantile(q) for q in METRIC_QUANTILES}}
+
+def evaluate_config(cache_folders, config, base_params=None):
+    """
+    1つの設定で全キャッシュを再生して結果をまとめる
+    :return: 設定 + frames, tracks, anomalies, 各メトリクスの分布 の1行分の辞書
+    """
+    params = {**(base_params or {}), **config, "verbose": False}
+    row = dict(config)
+    frames = tracks = anomalies = 0
+    collected = {"iou": StreamingMetric(), "area": StreamingMetric(), "aspect": StreamingMetric()}
+    for folder in cache_folders:    # ログは verbose=False と "src" のログレベルで抑える
+        cache = open_detection_cache(folder)
+        if cache is None:
+            continue
+        state = new_tracking_state(params)
+        for frame_number, detections in cache.iter_frames():
+            track_frame(frame_number, detections, state)
+        frames += state["frame_count"]
+        tracks += len(state["track_ids"])
+        anomalies += state["anomaly_count"]
+        for name, track_metrics in state["metrics"].items():
+            for metric in track_metrics.values():
+                collected[name].merge(metric)
+    row.update({"frames": frames, "tracks": tracks, "anomalies": int(anomalies),
+                "anomaly_rate": anomalies / frames if frames else 0.0})
+    for name, metric in collected.items():
+        for stat, value in summarize_metric(metric).items():
+            row[f"{name}_{stat}"] = value
+    return row
+
+def run_sweep(cache_folders, configs, output_path, workers=None, base_params=None):
+    """全設定をプロセスプールで評価して CSV に保存"""
+    configs = list(configs)
+    if not configs:
+        raise ValueError("探索する設定がありません。")
+    cache_folders = [folder for folder in cache_folders if open_detection_cache(folder) is not None]
+    if not cache_folders:
+        raise ValueError("完了済みの検出キャッシュがありません。")
+    print(f"キャッシュ数: {len(cache_folders)}, 設定数: {len(configs)}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(evaluate_config, itertools.repeat(cache_folders), configs,
+                             itertools.repeat(base_params)))
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"探索結果を保存しました: {output_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("caches", nargs="+", help="検出キャッシュのフォルダ")
+    parser.add_argument("--output", default="../results/sweep.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--random", type=int, default=0, help="ランダム探索の設定数（0 ならグリッド探索）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--method", default="quadratic_weight", help="予測方法")
+    args = parser.parse_args()
+    configs = random_space(DEFAULT_SPACE, args.random, args.seed) if args.random else grid_space(DEFAULT_SPACE)
+    run_sweep(args.caches, configs, args.output, args.workers, base_params={"prediction_method": args.method})
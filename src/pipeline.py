@@ -0,0 +1,137 @@
+import threading
+from collections import deque
+
+from src.yolo_handler import process_frame
+from src.profiler import NULL_PROFILER
+
+QUEUE_POLICIES = ("block", "drop_oldest")
+_END = object()     # 終端を表す番兵
+
+
+class BoundedQueue:
+    """
+    容量付きキュー
+    満杯のとき "block" は空きが出るまで待ち, "drop_oldest" は一番古い要素を捨てて追加する
+    """
+
+    def __init__(self, maxsize, policy="block"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown policy:{policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item):
+        """要素を追加（close 済みなら False）"""
+        with self._cond:
+            while len(self._items) >= self.maxsize and self.policy == "block" and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self):
+        """要素を取り出す（close 済みで空なら _END）"""
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return _END
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """これ以上追加しない。待っているスレッドを起こす"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """残っている要素も捨てて close する（途中終了用）"""
+        with self._cond:
+            self._items.clear()
+            self._closed = True
+            self._cond.notify_all()
+
+
+def run_pipeline(cap, frame_skip_interval, detect, postprocess, queue_size=8, policy="block",
+                 profiler=NULL_PROFILER):
+    """
+    デコード → 推論 → 後処理 をスレッドで並行に実行
+    デコードと推論は別スレッド, 後処理（予測・異常検知・描画・表示）は呼び出し元スレッドで行う
+    （cv2.imshow などの GUI 操作を1つのスレッドにまとめるため）
+    :param detect: detect(frame) -> detections
+    :param postprocess: postprocess(frame_number, frame, detections) -> True なら終了
+    :param policy: キューが満杯のときの動作 "block" or "drop_oldest"
+    :param profiler: デコードの所要時間を記録する StageProfiler
+    :return: {"frames": 後処理したフレーム数, "dropped_decode": ..., "dropped_inference": ...}
+    """
+    decoded = BoundedQueue(queue_size, policy)
+    detected = BoundedQueue(queue_size, policy)
+    errors = []
+
+    def decode_worker():
+        frame_number = 0
+        try:
+            while cap.isOpened():
+                ret, frame = process_frame(cap, frame_skip_interval, profiler)
+                if not ret:
+                    break
+                frame_number += 1
+                if not decoded.put((frame_number, frame)):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            decoded.close()
+
+    def inference_worker():
+        try:
+            while True:
+                item = decoded.get()
+                if item is _END:
+                    break
+                frame_number, frame = item
+                if not detected.put((frame_number, frame, detect(frame))):
+                    break
+        except Exception as e:
+            errors.append(e)
+            decoded.cancel()
+        finally:
+            detected.close()
+
+    threads = [threading.Thread(target=decode_worker, name="decode", daemon=True),
+               threading.Thread(target=inference_worker, name="inference", daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    processed = 0
+    try:
+        while True:
+            item = detected.get()
+            if item is _END:
+                break
+            processed += 1
+            if postprocess(*item):
+                break
+    finally:
+        decoded.cancel()
+        detected.cancel()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return {"frames": processed, "dropped_decode": decoded.dropped, "dropped_inference": detected.dropped}
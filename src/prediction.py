@@ -1,27 +1,53 @@
+import logging
+from functools import lru_cache, partial
+
 import numpy as np
 
-def get_prediction_function(method):
-    """予測方法を動的に切り替える"""
+from src.kalman_filter import KalmanBoxPredictor
+from src.incremental_fit import IncrementalQuadraticPredictor
+
+logger = logging.getLogger(__name__)
+
+def get_prediction_function(method, **options):
+    """
+    予測方法を動的に切り替える
+    options: num_frames（参照フレーム数）, outlier_threshold（外れ値除去の IQR 倍率）
+    """
     if method == "linear":
-        return predict_bbox_linear
+        return _with_options(predict_bbox_linear, options, "num_frames")
     if method == "quadratic":
-        return predict_bbox_quadratic
+        return _with_options(predict_bbox_quadratic, options, "num_frames")
     if method == "kalman":
-        return predict_bbox_kalman
+        return KalmanBoxPredictor()     # トラックの状態を持つので実行ごとに生成
     if method == "quadratic_weight":
-        return predict_bbox_quadratic_weighted_with_outlier_removal
+        return _with_options(predict_bbox_quadratic_weighted_with_outlier_removal, options,
+                             "num_frames", "outlier_threshold")
+    # 以下はウィンドウを毎回フィットし直さず, モーメントを逐次更新する版（結果は上と同じ）
+    if method == "quadratic_incremental":
+        return IncrementalQuadraticPredictor(num_frames=options.get("num_frames", 10), weighting="none")
+    if method == "quadratic_weight_incremental":
+        return IncrementalQuadraticPredictor(
+            num_frames=options.get("num_frames", 10), weighting="linspace",
+            outlier_threshold=options.get("outlier_threshold", 1.5),
+            fallback=_with_options(predict_bbox_quadratic_weighted_with_outlier_removal, options,
+                                   "outlier_threshold"))
     else:
         raise ValueError(f"Unknown:{method}")
 
+def _with_options(predict_bbox, options, *names):
+    """予測関数の引数を固定（指定がなければ関数そのものを返す）"""
+    kwargs = {name: options[name] for name in names if name in options}
+    return partial(predict_bbox, **kwargs) if kwargs else predict_bbox
+
 def predict_bbox_linear(tracked_data, track_id, num_frames=4):
     """線形補完を用いた次フレームの予測"""
     if track_id not in tracked_data or len(tracked_data[track_id]) < num_frames:
-        print(f"データ不足：{track_id}")
+        logger.debug("データ不足：%s", track_id)
         return None     # データが不足している場合, 予測不可
     recent_bboxes = tracked_data[track_id][-num_frames:]
     # print(f"ID-{track_id}, 参照データ：{recent_bboxes}")
     if any(bbox is None for bbox in recent_bboxes):
-        print(f"Noneが含まれている：{track_id}")
+        logger.debug("Noneが含まれている：%s", track_id)
         return None     # Noneが含まれている場合, 予測不可
     deltas = [recent_bboxes[i + 1][j] - recent_bboxes[i][j] for i in range(num_frames - 1) for j in range(4)]
     avg_delta = [sum(deltas[i::4]) / (num_frames - 1) for i in range(4)]
@@ -31,11 +57,11 @@ def predict_bbox_linear(tracked_data, track_id, num_frames=4):
 def predict_bbox_quadratic(tracked_data, track_id, num_frames=10):
     """二次補完を使用して次のフレームのバウンディングボックスを予測"""
     if track_id not in tracked_data or len(tracked_data[track_id]) < num_frames:
-        print(f"データ不足；{track_id}")
+        logger.debug("データ不足；%s", track_id)
         return None     # データが不足している場合, 予測不可
     recent_bboxes = tracked_data[track_id][-num_frames:]
     if any(bbox is None for bbox in recent_bboxes):
-        print(f"Noneが含まれている：{track_id}")
+        logger.debug("Noneが含まれている：%s", track_id)
         return None     # Noneが含まれている場合, 予測不可
     frames = np.arange(-num_frames + 1, 1)  # フレーム番号（例: [-2, -1, 0]）
     predicted_bbox = []
@@ -46,18 +72,32 @@ def predict_bbox_quadratic(tracked_data, track_id, num_frames=10):
         predicted_bbox.append(next_value)
     return predicted_bbox
 
-def predict_bbox_kalman():
-    """カルマンフィルターを利用してバウンディングボックスを予測"""
-    pass
+def predict_bbox_kalman(tracked_data, track_id, num_frames=10):
+    """
+    カルマンフィルターを利用してバウンディングボックスを予測
+    直近 num_frames 件の履歴でフィルターを回す（状態を持たない版）
+    毎フレーム状態を更新する版は get_prediction_function("kalman") の KalmanBoxPredictor
+    """
+    if track_id not in tracked_data or len(tracked_data[track_id]) < 3:
+        logger.debug("データ不足；%s", track_id)
+        return None
+    recent_bboxes = tracked_data[track_id][-num_frames:]
+    if any(bbox is None for bbox in recent_bboxes):
+        logger.debug("Noneが含まれている：%s", track_id)
+        return None
+    kalman = KalmanBoxPredictor()
+    for bbox in recent_bboxes:
+        kalman.observe({track_id: bbox})
+    return kalman.predict_all([track_id])[track_id]
 
 def predict_bbox_quadratic_weighted(tracked_data, track_id, num_frames=10):
     """重み付けを使用して二次補完による次フレームのバウンディングボックスを予測"""
     if track_id not in tracked_data or len(tracked_data[track_id]) < num_frames:
-        print(f"データ不足；{track_id}")
+        logger.debug("データ不足；%s", track_id)
         return None     # データが不足している場合, 予測不可
     recent_bboxes = tracked_data[track_id][-num_frames:]
     if any(bbox is None for bbox in recent_bboxes):
-        print(f"Noneが含まれている：{track_id}")
+        logger.debug("Noneが含まれている：%s", track_id)
         return None     # Noneが含まれている場合, 予測不可
     frames = np.arange(-num_frames + 1, 1)  # フレーム番号（例: [-9, ..., 0]）
     weights = np.exp(-np.abs(frames))       # 過去のフレームほど重視（例: 指数関数で重み付け）
@@ -78,14 +118,14 @@ def detect_outliers(data, threshold=1.5):
     upper_bound = q3 + threshold * iqr
     return [x for x in data if lower_bound <= x <= upper_bound]
 
-def predict_bbox_quadratic_weighted_with_outlier_removal(tracked_data, track_id, num_frames=10):
+def predict_bbox_quadratic_weighted_with_outlier_removal(tracked_data, track_id, num_frames=10, outlier_threshold=1.5):
     """二次補完 + 重み付け + 外れ値除去"""
     if track_id not in tracked_data or len(tracked_data[track_id]) < num_frames:
-        print(f"データ不足；{track_id}")
+        logger.debug("データ不足；%s", track_id)
         return None
     recent_bboxes = tracked_data[track_id][-num_frames:]
     if any(bbox is None for bbox in recent_bboxes):
-        print(f"Noneが含まれている：{track_id}")
+        logger.debug("Noneが含まれている：%s", track_id)
         return None
     frames = np.arange(-num_frames + 1, 1)  # フレーム番号
 
@@ -93,9 +133,9 @@ def predict_bbox_quadratic_weighted_with_outlier_removal(tracked_data, track_id,
     for j in range(4):  # x1, y1, x2, y2 の順に処理
         coords = [recent_bboxes[i][j] for i in range(num_frames)]
         # 外れ値除去
-        filtered_coords = detect_outliers(coords)
+        filtered_coords = detect_outliers(coords, outlier_threshold)
         if len(filtered_coords) < 3:  # データが少なすぎる場合
-            print(f"有効なデータが不足しています：{track_id}, {filtered_coords}")
+            logger.debug("有効なデータが不足しています：%s, %s", track_id, filtered_coords)
             return None
         # 重み計算（最新フレームが最小の重み）
         weights = np.linspace(1.0, 2.0, len(filtered_coords))
@@ -105,6 +145,112 @@ def predict_bbox_quadratic_weighted_with_outlier_removal(tracked_data, track_id,
         predicted_bbox.append(next_value)
     return predicted_bbox
 
+@lru_cache(maxsize=None)
+def _prediction_row(method, num_frames):
+    """
+    次フレームの予測値を「直近 num_frames 件の線形結合」として表す係数ベクトルを計算
+    frames が固定なので計画行列と擬似逆行列は一度だけ計算すればよい
+    """
+    frames = np.arange(-num_frames + 1, 1)
+    if method == "linear":
+        # 平均差分 (last - first) / (n - 1) を最新値に足す
+        row = np.zeros(num_frames)
+        row[-1] = 1 + 1 / (num_frames - 1)
+        row[0] -= 1 / (num_frames - 1)
+        return row
+    design = np.vander(frames, 3)                   # [t^2, t, 1]
+    if method == "quadratic":
+        weights = np.ones(num_frames)
+    elif method == "quadratic_exp_weight":
+        weights = np.exp(-np.abs(frames))           # predict_bbox_quadratic_weighted と同じ重み
+    elif method == "quadratic_linspace_weight":
+        weights = np.linspace(1.0, 2.0, num_frames) # 外れ値除去版で外れ値がないときと同じ重み
+    else:
+        raise ValueError(f"Unknown:{method}")
+    # polyfit(w=weights) と同じく行に重みを掛けて最小二乗
+    pinv = np.linalg.pinv(design * weights[:, None]) * weights
+    return np.vander([1], 3)[0] @ pinv              # t=1 での値
+
+def _predict_batch(method, windows):
+    windows = np.asarray(windows, dtype=np.float64)
+    row = _prediction_row(method, windows.shape[1])
+    return np.einsum("w,nwc->nc", row, windows)
+
+def predict_bbox_linear_batch(windows):
+    """
+    線形補完の一括予測
+    :param windows: (n_tracks, num_frames, 4) の配列
+    :return: (n_tracks, 4) の予測値
+    """
+    return _predict_batch("linear", windows)
+
+def predict_bbox_quadratic_batch(windows):
+    """二次補完の一括予測 (n_tracks, num_frames, 4) -> (n_tracks, 4)"""
+    return _predict_batch("quadratic", windows)
+
+def predict_bbox_quadratic_weighted_batch(windows):
+    """重み付け二次補完の一括予測 (n_tracks, num_frames, 4) -> (n_tracks, 4)"""
+    return _predict_batch("quadratic_exp_weight", windows)
+
+def predict_bbox_quadratic_weighted_with_outlier_removal_batch(windows, outlier_threshold=1.5):
+    """
+    二次補完 + 重み付け + 外れ値除去の一括予測 (n_tracks, num_frames, 4) -> (n_tracks, 4)
+    外れ値のないウィンドウだけをまとめて計算し, 外れ値のあるウィンドウの行は NaN にする
+    （predict_tracks が1トラックずつの予測関数で計算し直す）
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    q1, q3 = np.percentile(windows, [25, 75], axis=1)      # detect_outliers と同じ境界
+    iqr = q3 - q1
+    outliers = ((windows < (q1 - outlier_threshold * iqr)[:, None])
+                | (windows > (q3 + outlier_threshold * iqr)[:, None])).any(axis=(1, 2))
+    predicted = np.full((len(windows), 4), np.nan)
+    if not outliers.all():
+        predicted[~outliers] = _predict_batch("quadratic_linspace_weight", windows[~outliers])
+    return predicted
+
+# 1トラックずつの予測関数 -> (一括予測関数, 参照フレーム数)
+# 一括予測関数が NaN を返した行は1トラックずつの予測関数で計算する
+BATCH_PREDICTORS = {
+    predict_bbox_linear: (predict_bbox_linear_batch, 4),
+    predict_bbox_quadratic: (predict_bbox_quadratic_batch, 10),
+    predict_bbox_quadratic_weighted: (predict_bbox_quadratic_weighted_batch, 10),
+    predict_bbox_quadratic_weighted_with_outlier_removal: (predict_bbox_quadratic_weighted_with_outlier_removal_batch, 10),
+}
+
+def gather_windows(tracked_data, track_ids, num_frames):
+    """履歴が num_frames 件以上あるトラックの直近 num_frames 件を (n, num_frames, 4) にまとめる"""
+    if hasattr(tracked_data, "windows"):
+        return tracked_data.windows(track_ids, num_frames)
+    ready = [track_id for track_id in track_ids
+             if track_id in tracked_data and len(tracked_data[track_id]) >= num_frames
+             and not any(bbox is None for bbox in tracked_data[track_id][-num_frames:])]
+    windows = np.array([tracked_data[track_id][-num_frames:] for track_id in ready], dtype=np.float64)
+    return ready, windows.reshape(len(ready), num_frames, 4)
+
+def predict_tracks(tracked_data, predict_bbox, track_ids=None):
+    """
+    全トラックの次フレームを予測して {track_id: bbox or None} を返す
+    一括予測版がある予測方法はまとめて1回で計算する
+    """
+    if track_ids is None:
+        track_ids = list(tracked_data.keys())
+    if hasattr(predict_bbox, "predict_all"):    # 状態を持つ予測器（カルマン）は全トラックを一度に予測
+        return predict_bbox.predict_all(track_ids)
+    function = predict_bbox.func if isinstance(predict_bbox, partial) else predict_bbox
+    if function not in BATCH_PREDICTORS:
+        return {track_id: predict_bbox(tracked_data, track_id) for track_id in track_ids}
+    predict_batch, num_frames = BATCH_PREDICTORS[function]
+    options = dict(predict_bbox.keywords) if isinstance(predict_bbox, partial) else {}
+    num_frames = options.pop("num_frames", num_frames)
+    predictions = dict.fromkeys(track_ids)      # データ不足のトラックは None
+    ready, windows = gather_windows(tracked_data, track_ids, num_frames)
+    if ready:
+        predicted = predict_batch(windows, **options)
+        fallback = np.isnan(predicted).any(axis=1)
+        for track_id, bbox, single in zip(ready, predicted.tolist(), fallback):
+            predictions[track_id] = predict_bbox(tracked_data, track_id) if single else bbox
+    return predictions
+
 def test_predict_bbox_quadratic_weighted():
     """重み付けを使用した predict_bbox_quadratic_weighted のテスト"""
     # サンプルデータ：トラックID 1 の過去 20 フレーム分のデータ
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def calculate_iou(current_bbox, predicted_bbox):
     """実測値と予測値からIoUを計算"""
     if not current_bbox or not predicted_bbox:
@@ -28,6 +31,39 @@ def calculate_aspect_ratio(current_bbox, previous_bbox):
     previous_aspect = (previous_bbox[2] - previous_bbox[0]) / max((previous_bbox[3] - previous_bbox[1]), 1e-5)
     return min(current_aspect, previous_aspect) / max(current_aspect, previous_aspect) if previous_aspect > 0 else 0
 
+def _areas(bboxes):
+    return (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+def _aspects(bboxes):
+    return (bboxes[:, 2] - bboxes[:, 0]) / np.maximum(bboxes[:, 3] - bboxes[:, 1], 1e-5)
+
+def calculate_iou_batch(current_bboxes, predicted_bboxes):
+    """calculate_iou の配列版（(n, 4) どうし → (n,)）"""
+    current_bboxes = np.asarray(current_bboxes, dtype=float)
+    predicted_bboxes = np.asarray(predicted_bboxes, dtype=float)
+    top_left = np.maximum(current_bboxes[:, :2], predicted_bboxes[:, :2])
+    bottom_right = np.minimum(current_bboxes[:, 2:], predicted_bboxes[:, 2:])
+    inter_area = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    union_area = _areas(current_bboxes) + _areas(predicted_bboxes) - inter_area
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union_area > 0, inter_area / union_area, 0.0)
+
+def calculate_area_ratio_batch(current_bboxes, previous_bboxes):
+    """calculate_area_ratio の配列版（前回値がない行は NaN を入れておくと結果も NaN）"""
+    area1 = _areas(np.asarray(current_bboxes, dtype=float))
+    area2 = _areas(np.asarray(previous_bboxes, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.minimum(area1, area2) / np.maximum(area1, area2)
+    return np.where(area2 > 0, ratio, np.where(np.isnan(area2), np.nan, 0.0))
+
+def calculate_aspect_ratio_batch(current_bboxes, previous_bboxes):
+    """calculate_aspect_ratio の配列版（前回値がない行は NaN を入れておくと結果も NaN）"""
+    current_aspect = _aspects(np.asarray(current_bboxes, dtype=float))
+    previous_aspect = _aspects(np.asarray(previous_bboxes, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.minimum(current_aspect, previous_aspect) / np.maximum(current_aspect, previous_aspect)
+    return np.where(previous_aspect > 0, ratio, np.where(np.isnan(previous_aspect), np.nan, 0.0))
+
 def log_frame_iou(detections, predictions, frame_number):
     """フレームごとのIoUを計算し、ログに出力"""
     print(f"\nFrame: {frame_number}")
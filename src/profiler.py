@@ -0,0 +1,165 @@
+"""
+処理段階ごとの所要時間の計測
+    profiler.start_frame(frame_number)
+    with profiler.stage("inference"):
+        ...
+    profiler.end_frame(track_count)
+フレームごとの記録（CSV）と直近 window フレームの p50/p95/p99（JSON）を保存する
+無効時は NULL_PROFILER（何もしない）を使うので, 計測箇所のオーバーヘッドはほぼない
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class _Stage:
+    """with 文で1区間を計測し, 現在のフレームの記録に足す（同じフレームで複数回呼ばれたら合計）"""
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.add(self._name, time.perf_counter() - self._start)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageProfiler:
+    """
+    段階ごとの所要時間をフレーム単位で記録する
+    :param window: パーセンタイルを計算する直近のフレーム数
+    """
+    enabled = True
+
+    def __init__(self, window=300):
+        self.window = window
+        self.rows = []          # フレームごとの記録 {"frame": n, "tracks": m, 段階名: 秒, ...}
+        self.stages = []        # 出現順の段階名
+        self._recent = defaultdict(lambda: deque(maxlen=window))
+        self._current = None
+        self._frame_start = None
+        self._owner = None      # start_frame を呼んだスレッド
+        self._lock = threading.Lock()
+
+    def start_frame(self, frame_number):
+        self._current = {"frame": frame_number}
+        self._owner = threading.get_ident()
+        self._frame_start = time.perf_counter()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        """
+        計測済みの時間を現在のフレームに足す
+        別スレッド（パイプラインのデコード・推論など）からの記録はパーセンタイルの集計にだけ使い,
+        フレームの外（一時停止中の表示など）の記録は捨てる
+        """
+        if name not in self.stages:
+            with self._lock:
+                if name not in self.stages:
+                    self.stages.append(name)
+        if threading.get_ident() != self._owner:
+            self._recent[name].append(seconds)
+        elif self._current is not None:
+            self._current[name] = self._current.get(name, 0.0) + seconds
+
+    def end_frame(self, track_count=0):
+        current = self._current
+        if current is None:
+            return
+        current["total"] = time.perf_counter() - self._frame_start
+        current["tracks"] = track_count
+        for name, value in current.items():
+            if name not in ("frame", "tracks"):
+                self._recent[name].append(value)
+        self.rows.append(current)
+        self._current = None
+
+    def percentiles(self, name):
+        """直近 window フレームの p50/p95/p99（ミリ秒）"""
+        values = self._recent.get(name)
+        if not values:
+            return None
+        return dict(zip((f"p{p}" for p in PERCENTILES), (float(v) for v in np.percentile(np.array(values) * 1000, PERCENTILES))))
+
+    def summary(self):
+        """段階ごとの p50/p95/p99（ミリ秒）と記録数"""
+        return {name: {**self.percentiles(name), "count": len(self._recent[name])}
+                for name in self.stages + ["total"] if self._recent.get(name)}
+
+    def overlay_lines(self):
+        """表示中のフレームに重ねる文字列（段階名と p50/p95）"""
+        lines = []
+        for name, stats in self.summary().items():
+            lines.append(f"{name}: p50 {stats['p50']:.1f}ms p95 {stats['p95']:.1f}ms")
+        if self.rows:
+            lines.append(f"tracks: {self.rows[-1]['tracks']}")
+        return lines
+
+    def save(self, folder, name="profile"):
+        """フレームごとの記録を <name>.csv, 集計を <name>.json に保存"""
+        os.makedirs(folder, exist_ok=True)
+        fieldnames = ["frame", "tracks", "total"] + self.stages
+        with open(os.path.join(folder, f"{name}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+            writer.writeheader()
+            writer.writerows(self.rows)
+        with open(os.path.join(folder, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"frames": len(self.rows), "window": self.window, "stages_ms": self.summary()},
+                      f, ensure_ascii=False, indent=4)
+
+
+class NullProfiler:
+    """計測しない（無効時）"""
+    enabled = False
+    rows = ()
+
+    def start_frame(self, frame_number):
+        pass
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def add(self, name, seconds):
+        pass
+
+    def end_frame(self, track_count=0):
+        pass
+
+    def overlay_lines(self):
+        return []
+
+    def save(self, folder, name="profile"):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def create_profiler(enabled, window=300):
+    return StageProfiler(window) if enabled else NULL_PROFILER
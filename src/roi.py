@@ -0,0 +1,62 @@
+"""
+検出する領域（ROI）
+フレームを ROI の外接矩形で切り出して検出し, 検出結果をフレーム全体の座標に戻す
+多角形の ROI は外側を黒で塗りつぶし, 中心が ROI の外にある検出を除く
+"""
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    :param points: 多角形の頂点 [(x, y), ...]（矩形なら make_roi((x1, y1, x2, y2)) を使う）
+    """
+
+    def __init__(self, points, is_rectangle=False):
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        self.is_rectangle = is_rectangle
+        self.x1, self.y1 = self.points.min(axis=0)
+        self.x2, self.y2 = self.points.max(axis=0)
+        self._mask = None   # 切り出した領域での多角形のマスク（最初のフレームで作る）
+
+    @property
+    def offset(self):
+        return np.array([self.x1, self.y1, self.x1, self.y1], dtype=np.float32)
+
+    def crop(self, frame):
+        """外接矩形で切り出す（多角形なら外側を黒にする）。切り出した画像はフレームと別のメモリ"""
+        height, width = frame.shape[:2]
+        x1, y1 = max(int(self.x1), 0), max(int(self.y1), 0)
+        x2, y2 = min(int(self.x2), width), min(int(self.y2), height)
+        self.x1, self.y1 = x1, y1
+        cropped = frame[y1:y2, x1:x2]
+        if self.is_rectangle:
+            return np.ascontiguousarray(cropped)
+        if self._mask is None or self._mask.shape != cropped.shape[:2]:
+            self._mask = np.zeros(cropped.shape[:2], dtype=np.uint8)
+            cv2.fillPoly(self._mask, [self.points - [x1, y1]], 255)
+        return cv2.bitwise_and(cropped, cropped, mask=self._mask)
+
+    def to_frame(self, bboxes):
+        """切り出した画像での (n, 4) の xyxy をフレーム全体の座標に戻す"""
+        return np.asarray(bboxes, dtype=np.float32).reshape(-1, 4) + self.offset
+
+    def contains(self, bboxes):
+        """フレーム座標の (n, 4) の xyxy の中心が ROI の内側か"""
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        centers = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+        if self.is_rectangle:
+            return ((centers >= [self.x1, self.y1]) & (centers <= [self.x2, self.y2])).all(axis=1)
+        contour = self.points.reshape(-1, 1, 2).astype(np.float32)
+        return np.array([cv2.pointPolygonTest(contour, (float(x), float(y)), False) >= 0 for x, y in centers],
+                        dtype=bool)
+
+
+def make_roi(spec):
+    """設定値から ROI を作る（None: ROI なし, (x1, y1, x2, y2): 矩形, [(x, y), ...]: 多角形）"""
+    if spec is None:
+        return None
+    if len(spec) == 4 and all(np.isscalar(v) for v in spec):
+        x1, y1, x2, y2 = spec
+        return RegionOfInterest([(x1, y1), (x2, y1), (x2, y2), (x1, y2)], is_rectangle=True)
+    return RegionOfInterest(spec)
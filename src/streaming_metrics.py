@@ -0,0 +1,142 @@
+"""
+メトリクス（IoU, 面積比, 縦横比）の逐次集計
+値をリストにため込まず, 0.01 刻みのヒストグラム・平均/分散（Welford 法）・分位点用の細かいヒストグラムを更新する
+集計途中でも CDF や閾値を取り出せる
+"""
+import bisect
+from array import array
+
+import numpy as np
+
+HISTOGRAM_BINS = [i / 100 for i in range(101)]  # 0.00~1.00を0.01刻みにするビン（generate_histogram と同じ）
+SKETCH_BINS = 1000      # 分位点の推定に使う細かいビンの数（0~1 を 0.001 刻み）
+EXACT_LIMIT = 10000     # この数までは値そのものも保持し, 中央値などを厳密に計算する
+THRESHOLD_PERCENTAGES = [0.5, 0.4, 0.3, 0.2, 0.1]
+
+
+class StreamingMetric:
+    """
+    1トラック・1メトリクス分の逐次集計（メモリ使用量は一定）
+    値が EXACT_LIMIT 個以下のうちは統計量を従来どおり値から計算するので, 保存する JSON も従来と同じになる
+    """
+
+    def __init__(self, exact_limit=EXACT_LIMIT):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.exact_limit = exact_limit
+        self.values = array("d")    # EXACT_LIMIT を超えたら None
+        self._counts = [0] * (len(HISTOGRAM_BINS) - 1)
+        self._sketch = [0] * SKETCH_BINS
+
+    @classmethod
+    def from_values(cls, values, exact_limit=EXACT_LIMIT):
+        metric = cls(exact_limit)
+        for value in values:
+            metric.append(value)
+        return metric
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.values is not None:
+            if len(self.values) < self.exact_limit:
+                self.values.append(value)
+            else:
+                self.values = None
+        # 0.01 刻みのビン（np.histogram と同じく範囲外は数えず, 右端の 1.0 は最後のビンに入れる）
+        if HISTOGRAM_BINS[0] <= value <= HISTOGRAM_BINS[-1]:
+            index = bisect.bisect_right(HISTOGRAM_BINS, value) - 1
+            self._counts[min(index, len(self._counts) - 1)] += 1
+        self._sketch[min(max(int(value * SKETCH_BINS), 0), SKETCH_BINS - 1)] += 1
+
+    def merge(self, other):
+        """別の集計を足し込む（パラメータ探索などで複数トラックをまとめる用）"""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.values is not None and other.values is not None and len(self.values) + len(other.values) <= self.exact_limit:
+            self.values.extend(other.values)
+        else:
+            self.values = None
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        self._sketch = [a + b for a, b in zip(self._sketch, other._sketch)]
+        return self
+
+    @property
+    def variance(self):
+        """母分散（np.var と同じ ddof=0）"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std_dev(self):
+        return self.variance ** 0.5
+
+    def histogram(self):
+        """0.01 刻みのビンごとの個数 (hist, bin_edges)"""
+        return np.array(self._counts), np.array(HISTOGRAM_BINS)
+
+    def cdf(self):
+        """ヒストグラムの累積分布（昇順）"""
+        hist, _ = self.histogram()
+        return np.cumsum(hist) / sum(hist)
+
+    def thresholds(self, percentages=THRESHOLD_PERCENTAGES):
+        """累積分布が各割合に達するビンの左端"""
+        _, bin_edges = self.histogram()
+        cdf = self.cdf()
+        return {f"{int(p * 100)}%": bin_edges[np.searchsorted(cdf, p, side="left")] for p in percentages}
+
+    def quantile(self, q):
+        """分位点（値を保持していれば厳密値, そうでなければ細かいビンから線形補間した推定値）"""
+        if self.count == 0:
+            return None
+        if self.values is not None:
+            return float(np.quantile(self.values, q))
+        cumulative = np.cumsum(self._sketch)
+        rank = q * self.count
+        index = int(np.searchsorted(cumulative, rank, side="left"))
+        index = min(index, SKETCH_BINS - 1)
+        below = cumulative[index - 1] if index > 0 else 0
+        in_bin = self._sketch[index]
+        fraction = (rank - below) / in_bin if in_bin else 0.0
+        estimate = (index + fraction) / SKETCH_BINS
+        return float(min(max(estimate, self.min), self.max))
+
+    def median(self):
+        if self.values is not None:
+            return np.median(self.values)
+        return self.quantile(0.5)
+
+    def stats(self):
+        """generate_histogram が保存する統計情報"""
+        hist, bin_edges = self.histogram()
+        cdf = self.cdf()
+        if self.values is not None:
+            mean, std_dev = np.mean(self.values), np.std(self.values)
+        else:
+            mean, std_dev = self.mean, self.std_dev
+        return {
+            "mean": mean,
+            "median": self.median(),
+            "std_dev": std_dev,
+            "threshold_top_10%": self.thresholds(),
+            "histogram": {f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}": int(hist[i]) for i in range(len(hist))},
+            "cdf": cdf.tolist()
+        }
@@ -0,0 +1,132 @@
+"""
+追跡結果（1フレーム・1トラックにつき履歴に追加した1つのボックス）のカラムナ形式での保存と読み込み
+列: video, frame, track_id, source（0: 検出値, 1: 予測値）, xyxy, iou, area, aspect（未計算は NaN）, is_anomaly
+行は動画ごとにフレーム順に並ぶ。video は meta.json の "videos" の添字
+読み込みは列ごとに memmap し, トラックごと・フレーム範囲ごとの行を索引で取り出す
+"""
+import numpy as np
+
+from src.columnar import ColumnarWriter, ColumnarReader
+
+SOURCE_DETECTION = 0
+SOURCE_PREDICTION = 1
+
+TRACK_COLUMNS = {
+    "video": "int16",
+    "frame": "int32",
+    "track_id": "int32",
+    "source": "uint8",
+    "xyxy": ("float32", 4),
+    "iou": "float32",
+    "area": "float32",
+    "aspect": "float32",
+    "is_anomaly": "bool",
+}
+
+_NO_SCORES = (np.nan, np.nan, np.nan)
+
+
+class TrackExportWriter:
+    """
+    追跡結果を書き出す（begin_video() で動画を切り替えて複数の動画を1つにまとめられる）
+    :param chunk_rows: この行数たまったらファイルに書き出す
+    """
+
+    def __init__(self, folder, chunk_rows=65536):
+        self.folder = folder
+        self.videos = []
+        self._video = -1
+        self._writer = ColumnarWriter(folder, TRACK_COLUMNS, chunk_rows)
+
+    def begin_video(self, video_path):
+        """以降の行をこの動画のものとして書く"""
+        self.videos.append(video_path)
+        self._video = len(self.videos) - 1
+        return self._video
+
+    def write_frame(self, frame_number, detection_dict, predictions, anomalies=None, scores=None):
+        """
+        1フレーム分を追加（handle_replace が履歴に追加するのと同じボックス）
+        正常な検出値は検出値, 異常と判定した検出値と未検出のトラックは予測値
+        :param scores: {track_id: (iou, area, aspect)}（異常判定をしたトラックのみ）
+        """
+        anomalies = anomalies or {}
+        scores = scores or {}
+        rows = []
+        for track_id, bbox in detection_dict.items():
+            if anomalies.get(track_id):
+                rows.append((track_id, SOURCE_PREDICTION, predictions.get(track_id, bbox), True))
+            else:
+                rows.append((track_id, SOURCE_DETECTION, bbox, False))
+        for track_id, bbox in predictions.items():
+            if track_id not in detection_dict and bbox is not None:
+                rows.append((track_id, SOURCE_PREDICTION, bbox, False))
+        if not rows:
+            return
+        track_ids, sources, bboxes, flags = zip(*rows)
+        iou, area, aspect = zip(*(scores.get(track_id, _NO_SCORES) for track_id in track_ids))
+        self._writer.append(video=np.full(len(rows), self._video), frame=np.full(len(rows), frame_number),
+                            track_id=track_ids, source=sources, xyxy=bboxes, iou=iou, area=area, aspect=aspect,
+                            is_anomaly=flags)
+
+    def close(self, **meta):
+        self._writer.close(videos=self.videos, **meta)
+        return self._writer.rows
+
+
+class TrackExport:
+    """追跡結果の読み込み（列は memmap）"""
+
+    def __init__(self, folder):
+        self._reader = ColumnarReader(folder)
+        self.meta = self._reader.meta
+        self.videos = self.meta["videos"]
+        self.columns = self._reader.columns
+        self._track_order = None    # (video, track_id, frame) の順に並べた行番号
+        self._track_keys = None
+
+    def __len__(self):
+        return len(self._reader)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def video_index(self, video):
+        """動画のパスか添字から添字を返す"""
+        return video if isinstance(video, (int, np.integer)) else self.videos.index(video)
+
+    def _video_rows(self, video):
+        if video is None:
+            return 0, len(self)
+        index = self.video_index(video)
+        column = self.columns["video"]
+        return int(np.searchsorted(column, index, side="left")), int(np.searchsorted(column, index, side="right"))
+
+    def frame_range(self, start, stop, video=None):
+        """フレーム番号が start 以上 stop 未満の行（video を指定しなければ全動画）"""
+        if video is None:
+            return np.concatenate([self.frame_range(start, stop, index) for index in range(len(self.videos))]
+                                  or [np.empty(0, dtype=np.int64)])
+        first, last = self._video_rows(video)
+        frames = self.columns["frame"][first:last]
+        lower, upper = np.searchsorted(frames, [start, stop], side="left")
+        return np.arange(first + lower, first + upper)
+
+    def track(self, track_id, video=None):
+        """トラックの行（フレーム順。video を指定しなければ全動画）"""
+        if self._track_order is None:   # 最初の問い合わせで索引を作る
+            video_column, track_column = self.columns["video"], self.columns["track_id"]
+            self._track_order = np.lexsort((self.columns["frame"], track_column, video_column))
+            self._track_keys = ((video_column[self._track_order].astype(np.int64) << 32)
+                                + track_column[self._track_order].astype(np.int64))
+        indexes = range(len(self.videos)) if video is None else [self.video_index(video)]
+        rows = []
+        for index in indexes:
+            key = (index << 32) + int(track_id)
+            lower, upper = np.searchsorted(self._track_keys, [key, key + 1], side="left")
+            rows.append(self._track_order[lower:upper])
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def select(self, rows, columns=None):
+        """行番号の配列から {列名: 値の配列} を返す"""
+        return {name: self.columns[name][rows] for name in (columns or self.columns)}
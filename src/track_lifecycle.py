@@ -0,0 +1,50 @@
+"""
+トラックの生存管理
+トラックごとに最後に検出したフレームを記録し, 期限（最後の検出 + max_missed_frame + 1）の早い順にヒープで管理する
+毎フレーム全トラックの未検出カウントを進める代わりに, 検出されたトラックと期限を迎えたトラックだけを処理する
+"""
+import heapq
+import math
+
+
+class TrackLifecycle:
+    """
+    :param max_missed_frame: これを超えて未検出が続いたトラックを削除
+    """
+
+    def __init__(self, max_missed_frame=15):
+        self.max_missed_frame = max_missed_frame
+        self.frame = 0              # 検出したフレームの数（検出器を動かさず予測でつないだフレームは数えない）
+        self.active = set()         # 削除されていないトラック
+        self._last_seen = {}        # track_id -> 最後に検出したフレーム
+        self._expiry = []           # (期限, track_id) のヒープ（検出のたびに追加し, 古い項目は取り出すときに捨てる）
+
+    def update(self, track_ids):
+        """
+        1フレーム進め, 検出されたトラックを記録する
+        :return: このフレームで期限を迎えて削除したトラックIDのリスト
+        """
+        self.frame += 1
+        lifetime = math.floor(self.max_missed_frame) + 1
+        for track_id in track_ids:
+            self._last_seen[track_id] = self.frame
+            self.active.add(track_id)
+            heapq.heappush(self._expiry, (self.frame + lifetime, track_id))
+        expired = []
+        while self._expiry and self._expiry[0][0] <= self.frame:
+            deadline, track_id = heapq.heappop(self._expiry)
+            if self._last_seen.get(track_id) == deadline - lifetime:   # その後に検出されていなければ削除
+                del self._last_seen[track_id]
+                self.active.discard(track_id)
+                expired.append(track_id)
+        return expired
+
+    def missed(self, track_id):
+        """最後に検出してから未検出が続いているフレーム数"""
+        return self.frame - self._last_seen[track_id]
+
+    def __contains__(self, track_id):
+        return track_id in self.active
+
+    def __len__(self):
+        return len(self.active)
@@ -0,0 +1,158 @@
+import numpy as np
+
+
+class TrackHistory:
+    """1トラック分の履歴ビュー（tracked_data[track_id] の代わりに返す）"""
+
+    def __init__(self, store, slot):
+        self._store = store
+        self._slot = slot
+
+    def __len__(self):
+        return int(self._store._lengths[self._slot])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.view()[index]   # 連続領域のビューなのでコピーは発生しない
+        return self.view()[index].tolist()  # 1件だけなら従来どおりリストで返す
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __repr__(self):
+        return f"TrackHistory({self.view().tolist()})"
+
+    @property
+    def total(self):
+        """これまでに追加されたバウンディングボックスの総数（リングバッファで捨てた分も含む）"""
+        return int(self._store._totals[self._slot])
+
+    def append(self, bbox):
+        self._store._append_slot(self._slot, bbox)
+
+    def view(self):
+        """保持している全履歴（古い順）のゼロコピービュー"""
+        return self._store._window(self._slot, len(self))
+
+    def last(self, num_frames):
+        """直近 num_frames 件のゼロコピービュー"""
+        return self._store._window(self._slot, min(num_frames, len(self)))
+
+
+class TrackStore:
+    """
+    固定長リングバッファでトラック履歴を保持するストア
+    全トラックの (x1, y1, x2, y2) を1つの float32 配列に確保し、消えたトラックのスロットは再利用する
+    dict と同じ操作（in, [], del, keys, items）で tracked_data の代わりに使える
+    :param capacity: 1トラックあたりに保持するフレーム数
+    :param max_tracks: 最初に確保するトラック数（足りなくなれば倍に拡張）
+    """
+
+    def __init__(self, capacity=30, max_tracks=64):
+        if capacity < 1:
+            raise ValueError(f"capacity は1以上を指定してください: {capacity}")
+        self.capacity = capacity
+        # 各スロットは 2*capacity 行。同じ値を head と head+capacity の両方に書くことで
+        # 直近 capacity 件が常に連続領域になり、スライスをビューとして返せる
+        self._buffer = np.zeros((max_tracks, 2 * capacity, 4), dtype=np.float32)
+        self._heads = np.zeros(max_tracks, dtype=np.int64)     # 次に書き込む位置
+        self._lengths = np.zeros(max_tracks, dtype=np.int64)   # 保持件数（最大 capacity）
+        self._totals = np.zeros(max_tracks, dtype=np.int64)    # 追加された総数
+        self._slots = {}                                       # track_id -> スロット番号
+        self._free = list(range(max_tracks - 1, -1, -1))
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __getitem__(self, track_id):
+        return TrackHistory(self, self._slots[track_id])
+
+    def __setitem__(self, track_id, bboxes):
+        """トラックを（再）作成し, 与えられた履歴で初期化する"""
+        if track_id in self._slots:
+            slot = self._slots[track_id]
+        else:
+            slot = self._allocate()
+            self._slots[track_id] = slot
+        self._heads[slot] = 0
+        self._lengths[slot] = 0
+        self._totals[slot] = 0
+        for bbox in bboxes:
+            self._append_slot(slot, bbox)
+
+    def __delitem__(self, track_id):
+        slot = self._slots.pop(track_id)
+        self._free.append(slot)
+
+    def keys(self):
+        return self._slots.keys()
+
+    def items(self):
+        return ((track_id, TrackHistory(self, slot)) for track_id, slot in self._slots.items())
+
+    def get(self, track_id, default=None):
+        return self[track_id] if track_id in self._slots else default
+
+    def append(self, track_id, bbox):
+        """トラックにバウンディングボックスを追加（未登録なら作成）"""
+        if track_id not in self._slots:
+            self[track_id] = []
+        self._append_slot(self._slots[track_id], bbox)
+
+    def last(self, track_id, num_frames):
+        """直近 num_frames 件のゼロコピービュー"""
+        return self[track_id].last(num_frames)
+
+    def windows(self, track_ids, num_frames):
+        """
+        指定トラックの直近 num_frames 件をまとめて取得
+        :return: (履歴が足りたトラックIDのリスト, (n_tracks, num_frames, 4) の配列)
+        """
+        ready = [track_id for track_id in track_ids
+                 if track_id in self._slots and self._lengths[self._slots[track_id]] >= num_frames]
+        slots = np.array([self._slots[track_id] for track_id in ready], dtype=np.int64)
+        ends = self._heads[slots] + self.capacity
+        rows = ends[:, None] + np.arange(-num_frames, 0)
+        return ready, self._buffer[slots[:, None], rows]
+
+    def nbytes(self):
+        """確保済みバッファのバイト数"""
+        return self._buffer.nbytes
+
+    def _allocate(self):
+        if not self._free:
+            self._grow()
+        return self._free.pop()
+
+    def _grow(self):
+        old_size = self._buffer.shape[0]
+        new_size = old_size * 2
+        buffer = np.zeros((new_size, 2 * self.capacity, 4), dtype=np.float32)
+        buffer[:old_size] = self._buffer
+        self._buffer = buffer
+        self._heads = np.concatenate([self._heads, np.zeros(old_size, dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.zeros(old_size, dtype=np.int64)])
+        self._totals = np.concatenate([self._totals, np.zeros(old_size, dtype=np.int64)])
+        self._free.extend(range(new_size - 1, old_size - 1, -1))
+
+    def _append_slot(self, slot, bbox):
+        head = self._heads[slot]
+        # None は NaN として保持する
+        value = (np.nan,) * 4 if bbox is None else bbox
+        self._buffer[slot, head] = value
+        self._buffer[slot, head + self.capacity] = value
+        self._heads[slot] = (head + 1) % self.capacity
+        if self._lengths[slot] < self.capacity:
+            self._lengths[slot] += 1
+        self._totals[slot] += 1
+
+    def _window(self, slot, num_frames):
+        # 最新の値は head-1 と head-1+capacity にある。後者で終わる区間は常に連続
+        end = self._heads[slot] + self.capacity
+        return self._buffer[slot, end - num_frames:end]
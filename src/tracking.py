@@ -0,0 +1,147 @@
+"""
+検出結果を受け取ってからの1フレーム分の処理（履歴更新・予測・未検出カウント・異常検知・置き換え・メトリクス）
+動画の読み込みや YOLO に依存しないので, main のほかキャッシュ再生やパラメータ探索からも使う
+"""
+import numpy as np
+
+from src.yolo_handler import bridge_detections
+from src.prediction import get_prediction_function, predict_tracks
+from src.anomaly_detectors import detect_combined_anomalies_fast, detect_combined_anomalies_batch
+import src.anomaly_handler as anomaly
+from src.histogram_generator import update_metrics
+import src.log as log
+from src.track_store import TrackStore
+from src.track_lifecycle import TrackLifecycle
+from src.profiler import NULL_PROFILER
+
+DEFAULT_PARAMS = {
+    "prediction_method": "quadratic_weight",
+    "num_frames": None,             # 予測に使うフレーム数（None なら予測関数の既定値）
+    "outlier_threshold": None,      # 外れ値除去の IQR 倍率（None なら既定値 1.5）
+    "max_missed_frame": 15,         # これを超えて未検出が続いたトラックを削除
+    "iou_threshold": 0.98,
+    "area_threshold": 0.98,
+    "ratio_threshold": 0.98,
+    "batch_anomaly_check": True,    # 全トラックをまとめて配列で判定（False なら1トラックずつ打ち切り版で判定。結果は同じ）
+    "target_ids": None,             # 異常検知の対象トラック（None なら全トラック）
+    "metric_ids": None,             # メトリクスを記録するトラック（None なら全トラック）
+    "track_history_size": 30,       # 1トラックあたりに保持する履歴フレーム数
+    "verbose": True,                # フレームごとのログ出力
+}
+
+
+def new_tracking_state(params=None):
+    """追跡処理の状態（params は DEFAULT_PARAMS の一部を上書きする辞書）"""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    options = {key: params[key] for key in ("num_frames", "outlier_threshold") if params[key] is not None}
+    return {
+        "params": params,
+        "tracked_data": TrackStore(capacity=params["track_history_size"]),
+        "lifecycle": TrackLifecycle(params["max_missed_frame"]),    # 最後に検出したフレームと削除の期限
+        "metrics": {"iou": {}, "area": {}, "aspect": {}},   # 初期化
+        "predict_bbox": get_prediction_function(params["prediction_method"], **options),
+        "frame_count": 0,
+        "anomaly_count": 0,
+        "track_ids": set(),
+        "bridged_frames": 0,        # 検出せずに予測値でつないだフレーム数
+        "frame_anomalies": {},      # 直前のフレームで異常と判定したトラック
+        "frame_log": None,          # フレームごとの記録を書き出す log.FrameRecordSink
+        "track_export": None,       # 履歴に追加したボックスを書き出す TrackExportWriter
+        "profiler": NULL_PROFILER,  # 段階ごとの所要時間を記録する場合は StageProfiler
+    }
+
+def _score_anomalies(candidates, detection_dict, predictions, previous, params):
+    """
+    検出値と予測値が揃ったトラックの異常判定
+    :return: ({track_id: bool}, {"iou": (n,), "area": (n,), "aspect": (n,)}（1トラックずつ判定したときは None）)
+    """
+    thresholds = (params["iou_threshold"], params["area_threshold"], params["ratio_threshold"])
+    if not params["batch_anomaly_check"]:
+        return {track_id: detect_combined_anomalies_fast(detection_dict[track_id], previous[track_id],
+                                                         predictions[track_id], *thresholds)
+                for track_id in candidates}, None
+    current = np.array([detection_dict[track_id] for track_id in candidates], dtype=float)
+    predicted = np.array([predictions[track_id] for track_id in candidates], dtype=float)
+    prev = np.array([previous[track_id] if previous[track_id] is not None else (np.nan,) * 4
+                     for track_id in candidates], dtype=float)
+    is_anomaly, scores = detect_combined_anomalies_batch(current, prev, predicted, *thresholds)
+    return dict(zip(candidates, is_anomaly.tolist())), scores
+
+def track_frame(frame_number, detections, state):
+    """
+    1フレーム分の予測・異常検知・置き換え
+    予測は前フレームまでの履歴から行い（事前予測）, 異常判定の後に1トラックにつき1つだけ履歴に追加する
+    （正常な検出値, 異常時は予測値, 未検出なら予測値）
+    """
+    params = state["params"]
+    tracked_data = state["tracked_data"]
+    lifecycle = state["lifecycle"]
+    predict_bbox = state["predict_bbox"]
+    target_ids = params["target_ids"]
+    profiler = state["profiler"]
+    # 未検出が続いたトラックの削除（期限を迎えたトラックだけを見る）
+    for track_id in lifecycle.update(track_id for track_id, _ in detections):
+        if track_id in tracked_data:
+            del tracked_data[track_id]
+    detection_dict = {track_id: bbox for track_id, bbox in detections}
+    # 前フレームまでの履歴から現フレームを予測
+    with profiler.stage("predict"):
+        predictions = predict_tracks(tracked_data, predict_bbox, [t for t in lifecycle.active if t in tracked_data])
+    state["frame_count"] = frame_number
+    state["track_ids"].update(detection_dict)
+
+    # 検出値と予測値を確認
+    if params["verbose"]:
+        log.log_predictions_and_detections(detection_dict, predictions)
+
+    candidates = [track_id for track_id, bbox in detection_dict.items()
+                  if bbox and predictions.get(track_id) and (target_ids is None or track_id in target_ids)]
+    previous = {track_id: tracked_data[track_id][-1] for track_id in candidates}
+    with profiler.stage("metrics"):
+        for track_id in candidates:
+            update_metrics(state["metrics"], track_id, detection_dict[track_id], predictions[track_id],
+                           previous[track_id], params["metric_ids"])
+    # 異常検知
+    with profiler.stage("anomaly"):
+        anomalies, scores = (_score_anomalies(candidates, detection_dict, predictions, previous, params)
+                             if candidates else ({}, None))
+
+    # 1トラックにつき1つ履歴に追加（異常時・未検出時は予測値）
+    with profiler.stage("replace"):
+        anomaly.handle_replace(detection_dict, predictions, anomalies, tracked_data)
+        if hasattr(predict_bbox, "observe"):    # 状態を持つ予測器は異常と判定されなかった検出値で更新
+            predict_bbox.observe({t: bbox for t, bbox in detection_dict.items() if not anomalies.get(t)},
+                                 lifecycle.active)
+
+    state["anomaly_count"] += sum(anomalies.values())
+    # このフレームで異常と判定したトラック {track_id: (検出値, 予測値)}（異常検知フレームの保存用）
+    state["frame_anomalies"] = {t: (detection_dict[t], predictions[t]) for t, is_anomaly in anomalies.items()
+                                if is_anomaly}
+    if state["frame_log"] is not None:
+        state["frame_log"].write_frame(frame_number, detection_dict, predictions, anomalies)
+    if state["track_export"] is not None:   # 履歴に追加したボックスと判定に使った値
+        track_scores = dict(zip(candidates, zip(scores["iou"], scores["area"], scores["aspect"]))) if scores else None
+        state["track_export"].write_frame(frame_number, detection_dict, predictions, anomalies, track_scores)
+    # 確定情報の確認
+    if params["verbose"]:
+        log.display_latest_tracked_data(tracked_data, frame_number)
+    return detection_dict, predictions
+
+def bridge_frame(frame_number, state):
+    """
+    検出器を動かさなかったフレームの処理（予測値を履歴に追加するだけで, 異常検知・メトリクス更新はしない）
+    未検出フレームのカウントも進めない（連続して飛ばすフレーム数は DetectorScheduler の max_gap まで）
+    """
+    with state["profiler"].stage("predict"):
+        detection_dict, predictions = bridge_detections(state["tracked_data"], state["predict_bbox"],
+                                                        state["lifecycle"].active)
+    state["frame_count"] = frame_number
+    state["bridged_frames"] += 1
+    state["frame_anomalies"] = {}
+    if state["frame_log"] is not None:
+        state["frame_log"].write_frame(frame_number, detection_dict, predictions)
+    if state["track_export"] is not None:
+        state["track_export"].write_frame(frame_number, detection_dict, predictions)
+    if state["params"]["verbose"]:
+        log.log_predictions_and_detections(detection_dict, predictions)
+    return detection_dict, predictions
@@ -0,0 +1,86 @@
+"""
+描画済みフレームの動画保存
+エンコードは専用スレッドで行い, 呼び出し側（検出・後処理のループ）は容量付きキューにフレームを渡すだけにする
+"""
+import os
+import threading
+
+import cv2
+
+from src.pipeline import BoundedQueue, _END
+
+CONTAINER_CODECS = {"mp4": "mp4v", "avi": "XVID", "mkv": "XVID"}   # 拡張子ごとの既定のコーデック
+
+
+class AsyncVideoWriter:
+    """
+    :param path: 出力ファイル（拡張子がコンテナ）
+    :param fps: 出力動画の FPS（間引き後の TARGET_FPS に合わせる）
+    :param codec: FourCC（None なら拡張子から決める）
+    :param queue_size: エンコード待ちのフレーム数の上限
+    :param policy: キューが満杯のとき 待つ:"block", 古いフレームを捨てる:"drop_oldest"
+    フレームの大きさは最初のフレームで決まる（違う大きさのフレームはリサイズして書き込む）
+    渡したフレームはコピーしないので, write() の後に書き換えないこと
+    """
+
+    def __init__(self, path, fps, codec=None, queue_size=32, policy="block"):
+        self.path = path
+        self.fps = fps
+        self.codec = codec or CONTAINER_CODECS.get(os.path.splitext(path)[1].lstrip(".").lower(), "mp4v")
+        self.queued = 0
+        self.written = 0
+        self._queue = BoundedQueue(queue_size, policy)
+        self._writer = None
+        self._size = None
+        self._errors = []
+        self._thread = threading.Thread(target=self._worker, name="video_writer", daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        """フレームをエンコード待ちのキューに追加（close 済みやエンコードに失敗した後なら False）"""
+        if self._errors or not self._queue.put(frame):
+            return False
+        self.queued += 1
+        return True
+
+    def close(self):
+        """残りのフレームを書き込んで閉じる"""
+        self._queue.close()
+        self._thread.join()
+        if self._errors:
+            raise self._errors[0]
+        return self.stats()
+
+    def stats(self):
+        """キューに渡した数・書き込んだ数・捨てた数・エンコード待ちの数"""
+        return {"path": self.path, "queued": self.queued, "written": self.written, "dropped": self._queue.dropped,
+                "pending": len(self._queue)}
+
+    def _open(self, frame):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        height, width = frame.shape[:2]
+        self._size = (width, height)
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, self._size)
+        if not self._writer.isOpened():
+            raise IOError(f"動画を書き込めません: {self.path} (codec={self.codec})")
+
+    def _worker(self):
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                if self._writer is None:
+                    self._open(frame)
+                if (frame.shape[1], frame.shape[0]) != self._size:
+                    frame = cv2.resize(frame, self._size)
+                self._writer.write(frame)
+                self.written += 1
+        except Exception as e:
+            self._errors.append(e)
+            self._queue.cancel()
+        finally:
+            if self._writer is not None:
+                self._writer.release()
@@ -0,0 +1,128 @@
+"""
+処理と切り離したフレームの表示
+処理側は submit() で最新のフレームを置いていくだけにし, 表示スレッドが max_fps を上限に一番新しいフレームだけを描画・表示する
+（表示が追いつかないフレームは描画もしない）
+スペースキーで一時停止（処理側は wait_if_paused() で止まる）, 'q' キーで終了
+HighGUI（imshow / waitKey / destroyWindow）はメインスレッド以外から呼ぶと macOS や Qt のバックエンドで動かないので,
+run() を呼んだスレッド（メインスレッド）を表示スレッドにし, 処理は run() が起動する処理スレッドで行う
+"""
+import threading
+import time
+
+import cv2
+
+
+class FrameViewer:
+    """
+    :param max_fps: 表示の上限 FPS
+    :param window: ウィンドウ名
+    """
+
+    def __init__(self, max_fps=30, window="Result"):
+        self.interval = 1 / max_fps
+        self.window = window
+        self.paused = False
+        self.stopped = False        # 'q' で終了したか
+        self.submitted = 0
+        self.rendered = 0
+        self._latest = None         # (frame_number, frame, render)
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def submit(self, frame_number, frame, render=None):
+        """
+        表示するフレームを置く（前に置いたフレームがまだ表示されていなければ上書き）
+        :param render: render(frame) -> 描画したフレーム。表示するときに表示スレッドで呼ぶ
+        """
+        with self._cond:
+            self._latest = (frame_number, frame, render)
+            self.submitted += 1
+
+    def wait_if_paused(self):
+        """一時停止中は再開されるまで待つ。'q' で終了したら True"""
+        with self._cond:
+            while self.paused and not self.stopped and not self._closed:
+                self._cond.wait()
+            return self.stopped
+
+    def run(self, work):
+        """
+        work() を処理スレッドで実行し, 終わるまで呼び出したスレッドでフレームの表示とキー入力を行う
+        :return: work() の戻り値（work() の例外はそのまま送出）
+        """
+        results, errors = [], []
+
+        def target():
+            try:
+                results.append(work())
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                self.close()
+        worker = threading.Thread(target=target, name="processing", daemon=True)
+        worker.start()
+        try:
+            self._loop()
+        finally:
+            with self._cond:    # 表示側で例外が起きたら処理も止める
+                self.stopped = self.stopped or not self._closed
+                self._cond.notify_all()
+            worker.join()
+        if errors:
+            raise errors[0]
+        return results[0]
+
+    def close(self):
+        """表示を終える（run() の表示ループはウィンドウを閉じて戻る）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return self.stats()
+
+    def stats(self):
+        """置かれたフレーム数と表示したフレーム数"""
+        return {"submitted": self.submitted, "rendered": self.rendered}
+
+    def _show(self, frame):
+        cv2.imshow(self.window, frame)
+
+    def _poll_key(self):
+        return cv2.waitKey(1) & 0xFF
+
+    def _destroy(self):
+        cv2.destroyWindow(self.window)
+
+    def _loop(self):
+        frame_number = None
+        shown = False
+        try:
+            while True:
+                start = time.perf_counter()
+                with self._cond:
+                    if self._closed:
+                        break
+                    item, self._latest = self._latest, None
+                if item is not None:
+                    frame_number, frame, render = item
+                    self._show(render(frame) if render is not None else frame)
+                    self.rendered += 1
+                    shown = True
+                if shown:
+                    self._handle_key(self._poll_key(), frame_number)
+                remaining = self.interval - (time.perf_counter() - start)
+                if remaining > 0:
+                    time.sleep(remaining)
+        finally:
+            if shown:
+                self._destroy()
+
+    def _handle_key(self, key, frame_number):
+        with self._cond:
+            if key == ord(' '):  # スペースキーで一時停止
+                self.paused = not self.paused
+                if self.paused:
+                    print(f"PAUSE : Frame {frame_number}")
+            elif key == ord('q'):  # 'q'キーで強制終了（ヒストグラムは終了後に保存）
+                print("強制終了しました。")
+                self.stopped = True
+            self._cond.notify_all()
@@ -1,44 +1,280 @@
-from ultralytics import YOLO
+import functools
+import time
+
+import numpy as np
+
+from src.prediction import predict_tracks
+from src.profiler import NULL_PROFILER
+from src.frame_source import FrameSource
+
+# ultralytics（torch）は読み込みに数秒かかるので, モデルやトラッカーを作るときに初めて読み込む
 
 
 def load_yolo_model(model_path):
+    from ultralytics import YOLO
     return YOLO(model_path)
 
-def process_frame(cap, frame_skip_interval):
-    """指定されたフレームスキップを考慮してフレームを取得"""
-    for _ in range(frame_skip_interval - 1):
-        cap.grab()
-    success, frame = cap.read()
+@functools.lru_cache(maxsize=None)
+def get_yolo_model(model_path):
+    """モデルを初めて使うときに読み込み, 以降は同じモデルを返す"""
+    return load_yolo_model(model_path)
+
+_warmed_up = set()
+
+def warm_up_model(model, width, height, classes=None, conf=0.5, roi=None, imgsz=None, tile_size=None, overlap=0.2,
+                  batch_size=1):
+    """
+    動画と同じ解像度のダミーフレームで1回推論して初回推論の遅延（初期化）を済ませる
+    検出と同じ入力（ROI で切り出した大きさ, imgsz, タイルのバッチ, まとめて検出するフレーム数）で推論する
+    model.track ではなく model.predict を使うので, トラッカーの状態は変わらない
+    :param tile_size: タイル分割で検出するときのタイルの一辺（None ならタイル分割しない）
+    :return: かかった時間（秒）。同じモデル・入力で済んでいれば 0
+    """
+    dummy = np.zeros((int(height), int(width), 3), dtype=np.uint8)
+    if roi is not None:
+        dummy = roi.crop(dummy)
+    key = (id(model), dummy.shape, imgsz, tile_size, overlap if tile_size else None, batch_size)
+    if key in _warmed_up:
+        return 0.0
+    start = time.perf_counter()
+    if tile_size is not None:
+        detect_tiled(dummy, model, classes, conf, tile_size, overlap, imgsz=imgsz)
+    else:
+        model.predict(dummy if batch_size == 1 else [dummy] * batch_size, conf=conf, classes=classes, verbose=False,
+                      **_inference_options(imgsz))
+    _warmed_up.add(key)
+    return time.perf_counter() - start
+
+def process_frame(cap, frame_skip_interval, profiler=NULL_PROFILER):
+    """
+    指定されたフレームスキップを考慮してフレームを取得
+    cap が FrameSource なら間引きは FrameSource が行う（frame_skip_interval は使わない）
+    """
+    if isinstance(cap, FrameSource):
+        return cap.read(profiler)
+    with profiler.stage("skip"):
+        for _ in range(frame_skip_interval - 1):
+            cap.grab()
+    with profiler.stage("decode"):
+        success, frame = cap.read()
     return success, frame
 
-def perform_yolo(frame, model, classes=None, conf=0.5):
-    """YOLOを使った推論"""
-    results = model.track(frame, persist=True, conf=conf, classes=classes, verbose=False)
+def _inference_options(imgsz):
+    return {} if imgsz is None else {"imgsz": imgsz}
+
+def _to_frame_coords(ids, coords, scores, roi):
+    """ROI で切り出した画像での検出結果をフレーム全体の座標に戻し, 中心が ROI の外にあるものを除く"""
+    if roi is None or len(coords) == 0:
+        return ids, coords, scores
+    coords = roi.to_frame(coords)
+    inside = roi.contains(coords)
+    return ([t for t, keep in zip(ids, inside) if keep], coords[inside],
+            [c for c, keep in zip(scores, inside) if keep] if len(scores) else scores)
+
+def perform_yolo(frame, model, classes=None, conf=0.5, with_conf=False, roi=None, imgsz=None):
+    """
+    YOLOを使った推論
+    with_conf=True なら (track_id, xyxy, conf) の形で信頼度も返す
+    :param roi: RegionOfInterest（指定時はその領域だけを切り出して検出し, 座標はフレーム全体に戻す）
+    :param imgsz: 推論時の入力解像度（None ならモデルの既定値）
+    """
+    if roi is not None:
+        frame = roi.crop(frame)
+    results = model.track(frame, persist=True, conf=conf, classes=classes, verbose=False, **_inference_options(imgsz))
     detections = []
     if len(results) != 0 and results[0].boxes is not None:
         boxes = results[0].boxes
         ids = boxes.id.cpu().numpy().astype(int) if boxes.id is not None else []
         coords = boxes.xyxy.cpu().numpy() if boxes.xyxy is not None else []
-        for track_id, xyxy in zip(ids, coords):
-            detections.append((track_id, xyxy.tolist()))
+        scores = boxes.conf.cpu().numpy() if with_conf else []
+        if len(ids) == 0:
+            return detections
+        ids, coords, scores = _to_frame_coords(ids, coords, scores, roi)
+        for i, (track_id, xyxy) in enumerate(zip(ids, coords)):
+            if with_conf:
+                detections.append((track_id, xyxy.tolist(), float(scores[i])))
+            else:
+                detections.append((track_id, xyxy.tolist()))
     return detections
 
+def reset_tracker(model):
+    """
+    model.track(persist=True) のトラッカーを初期化する（動画の最初に呼ぶ）
+    persist=True のトラッカーは model.predictor に残り, 同じモデルで次の動画を処理すると
+    前の動画の見失ったトラックと ID の番号を引き継いでしまうため
+    """
+    predictor = getattr(model, "predictor", None)
+    for tracker in getattr(predictor, "trackers", None) or []:
+        tracker.reset()
+
+def create_tracker(tracker="botsort.yaml", model=None):
+    """model.track と同じ設定のトラッカーを単体で生成（perform_yolo_batch 用）"""
+    import yaml
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+
+    with open(check_yaml(tracker), encoding="utf-8") as f:
+        cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+    if model is not None:
+        cfg.device = model.device
+    return TRACKER_MAP[cfg.tracker_type](args=cfg)
+
+def perform_yolo_batch(frames, model, tracker, classes=None, conf=0.5, with_conf=False, roi=None, imgsz=None):
+    """
+    複数フレームをまとめて1回で検出し, フレーム順にトラッカーを更新する（オフライン処理用）
+    トラッカーへの入力は逐次処理の model.track と同じなので, トラックIDも同じになる
+    :param frames: フレームのリスト
+    :param tracker: create_tracker() で生成したトラッカー（動画ごとに1つ）
+    :param roi, imgsz: perform_yolo と同じ
+    :return: フレームごとの [(track_id, [x1, y1, x2, y2]), ...] のリスト
+    """
+    if roi is not None:
+        frames = [roi.crop(frame) for frame in frames]
+    results = model.predict(frames, conf=conf, classes=classes, verbose=False, **_inference_options(imgsz))
+    batch_detections = []
+    for result in results:
+        tracks = tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+        # tracks の各行は [x1, y1, x2, y2, track_id, score, cls, idx]
+        if len(tracks) == 0:
+            batch_detections.append([])
+            continue
+        ids, coords, scores = _to_frame_coords(tracks[:, 4].astype(int), tracks[:, :4], tracks[:, 5], roi)
+        if with_conf:
+            batch_detections.append([(int(t), xyxy.tolist(), float(c)) for t, xyxy, c in zip(ids, coords, scores)])
+        else:
+            batch_detections.append([(int(t), xyxy.tolist()) for t, xyxy in zip(ids, coords)])
+    return batch_detections
+
+def make_tiles(width, height, tile_size=640, overlap=0.2):
+    """
+    フレームを重なりのあるタイルに分割
+    :return: [(x1, y1, x2, y2), ...]（端のタイルはフレームに収まるように内側へずらす）
+    """
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = max(int(tile_size * (1 - overlap)), 1)
+        positions = list(range(0, length - tile_size, stride))
+        return positions + [length - tile_size]
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height)) for y in starts(height) for x in starts(width)]
+
+def nms(bboxes, scores, threshold=0.5, metric="iou", classes=None, truncated=None):
+    """
+    NMS（スコアの高い順に, 重なりが threshold を超えるボックスを除く）
+    :param metric: "iou" または "ios"（小さい方の面積に対する共通部分の割合）
+    :param classes: 指定時はクラスごとに行う
+    :param truncated: タイルの境界で切れたボックスか（bool の配列）。指定時は, 小さい方のボックスが切れている組だけ
+                      IoS で比べる（切れたボックスは完全なボックスの一部なので IoU では除けない）
+    :return: 残すボックスの添字（スコアの高い順）
+    """
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    if classes is not None and len(bboxes):     # クラスごとに座標をずらして重ならないようにする
+        bboxes = bboxes + (np.asarray(classes, dtype=float) * (bboxes.max() + 1))[:, None]
+    areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        top_left = np.maximum(bboxes[i, :2], bboxes[rest, :2])
+        bottom_right = np.minimum(bboxes[i, 2:], bboxes[rest, 2:])
+        inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        smaller = np.minimum(areas[i], areas[rest])
+        if metric == "ios":
+            denominator = smaller
+        else:
+            denominator = areas[i] + areas[rest] - inter
+            if truncated is not None:
+                smaller_truncated = np.where(areas[i] <= areas[rest], truncated[i], truncated[rest])
+                denominator = np.where(smaller_truncated, smaller, denominator)
+        overlap = np.divide(inter, denominator, out=np.zeros_like(inter), where=denominator > 0)
+        order = rest[overlap <= threshold]
+    return np.array(keep, dtype=int)
+
+def cut_at_tile_edge(bboxes, tile, width, height, margin=2.0):
+    """
+    タイル座標の (n, 4) の xyxy がタイルの境界で切れているか
+    （タイルの辺のうちフレームの端ではない辺から margin 画素以内にかかるボックス）
+    """
+    x1, y1, x2, y2 = tile
+    bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    return (((bboxes[:, 0] <= margin) & (x1 > 0))
+            | ((bboxes[:, 1] <= margin) & (y1 > 0))
+            | ((bboxes[:, 2] >= x2 - x1 - margin) & (x2 < width))
+            | ((bboxes[:, 3] >= y2 - y1 - margin) & (y2 < height)))
+
+def detect_tiled(frame, model, classes=None, conf=0.5, tile_size=640, overlap=0.2, nms_threshold=0.6,
+                 nms_metric="iou", full_frame=True, imgsz=None, edge_margin=2.0):
+    """
+    タイルに分けて1回のバッチで検出し, タイルの境界で重複したボックスを NMS でまとめる
+    フレーム全体を拡大せずに遠くの小さい車両も検出するため
+    NMS は IoU で行い, タイルの境界で切れたボックスだけは IoS で比べて完全なボックスにまとめる
+    （重なった車両の小さいボックスを大きいボックスの中にあるというだけで除かないように）
+    :param full_frame: True ならフレーム全体（縮小）もバッチに加える（タイルより大きい車両用）
+    :param edge_margin: タイルの境界からこの画素数以内にかかるボックスを切れたものとみなす
+    :return: (xyxy (n, 4), conf (n,), cls (n,))
+    """
+    height, width = frame.shape[:2]
+    tiles = make_tiles(width, height, tile_size, overlap)
+    if full_frame and len(tiles) > 1:
+        tiles.append((0, 0, width, height))
+    images = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    results = model.predict(images, conf=conf, classes=classes, verbose=False, **_inference_options(imgsz))
+    bboxes, scores, labels, truncated = [], [], [], []
+    for tile, result in zip(tiles, results):
+        boxes = result.boxes.cpu().numpy()
+        if len(boxes) == 0:
+            continue
+        x1, y1 = tile[:2]
+        bboxes.append(boxes.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32))
+        scores.append(boxes.conf)
+        labels.append(boxes.cls)
+        truncated.append(cut_at_tile_edge(boxes.xyxy, tile, width, height, edge_margin))
+    if not bboxes:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+    bboxes, scores, labels = np.concatenate(bboxes), np.concatenate(scores), np.concatenate(labels)
+    keep = nms(bboxes, scores, nms_threshold, nms_metric, labels, truncated=np.concatenate(truncated))
+    return bboxes[keep], scores[keep], labels[keep]
+
+def perform_yolo_tiled(frame, model, tracker, classes=None, conf=0.5, with_conf=False, roi=None, imgsz=None,
+                       tile_size=640, overlap=0.2):
+    """
+    タイル分割で検出してトラッカーを更新する（返り値は perform_yolo と同じ形式）
+    :param tracker: create_tracker() で生成したトラッカー（動画ごとに1つ）
+    """
+    from ultralytics.engine.results import Boxes
+
+    if roi is not None:
+        frame = roi.crop(frame)
+    bboxes, scores, labels = detect_tiled(frame, model, classes, conf, tile_size, overlap, imgsz=imgsz)
+    data = np.concatenate([bboxes, scores[:, None], labels[:, None]], axis=1)
+    tracks = tracker.update(Boxes(data, frame.shape[:2]), frame)
+    if len(tracks) == 0:
+        return []
+    ids, coords, track_scores = _to_frame_coords(tracks[:, 4].astype(int), tracks[:, :4], tracks[:, 5], roi)
+    if with_conf:
+        return [(int(t), xyxy.tolist(), float(c)) for t, xyxy, c in zip(ids, coords, track_scores)]
+    return [(int(t), xyxy.tolist()) for t, xyxy in zip(ids, coords)]
+
 def update_tracked_data(tracked_data, detections):
     for track_id, bbox in detections:
         if track_id not in tracked_data:
             tracked_data[track_id] = []
         tracked_data[track_id].append(bbox)
 
-def process_frame_data(frame, model, classes, tracked_data, predict_bbox):
-    # YOLOによる検出
-    detections = perform_yolo(frame, model, classes)
-    detection_dict = {track_id: bbox for track_id, bbox in detections}  # リストを辞書型に変換
-    update_tracked_data(tracked_data, detections)
-    # 予測
-    predictions = {
-        track_id: predict_bbox(tracked_data, track_id)
-        for track_id in tracked_data
-    }
-    return detection_dict, predictions
-
-
+def bridge_detections(tracked_data, predict_bbox, track_ids=None):
+    """
+    検出器を動かさないフレームの処理
+    handle_replace が未検出トラックを埋めるのと同じように, 予測値を検出値の代わりに履歴に追加する
+    :param track_ids: 予測するトラック（None なら tracked_data の全トラック）
+    :return: (検出値 {}（検出していないので空）, 予測値)
+    """
+    if track_ids is None:
+        track_ids = tracked_data.keys()
+    predictions = predict_tracks(tracked_data, predict_bbox, list(track_ids))
+    update_tracked_data(tracked_data, [(t, bbox) for t, bbox in predictions.items() if bbox is not None])
+    if hasattr(predict_bbox, "observe"):    # 状態を持つ予測器は観測なしで1フレーム進める
+        predict_bbox.observe({}, track_ids)
+    return {}, predictions
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+import src.prediction_evaluator as evaluator
+from src.anomaly_detectors import (detect_combined_anomalies, detect_combined_anomalies_fast,
+                                   detect_combined_anomalies_batch)
+
+
+def random_bboxes(rng, n):
+    x1 = rng.uniform(0, 500, n)
+    y1 = rng.uniform(0, 500, n)
+    return np.stack([x1, y1, x1 + rng.uniform(0, 80, n), y1 + rng.uniform(0, 80, n)], axis=1)
+
+
+class TestAnomalyDetectors(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 500
+        self.current = random_bboxes(rng, n)
+        # 少しずらした予測値と前回値（閾値付近の判定が混ざるように）
+        self.predicted = self.current + rng.normal(0, 2, (n, 4))
+        self.previous = self.current + rng.normal(0, 2, (n, 4))
+        self.previous[::7] = self.current[::7] * 1.5     # 大きく変化したもの
+        self.thresholds = (0.9, 0.95, 0.95)
+
+    def test_batch_matches_scalar(self):
+        """配列版のメトリクスと判定がスカラー版と一致すること"""
+        print("=== 異常検知の配列版のテスト ===")
+        is_anomaly, scores = detect_combined_anomalies_batch(self.current, self.previous, self.predicted, *self.thresholds)
+        for i, (current, previous, predicted) in enumerate(zip(self.current.tolist(), self.previous.tolist(),
+                                                               self.predicted.tolist())):
+            self.assertAlmostEqual(scores["iou"][i], evaluator.calculate_iou(current, predicted))
+            self.assertAlmostEqual(scores["area"][i], evaluator.calculate_area_ratio(current, previous))
+            self.assertAlmostEqual(scores["aspect"][i], evaluator.calculate_aspect_ratio(current, previous))
+            expected, _ = detect_combined_anomalies(current, previous, predicted, *self.thresholds)
+            self.assertEqual(is_anomaly[i], expected)
+        self.assertTrue(is_anomaly.any() and not is_anomaly.all())
+
+    def test_batch_without_previous(self):
+        """前回値がない行（NaN）は面積比・縦横比で異常にならないこと"""
+        print("=== 前回値なしの配列版異常検知のテスト ===")
+        previous = self.previous.copy()
+        previous[:10] = np.nan
+        predicted = self.predicted.copy()
+        predicted[:10] += 1000     # IoU は 0（異常）
+        is_anomaly, scores = detect_combined_anomalies_batch(self.current, previous, predicted, *self.thresholds)
+        self.assertFalse(is_anomaly[:10].any())
+        self.assertTrue(np.isnan(scores["area"][:10]).all())
+        self.assertEqual(scores["iou"][0], 0)
+
+    def test_fast_matches_combined(self):
+        """打ち切り版の判定が detect_combined_anomalies と一致すること"""
+        print("=== 異常検知の打ち切り版のテスト ===")
+        for current, previous, predicted in zip(self.current.tolist(), self.previous.tolist(), self.predicted.tolist()):
+            expected, _ = detect_combined_anomalies(current, previous, predicted, *self.thresholds)
+            self.assertEqual(detect_combined_anomalies_fast(current, previous, predicted, *self.thresholds), expected)
+        self.assertFalse(detect_combined_anomalies_fast([0, 0, 10, 10], None, [100, 100, 110, 110]))
+
+
+if __name__ == '__main__':
+    unittest.main()
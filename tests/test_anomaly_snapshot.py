@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.anomaly_handler import AnomalySnapshotWriter, crop_around
+
+
+class TestAnomalySnapshotWriter(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.frame = np.full((720, 1280, 3), 128, dtype=np.uint8)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_crop_around(self):
+        """検出値と予測値を囲む矩形に余白をつけ, フレーム内に収めて切り出すこと"""
+        print("=== 異常箇所の切り出しのテスト ===")
+        image, origin = crop_around(self.frame, [[100, 100, 200, 150], [120, 110, 220, 160]], padding=0.5)
+        self.assertEqual(origin, (40, 70))
+        self.assertEqual(image.shape, (120, 240, 3))
+        image, origin = crop_around(self.frame, [[0, 0, 50, 50]], padding=1.0)
+        self.assertEqual((origin, image.shape), ((0, 0), (100, 100, 3)))
+
+    def test_rate_limit(self):
+        """同じトラックは min_interval フレームに1枚だけ保存すること"""
+        print("=== 異常検知フレームの保存間隔のテスト ===")
+        folder = os.path.join(self.folder.name, "anomalies")
+        writer = AnomalySnapshotWriter(folder, crop=True, jpeg_quality=80, min_interval=5)
+        for frame_number in range(1, 13):
+            writer.submit(self.frame, frame_number, 1, [100, 100, 200, 150], [110, 100, 210, 150])
+        writer.submit(self.frame, 3, 2, [300, 300, 400, 350], [300, 300, 400, 350])
+        stats = writer.close()
+        self.assertEqual(stats, {"saved": 4, "skipped": 9, "dropped": 0, "errors": 0})
+        self.assertEqual(sorted(os.listdir(folder)),
+                         ["frame_11_track_1.jpg", "frame_1_track_1.jpg", "frame_3_track_2.jpg",
+                          "frame_6_track_1.jpg"])
+        image = cv2.imread(os.path.join(folder, "frame_1_track_1.jpg"))
+        self.assertEqual(image.shape, (100, 220, 3))     # 切り出した大きさで保存
+
+    def test_full_frame(self):
+        """crop=False ならフレーム全体を保存し, 元のフレームは書き換えないこと"""
+        print("=== 異常検知フレーム全体の保存のテスト ===")
+        writer = AnomalySnapshotWriter(self.folder.name, min_interval=0)
+        writer.submit(self.frame, 7, 3, [100, 100, 200, 150], [110, 100, 210, 150])
+        writer.close()
+        image = cv2.imread(os.path.join(self.folder.name, "frame_7_track_3.jpg"))
+        self.assertEqual(image.shape, self.frame.shape)
+        self.assertTrue((self.frame == 128).all())
+
+    def test_write_error(self):
+        """書き込みに失敗しても close() は例外を送出せず, 失敗した数を返すこと"""
+        print("=== 異常検知フレームの保存失敗のテスト ===")
+        folder = os.path.join(self.folder.name, "anomalies")
+        writer = AnomalySnapshotWriter(folder, min_interval=0)
+        shutil.rmtree(folder)       # 保存先がなくなって書き込めない
+        with self.assertLogs("src.anomaly_handler", level="WARNING"):
+            writer.submit(self.frame, 1, 1, [100, 100, 200, 150], [110, 100, 210, 150])
+            writer.submit(self.frame, 2, 1, [100, 100, 200, 150], [110, 100, 210, 150])
+            stats = writer.close()
+        self.assertEqual((stats["saved"], stats["errors"]), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
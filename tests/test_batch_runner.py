@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import src.batch_runner as batch_runner
+from src.batch_runner import (SUMMARY_FILE, BATCH_SUMMARY_FILE, video_results_folder, is_processed,
+                              merge_summaries, run_batch)
+
+
+def _fake_init_worker(model_path, num_threads):
+    """モデルを読み込まないワーカーの初期化"""
+
+def _fake_process_one(video_path, results_folder):
+    """名前に broken を含む動画は失敗し, それ以外は summary.json を書く"""
+    if "broken" in video_path:
+        raise RuntimeError("failed")
+    return _write_summary(results_folder, video_path, frames=10)
+
+def _write_summary(results_folder, video_path, frames):
+    summary = {"video": video_path, "frames": frames, "tracks": 2, "anomalies": 1, "elapsed_sec": 0.5}
+    output_folder = video_results_folder(results_folder, video_path)
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f)
+    return summary
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.videos = os.path.join(self.tmp.name, "videos")
+        self.results = os.path.join(self.tmp.name, "results")
+        os.makedirs(self.videos)
+        for name in ["a.mp4", "b.mp4", "broken.mp4"]:
+            open(os.path.join(self.videos, name), "w").close()
+        self.video_paths = sorted(os.path.join(self.videos, name) for name in os.listdir(self.videos))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_batch(self, **kwargs):
+        with mock.patch.object(batch_runner, "_init_worker", _fake_init_worker), \
+                mock.patch.object(batch_runner, "_process_one", _fake_process_one):
+            return run_batch(self.videos, self.results, "model.pt", **kwargs)
+
+    def test_is_processed(self):
+        """summary.json がある動画だけを処理済みとすること"""
+        print("=== 処理済みの判定のテスト ===")
+        video_path = self.video_paths[0]
+        self.assertFalse(is_processed(self.results, video_path))
+        os.makedirs(os.path.join(video_results_folder(self.results, video_path), "histograms"))
+        self.assertFalse(is_processed(self.results, video_path))    # 途中で止まった動画
+        _write_summary(self.results, video_path, frames=10)
+        self.assertTrue(is_processed(self.results, video_path))
+
+    def test_merge_summaries(self):
+        """summary.json のある動画だけを合計し, 失敗した動画を記録すること"""
+        print("=== 概要のまとめのテスト ===")
+        _write_summary(self.results, self.video_paths[0], frames=10)
+        _write_summary(self.results, self.video_paths[1], frames=30)
+        merged = merge_summaries(self.results, self.video_paths, failed=[self.video_paths[2]])
+        self.assertEqual(merged["videos"], 2)
+        self.assertEqual(merged["frames"], 40)
+        self.assertEqual(merged["anomalies"], 2)
+        self.assertEqual(merged["failed"], [self.video_paths[2]])
+        with open(os.path.join(self.results, BATCH_SUMMARY_FILE), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), merged)
+
+    def test_run_batch_resume(self):
+        """失敗した動画を記録し, 再実行では処理済みの動画をスキップすること"""
+        print("=== まとめて処理と再開のテスト ===")
+        merged = self.run_batch()
+        self.assertEqual(merged["videos"], 2)
+        self.assertEqual(merged["failed"], [os.path.join(self.videos, "broken.mp4")])
+
+        _write_summary(self.results, self.video_paths[0], frames=99)    # 処理し直すと 10 に戻る
+        merged = self.run_batch(workers=2)
+        self.assertEqual(merged["frames"], 99 + 10)
+        self.assertEqual(merged["failed"], [os.path.join(self.videos, "broken.mp4")])
+
+        merged = self.run_batch(resume=False)
+        self.assertEqual(merged["frames"], 20)
+
+    def test_invalid_workers(self):
+        """ワーカー数が1未満なら ValueError を送出すること"""
+        print("=== ワーカー数の確認のテスト ===")
+        with self.assertRaises(ValueError):
+            self.run_batch(workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.columnar import META_FILE, ColumnarWriter, ColumnarReader
+from src.detection_cache import cache_folder, DetectionCacheWriter, open_detection_cache
+
+
+class TestDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.tmp.name, "sample.mp4")
+        with open(self.video_path, "wb") as f:
+            f.write(b"dummy")
+        self.settings = {"classes": [2], "conf": 0.5, "target_fps": 10}
+        self.folder = cache_folder(self.tmp.name, self.video_path, "yolov8x.pt", self.settings)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_and_replay(self):
+        """書き込んだ検出結果がフレームごとに同じ形で読み出せること（検出なしのフレームも含む）"""
+        print("=== 検出キャッシュの書き込みと再生のテスト ===")
+        frames = {
+            1: [(1, [10, 10, 50, 50], 0.9), (2, [20, 20, 60, 60], 0.8)],
+            2: [],
+            3: [(2, [22, 22, 62, 62], 0.7)],
+        }
+        writer = DetectionCacheWriter(self.folder, self.video_path, "yolov8x.pt", self.settings)
+        for frame_number, scored in frames.items():
+            writer.write_frame(frame_number, scored)
+        writer.close()
+
+        cache = open_detection_cache(self.folder)
+        self.assertEqual(len(cache), 3)
+        replayed = dict(cache.iter_frames(with_conf=True))
+        for frame_number, scored in frames.items():
+            self.assertEqual([t for t, _, _ in replayed[frame_number]], [t for t, _, _ in scored])
+            for (_, bbox, conf), (_, expected_bbox, expected_conf) in zip(replayed[frame_number], scored):
+                np.testing.assert_allclose(bbox, expected_bbox)
+                self.assertAlmostEqual(conf, expected_conf, places=5)
+        self.assertEqual(cache.detections(3), [(2, [22.0, 22.0, 62.0, 62.0])])
+        self.assertIsInstance(cache.xyxy, np.memmap)
+
+    def test_incomplete_cache_is_ignored(self):
+        """途中終了したキャッシュは使われないこと"""
+        print("=== 未完了の検出キャッシュのテスト ===")
+        writer = DetectionCacheWriter(self.folder, self.video_path, "yolov8x.pt", self.settings)
+        writer.write_frame(1, [(1, [10, 10, 50, 50], 0.9)])
+        writer.close(complete=False)
+        self.assertIsNone(open_detection_cache(self.folder))
+
+    def test_columnar_writer_context(self):
+        """with 文を正常に抜ければ meta.json を書き, 例外で抜ければ書かないこと"""
+        print("=== カラムナ形式の with 文のテスト ===")
+        folder = os.path.join(self.tmp.name, "columns")
+        with ColumnarWriter(folder, {"frame": "int32"}) as writer:
+            writer.append(frame=[1, 2, 3])
+        self.assertEqual(len(ColumnarReader(folder)), 3)
+        with self.assertRaises(RuntimeError):
+            with ColumnarWriter(folder, {"frame": "int32"}) as writer:
+                writer.append(frame=[1, 2])
+                raise RuntimeError("failed")
+        self.assertFalse(os.path.exists(os.path.join(folder, META_FILE)))
+
+    def test_key_depends_on_settings(self):
+        """設定が変わればキャッシュの場所も変わること"""
+        print("=== 検出キャッシュのキーのテスト ===")
+        other = cache_folder(self.tmp.name, self.video_path, "yolov8x.pt", {**self.settings, "conf": 0.3})
+        self.assertNotEqual(self.folder, other)
+
+
+if __name__ == '__main__':
+    unittest.main()
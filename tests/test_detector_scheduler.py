@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from src.detector_scheduler import DetectorScheduler
+from src.tracking import new_tracking_state, track_frame, bridge_frame
+
+
+class TestDetectorScheduler(unittest.TestCase):
+    def test_static_frames(self):
+        """動きがなければ max_gap フレームごとにだけ検出すること"""
+        print("=== 静止画の検出スケジュールのテスト ===")
+        scheduler = DetectorScheduler(threshold=3.0, max_gap=4)
+        frame = np.full((360, 640, 3), 100, dtype=np.uint8)
+        decisions = [scheduler.should_detect(frame) for _ in range(15)]
+        self.assertEqual(decisions, [True, False, False, False, False] * 3)
+        stats = scheduler.stats()
+        self.assertEqual(stats["detector_calls"], 3)
+        self.assertEqual(stats["bridged_frames"], 12)
+        self.assertAlmostEqual(stats["savings"], 0.8)
+
+    def test_motion(self):
+        """動きが大きいフレームは毎回検出すること"""
+        print("=== 動きのあるフレームの検出スケジュールのテスト ===")
+        scheduler = DetectorScheduler(threshold=3.0, max_gap=10)
+        rng = np.random.default_rng(0)
+        decisions = [scheduler.should_detect(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)) for _ in range(5)]
+        self.assertTrue(all(decisions))
+        self.assertGreater(scheduler.last_score, 3.0)
+
+    def test_bridge_frame(self):
+        """検出しなかったフレームは予測値を履歴に追加し, 異常検知はしないこと"""
+        print("=== 予測値によるフレームの補間のテスト ===")
+        for method in ("linear", "kalman"):
+            state = new_tracking_state({"prediction_method": method, "verbose": False})
+            for frame_number in range(1, 11):
+                x = 10 * frame_number
+                track_frame(frame_number, [(1, [x, 10, x + 40, 50])], state)
+            length = len(state["tracked_data"][1])
+            _, predictions = bridge_frame(11, state)
+            self.assertEqual(len(state["tracked_data"][1]), length + 1)
+            np.testing.assert_allclose(state["tracked_data"][1][-1], predictions[1], rtol=1e-5)
+            self.assertAlmostEqual(predictions[1][0], 110, delta=15)
+            self.assertEqual(state["bridged_frames"], 1)
+            self.assertEqual(state["frame_count"], 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.frame_source import FrameSource, frame_ratio
+
+
+class FakeCapture:
+    """フレーム番号をフレームとして返す VideoCapture の代わり（シーク対応）"""
+
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+        self.position = 0
+        self.decoded = 0
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.position >= self.num_frames:
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        if self.position >= self.num_frames:
+            return False, None
+        self.position += 1
+        self.decoded += 1
+        return True, self.position - 1
+
+    def set(self, prop_id, value):
+        self.position = int(value)
+        return True
+
+
+def read_all(source):
+    frames = []
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            return frames
+        frames.append(frame)
+
+
+class TestFrameSource(unittest.TestCase):
+    def test_integer_ratio(self):
+        """割り切れる場合は従来の grab() による間引きと同じフレームになること"""
+        print("=== 整数比の間引きのテスト ===")
+        for mode in ("grab", "seek", "auto"):
+            frames = read_all(FrameSource(FakeCapture(100), 30, 10, mode))
+            self.assertEqual(frames, list(range(2, 100, 3)))
+
+    def test_fractional_ratio(self):
+        """29.97fps → 10fps で k 番目に floor((k+1) * 比) - 1 番目のフレームを取り出すこと"""
+        print("=== 分数比の間引きのテスト ===")
+        source = FrameSource(FakeCapture(3000), 30000 / 1001, 10)
+        self.assertEqual(source.ratio, frame_ratio(29.97002997, 10))
+        frames = read_all(source)
+        expected = [(k + 1) * 3000 // 1001 - 1 for k in range(1100) if (k + 1) * 3000 // 1001 - 1 < 3000]
+        self.assertEqual(frames, expected)
+        self.assertEqual(len(frames), 1001)     # 100.1 秒分（従来の int(29.97 // 10) = 2 では 1500 フレーム = 15fps 相当）
+
+    def test_auto_seeks_large_gaps(self):
+        """"auto" は飛ばす枚数が多いときだけシークし, デコードは取り出すフレームだけになること"""
+        print("=== 自動切り替えの間引きのテスト ===")
+        cap = FakeCapture(6000)
+        source = FrameSource(cap, 60, 1, "auto", seek_threshold=30)
+        frames = read_all(source)
+        self.assertEqual(frames, list(range(59, 6000, 60)))
+        self.assertEqual(source.grabbed, 0)
+        self.assertEqual(cap.decoded, 100)
+        small = FrameSource(FakeCapture(100), 30, 10, "auto", seek_threshold=30)
+        read_all(small)
+        self.assertEqual(small.seeks, 0)
+
+    def test_video_seek_matches_grab(self):
+        """実際の動画でもシークと grab() で同じフレームが得られること"""
+        print("=== 動画でのシークのテスト ===")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sample.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+            for i in range(60):
+                writer.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+            writer.release()
+            results = {}
+            for mode in ("grab", "seek"):
+                cap = cv2.VideoCapture(path)
+                source = FrameSource(cap, 30, 4, mode)
+                results[mode] = [int(round(frame.mean() / 4)) for frame in read_all(source)]
+                source.release()
+        self.assertEqual(results["grab"], results["seek"])
+        self.assertEqual(results["grab"], [(k + 1) * 15 // 2 - 1 for k in range(8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.histogram_generator import save_all_histograms
+from src.streaming_metrics import StreamingMetric
+
+
+class TestHistogramGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.metrics = {
+            name: {track_id: StreamingMetric.from_values(rng.beta(8, 1, 50)) for track_id in (1, 2, 3)}
+            for name in ("iou", "area", "aspect")
+        }
+        self.metrics["iou"][4] = StreamingMetric()  # 値のないトラックは保存しない
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_render(self):
+        """プロセスプールで描画してもトラックごとの PNG と JSON が保存されること"""
+        print("=== ヒストグラムの並列描画のテスト ===")
+        save_all_histograms(self.metrics, self.tmp.name, workers=2)
+        files = set(os.listdir(self.tmp.name))
+        for name in ("iou", "area", "aspect"):
+            for track_id in (1, 2, 3):
+                self.assertIn(f"{name}_{track_id}.png", files)
+                self.assertIn(f"{name}_{track_id}_stats.json", files)
+        self.assertNotIn("iou_4.png", files)
+        with open(os.path.join(self.tmp.name, "iou_1_stats.json")) as f:
+            self.assertEqual(json.load(f)["cdf"], self.metrics["iou"][1].cdf().tolist())
+
+    def test_combined_render(self):
+        """まとめて描画するとメトリクスごとに1枚になること"""
+        print("=== ヒストグラムのまとめ描画のテスト ===")
+        save_all_histograms(self.metrics, self.tmp.name, workers=0, combined=True)
+        pngs = sorted(f for f in os.listdir(self.tmp.name) if f.endswith(".png"))
+        self.assertEqual(pngs, ["area_all.png", "aspect_all.png", "iou_all.png"])
+        self.assertIn("area_2_stats.json", os.listdir(self.tmp.name))
+
+    def test_lazy_matplotlib(self):
+        """読み込んだだけでは matplotlib を読み込まないこと"""
+        print("=== matplotlib の遅延読み込みのテスト ===")
+        code = "import sys, src.histogram_generator; print('matplotlib' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from src.prediction import (get_prediction_function, predict_bbox_quadratic,
+                            predict_bbox_quadratic_weighted_with_outlier_removal)
+from src.track_store import TrackStore
+from src.yolo_handler import update_tracked_data
+
+
+class TestIncrementalQuadraticPredictor(unittest.TestCase):
+    def setUp(self):
+        """曲線的に動く車両の 600 フレーム分の軌跡（ときどき外れ値が入る）"""
+        rng = np.random.default_rng(1)
+        t = np.arange(600)[:, None]
+        self.boxes = 300 + 40 * np.sin(t / 25) + np.array([0, 0, 80, 60]) + rng.normal(0, 0.5, size=(600, 4))
+        self.boxes[rng.choice(600, size=20, replace=False)] += 200
+
+    def check_matches(self, method, reference, tracked_data):
+        predict_bbox = get_prediction_function(method)
+        for i, bbox in enumerate(self.boxes):
+            update_tracked_data(tracked_data, [(1, bbox.tolist())])
+            expected = reference(tracked_data, 1)
+            actual = predict_bbox(tracked_data, 1)
+            if expected is None:
+                self.assertIsNone(actual)
+            else:
+                np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-6, err_msg=f"frame {i}")
+
+    def test_quadratic_matches_polyfit(self):
+        """逐次更新版が predict_bbox_quadratic と一致すること"""
+        print("=== 逐次更新二次予測のテスト ===")
+        self.check_matches("quadratic_incremental", predict_bbox_quadratic, {})
+
+    def test_weighted_matches_polyfit(self):
+        """逐次更新版が外れ値除去付き重み付け二次予測と一致すること"""
+        print("=== 逐次更新重み付け二次予測のテスト ===")
+        self.check_matches("quadratic_weight_incremental",
+                           predict_bbox_quadratic_weighted_with_outlier_removal, {})
+
+    def test_track_store(self):
+        """TrackStore の履歴でも同じ結果になること"""
+        print("=== 逐次更新二次予測（TrackStore）のテスト ===")
+        self.boxes = self.boxes.astype(np.float32)
+        self.check_matches("quadratic_incremental", predict_bbox_quadratic, TrackStore(capacity=12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from src.kalman_filter import KalmanBoxPredictor
+from src.prediction import get_prediction_function, predict_bbox_kalman, predict_tracks
+
+
+def moving_box(i, vx=5.0, vy=2.0):
+    return [100 + vx * i, 50 + vy * i, 180 + vx * i, 110 + vy * i]
+
+
+class TestKalmanBoxPredictor(unittest.TestCase):
+    def test_constant_velocity(self):
+        """等速で動く車両の次フレームを予測できること"""
+        print("=== カルマン予測（等速）のテスト ===")
+        kalman = KalmanBoxPredictor()
+        for i in range(30):
+            kalman.observe({1: moving_box(i)})
+        np.testing.assert_allclose(kalman.predict_all()[1], moving_box(30), atol=0.5)
+
+    def test_missed_frames_predict_only(self):
+        """未検出フレームでは予測ステップのみ進み、動きが継続すること"""
+        print("=== カルマン予測（未検出フレーム）のテスト ===")
+        kalman = KalmanBoxPredictor()
+        for i in range(30):
+            kalman.observe({1: moving_box(i)})
+        for _ in range(3):
+            kalman.observe({}, track_ids=[1])
+        np.testing.assert_allclose(kalman.predict_all()[1], moving_box(33), atol=1.0)
+        kalman.observe({}, track_ids=[])     # tracked_data から消えたトラックは破棄
+        self.assertNotIn(1, kalman)
+
+    def test_stacked_tracks_match_single(self):
+        """複数トラックをまとめて処理しても1トラックずつと同じ結果になること"""
+        print("=== カルマン予測（複数トラック）のテスト ===")
+        stacked = KalmanBoxPredictor(max_tracks=2)
+        singles = {track_id: KalmanBoxPredictor() for track_id in range(5)}
+        for i in range(15):
+            detections = {t: moving_box(i, vx=t, vy=-t) for t in range(5) if (i + t) % 4 != 0}
+            stacked.observe(detections, track_ids=range(5))
+            for t, kalman in singles.items():
+                kalman.observe({t: detections[t]} if t in detections else {}, track_ids=[t])
+        predictions = stacked.predict_all()
+        for t, kalman in singles.items():
+            np.testing.assert_allclose(predictions[t], kalman.predict_all()[t])
+
+    def test_prediction_interface(self):
+        """get_prediction_function("kalman") が他の予測関数と同じ形で使えること"""
+        print("=== カルマン予測の呼び出し形式のテスト ===")
+        predict_bbox = get_prediction_function("kalman")
+        tracked_data = {1: [moving_box(i) for i in range(10)], 2: [moving_box(0)]}
+        for i in range(10):
+            predict_bbox.observe({1: moving_box(i), 2: moving_box(0)}, tracked_data.keys())
+        predictions = predict_tracks(tracked_data, predict_bbox)
+        np.testing.assert_allclose(predictions[2], moving_box(0), atol=1e-6)
+        np.testing.assert_allclose(predictions[1], moving_box(10), atol=1.0)
+        np.testing.assert_allclose(predict_bbox_kalman(tracked_data, 1), moving_box(10), atol=1.0)
+        self.assertIsNone(predict_bbox_kalman({1: [moving_box(0)]}, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
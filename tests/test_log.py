@@ -0,0 +1,71 @@
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import src.log as log
+from src.tracking import new_tracking_state, track_frame
+
+
+class CountingRepr:
+    """文字列にされた回数を数える"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __repr__(self):
+        self.count += 1
+        return "counted"
+
+
+class TestLog(unittest.TestCase):
+    def tearDown(self):
+        root = logging.getLogger(log.ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(logging.NOTSET)
+        root.propagate = True
+
+    def test_level_gating(self):
+        """DEBUG を出力しないときはフレームごとの出力の文字列を組み立てないこと"""
+        print("=== ログのレベルのテスト ===")
+        stream = io.StringIO()
+        log.configure("INFO", stream)
+        value = CountingRepr()
+        log.log_predictions_and_detections({1: value}, {})
+        log.display_latest_tracked_data({1: [value]}, 1)
+        self.assertEqual((value.count, stream.getvalue()), (0, ""))
+        log.configure("DEBUG", stream)
+        log.log_predictions_and_detections({1: value}, {})
+        self.assertEqual(value.count, 1)
+        self.assertIn("Detections: {1: counted}", stream.getvalue())
+
+    def test_frame_record_sink(self):
+        """フレームごとの記録を buffer_size 行たまるごとにまとめて JSON Lines で書き出すこと"""
+        print("=== フレームごとの記録のテスト ===")
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "frames.jsonl")
+            sink = log.FrameRecordSink(path, buffer_size=30)
+            state = new_tracking_state({"prediction_method": "linear", "verbose": False})
+            state["frame_log"] = sink
+            for frame_number in range(1, 11):
+                track_frame(frame_number, [(1, [10 * frame_number, 0, 10 * frame_number + 40, 30]),
+                                           (2, [0, 100, 40, 130])], state)
+            self.assertEqual(sink.records, 0)   # まだバッファの中
+            for frame_number in range(11, 16):
+                track_frame(frame_number, [(2, [0, 100, 40, 130])], state)
+            self.assertEqual(sink.records, 30)
+            self.assertEqual(sink.close(), 30)
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(records[0], {"frame": 1, "track": 1, "det": [10.0, 0.0, 50.0, 30.0], "pred": None,
+                                      "anomaly": False})
+        self.assertEqual((records[-2]["frame"], records[-2]["track"]), (15, 1))
+        self.assertIsNone(records[-2]["det"])      # 未検出のフレームは予測値だけ
+        self.assertEqual(records[-2]["pred"], [150.0, 0.0, 190.0, 30.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from src.detection_cache import DetectionCacheWriter
+from src.param_sweep import grid_space, random_space, evaluate_config, run_sweep
+
+
+class TestParamSweep(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, "cache")
+        writer = DetectionCacheWriter(self.folder, "sample.mp4", "yolov8x.pt", {})
+        for frame_number in range(1, 21):
+            x = 10 + 3 * frame_number
+            scored = [(1, [x, 10, x + 40, 50], 0.9)]
+            if frame_number == 15:
+                scored = [(1, [x, 10, x + 80, 90], 0.9)]    # 急に大きくなる（異常）
+            writer.write_frame(frame_number, scored)
+        writer.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_spaces(self):
+        """グリッド探索は全組み合わせ, ランダム探索は候補の中から選ぶこと"""
+        print("=== 探索空間のテスト ===")
+        space = {"iou_threshold": [0.9, 0.98], "num_frames": [6, 10, 12]}
+        self.assertEqual(len(grid_space(space)), 6)
+        configs = random_space(space, 5, seed=1)
+        self.assertEqual(len(configs), 5)
+        for config in configs:
+            self.assertIn(config["num_frames"], space["num_frames"])
+        self.assertEqual(configs, random_space(space, 5, seed=1))
+
+    def test_evaluate_config(self):
+        """閾値を緩めると異常検知数が減ること"""
+        print("=== 設定ごとの評価のテスト ===")
+        strict = evaluate_config([self.folder], {"iou_threshold": 0.98, "area_threshold": 0.98, "ratio_threshold": 0.98})
+        loose = evaluate_config([self.folder], {"iou_threshold": 0.0, "area_threshold": 0.0, "ratio_threshold": 0.0})
+        self.assertEqual(strict["frames"], 20)
+        self.assertEqual(strict["tracks"], 1)
+        self.assertGreater(strict["anomalies"], 0)
+        self.assertEqual(loose["anomalies"], 0)
+        self.assertIsNotNone(strict["iou_p50"])
+
+    def test_run_sweep(self):
+        """全設定の結果が CSV に1行ずつ保存されること"""
+        print("=== パラメータ探索のテスト ===")
+        output = os.path.join(self.tmp.name, "sweep.csv")
+        configs = grid_space({"iou_threshold": [0.9, 0.98], "max_missed_frame": [5, 15]})
+        run_sweep([self.folder], configs, output, workers=2)
+        with open(output, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 4)
+        self.assertIn("anomalies", rows[0])
+
+    def test_run_sweep_without_configs(self):
+        """設定が空なら評価を始める前に ValueError を送出すること"""
+        print("=== 設定が空のパラメータ探索のテスト ===")
+        output = os.path.join(self.tmp.name, "sweep.csv")
+        with self.assertRaises(ValueError):
+            run_sweep([self.folder], [], output)
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from src.pipeline import BoundedQueue, run_pipeline
+
+
+class FakeCapture:
+    """フレーム番号をフレームとして返す VideoCapture の代わり"""
+
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+        self.position = 0
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        self.position += 1
+        return self.position <= self.num_frames
+
+    def read(self):
+        ok = self.grab()
+        return ok, (self.position if ok else None)
+
+
+class TestPipeline(unittest.TestCase):
+    def test_drop_oldest(self):
+        """drop_oldest では満杯時に古い要素が捨てられること"""
+        print("=== BoundedQueue drop_oldest のテスト ===")
+        queue = BoundedQueue(2, policy="drop_oldest")
+        for i in range(5):
+            queue.put(i)
+        self.assertEqual(queue.dropped, 3)
+        self.assertEqual([queue.get(), queue.get()], [3, 4])
+
+    def test_block_keeps_order(self):
+        """block ではすべてのフレームが順番通りに後処理されること"""
+        print("=== run_pipeline のテスト ===")
+        processed = []
+        stats = run_pipeline(FakeCapture(50), 2, detect=lambda frame: [(1, [frame] * 4)],
+                             postprocess=lambda n, frame, det: processed.append((n, frame, det)),
+                             queue_size=2)
+        self.assertEqual(stats["frames"], 25)
+        self.assertEqual([n for n, _, _ in processed], list(range(1, 26)))
+        self.assertEqual([frame for _, frame, _ in processed], list(range(2, 51, 2)))
+
+    def test_stop_from_postprocess(self):
+        """後処理が True を返したら途中で終了すること"""
+        print("=== run_pipeline 途中終了のテスト ===")
+        stats = run_pipeline(FakeCapture(1000), 1, detect=lambda frame: [],
+                             postprocess=lambda n, frame, det: n == 10, queue_size=4)
+        self.assertEqual(stats["frames"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
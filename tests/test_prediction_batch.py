@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from src.prediction import (predict_bbox_linear, predict_bbox_quadratic, predict_bbox_quadratic_weighted,
+                            predict_bbox_quadratic_weighted_with_outlier_removal, get_prediction_function,
+                            predict_bbox_linear_batch, predict_bbox_quadratic_batch,
+                            predict_bbox_quadratic_weighted_batch, predict_tracks)
+from src.track_store import TrackStore
+
+
+class TestBatchPrediction(unittest.TestCase):
+    def setUp(self):
+        """ランダムな軌跡を持つ 20 トラック分のデータ"""
+        rng = np.random.default_rng(0)
+        start = rng.uniform(0, 500, size=(20, 1, 4))
+        velocity = rng.uniform(-5, 5, size=(20, 1, 4))
+        noise = rng.normal(0, 1, size=(20, 12, 4))
+        self.boxes = start + velocity * np.arange(12)[None, :, None] + noise
+        self.tracked_data = {track_id: self.boxes[track_id].tolist() for track_id in range(20)}
+
+    def test_batch_matches_single(self):
+        """一括予測が1トラックずつの予測と一致すること"""
+        print("=== 一括予測と個別予測の一致テスト ===")
+        cases = [
+            (predict_bbox_linear, predict_bbox_linear_batch, 4),
+            (predict_bbox_quadratic, predict_bbox_quadratic_batch, 10),
+            (predict_bbox_quadratic_weighted, predict_bbox_quadratic_weighted_batch, 10),
+        ]
+        for predict_single, predict_batch, num_frames in cases:
+            expected = [predict_single(self.tracked_data, track_id, num_frames) for track_id in range(20)]
+            actual = predict_batch(self.boxes[:, -num_frames:])
+            np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+    def test_predict_tracks(self):
+        """predict_tracks が dict と TrackStore のどちらでも同じ結果を返すこと"""
+        print("=== predict_tracks のテスト ===")
+        store = TrackStore(capacity=10)
+        for track_id, history in self.tracked_data.items():
+            for bbox in history:
+                store.append(track_id, bbox)
+        self.tracked_data[99] = [[0, 0, 10, 10]]    # データ不足
+        store.append(99, [0, 0, 10, 10])
+        from_dict = predict_tracks(self.tracked_data, predict_bbox_quadratic)
+        from_store = predict_tracks(store, predict_bbox_quadratic)
+        self.assertIsNone(from_dict[99])
+        self.assertIsNone(from_store[99])
+        for track_id in range(20):
+            np.testing.assert_allclose(from_store[track_id], from_dict[track_id], atol=1e-3)
+
+    def test_outlier_removal_batch(self):
+        """外れ値除去版: 外れ値のないトラックは一括予測, 外れ値のあるトラックは1トラックずつの予測と一致すること"""
+        print("=== 外れ値除去版の一括予測のテスト ===")
+        self.boxes[3, -1] += 300        # 最新フレームだけ大きく外れる
+        self.boxes[7, -5, 0] -= 200     # x1 だけ外れる
+        self.tracked_data = {track_id: self.boxes[track_id].tolist() for track_id in range(20)}
+        store = TrackStore(capacity=10)
+        for track_id, history in self.tracked_data.items():
+            for bbox in history:
+                store.append(track_id, bbox)
+        for predict_bbox in (predict_bbox_quadratic_weighted_with_outlier_removal,
+                             get_prediction_function("quadratic_weight", outlier_threshold=1.0)):
+            expected = {track_id: predict_bbox(self.tracked_data, track_id) for track_id in range(20)}
+            for tracked_data in (self.tracked_data, store):
+                actual = predict_tracks(tracked_data, predict_bbox)
+                for track_id in range(20):
+                    if expected[track_id] is None:
+                        self.assertIsNone(actual[track_id])
+                    else:
+                        np.testing.assert_allclose(actual[track_id], expected[track_id], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
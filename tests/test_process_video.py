@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import src.main as main
+from src.load_video import load_video
+
+
+class _Tensor:
+    """torch.Tensor の代わり（.cpu().numpy() で配列を返す）"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _Tracker:
+    def __init__(self):
+        self.next_id = 1
+
+    def reset(self):
+        self.next_id = 1
+
+
+class PersistentTrackModel:
+    """model.track(persist=True) と同じく, トラッカー（ID の番号）が model.predictor に残るモデル"""
+
+    def __init__(self):
+        self.predictor = None
+        self.ids = []
+
+    def track(self, frame, persist=True, **kwargs):
+        if self.predictor is None:
+            self.predictor = SimpleNamespace(trackers=[_Tracker()])
+        tracker = self.predictor.trackers[0]
+        track_id, tracker.next_id = tracker.next_id, tracker.next_id + 1
+        self.ids.append(track_id)
+        boxes = SimpleNamespace(id=_Tensor([track_id]), xyxy=_Tensor([[0, 0, 10, 10]]), conf=_Tensor([0.9]))
+        return [SimpleNamespace(boxes=boxes)]
+
+
+class TestProcessVideo(unittest.TestCase):
+    def setUp(self):
+        """10 フレームの小さい動画"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, "sample.avi")
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+        for i in range(10):
+            writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_outputs_closed_on_error(self):
+        """処理中に例外が起きても出力を閉じ, 動画を解放し, キャッシュを未完了のまま残して例外を送出すること"""
+        print("=== 例外で止まったときの後始末のテスト ===")
+        results = os.path.join(self.tmp.name, "results")
+        cache_root = os.path.join(results, "detection_cache")
+        caps = []
+
+        def open_video(path):
+            caps.append(load_video(path))
+            return caps[-1]
+
+        def failing_runner(cap, frame_skip_interval, state):
+            state["detection_cache"].write_frame(1, [(1, [0, 0, 10, 10], 0.9)])
+            state["frame_count"] = 1
+            raise RuntimeError("failed")
+
+        settings = {"WARM_UP": False, "DETECTION_CACHE": True, "DETECTION_CACHE_FOLDER": cache_root,
+                    "REPLAY_FROM_CACHE": False, "TRACK_EXPORT": True, "FRAME_LOG": True, "SAVE_ANOMALIES": True,
+                    "SAVE_VIDEO": False, "PIPELINE": False, "BATCH_SIZE": 1, "SCHEDULE_DETECTOR": False,
+                    "TILED_INFERENCE": False}
+        with mock.patch.multiple(main, **settings), mock.patch.object(main, "load_video", open_video), \
+                mock.patch.object(main, "run_serial", failing_runner):
+            with self.assertRaises(RuntimeError):
+                main.process_video(self.video, model=None, anomalies_folder=os.path.join(results, "anomalies"),
+                                   histograms_folder=os.path.join(results, "histograms"), show_frame=False)
+            cache = main.cache_folder(cache_root, self.video, main.YOLO_MODEL_PATH, main.detection_settings())
+        self.assertFalse(caps[0].isOpened())
+        self.assertIsNone(main.open_detection_cache(cache))     # meta.json がない（未完了）
+        with open(os.path.join(results, "tracks", "meta.json"), encoding="utf-8") as f:
+            self.assertTrue(json.load(f)["stopped"])
+        self.assertTrue(os.path.exists(os.path.join(results, "frames.jsonl")))
+
+    def test_missing_video(self):
+        """動画がなければ ValueError を送出し, 出力を閉じること"""
+        print("=== 動画が開けないときのテスト ===")
+        results = os.path.join(self.tmp.name, "results")
+        settings = {"DETECTION_CACHE_FOLDER": os.path.join(results, "detection_cache"), "TRACK_EXPORT": True,
+                    "FRAME_LOG": False}
+        with mock.patch.multiple(main, **settings):
+            with self.assertRaises(ValueError):
+                main.process_video(os.path.join(self.tmp.name, "missing.avi"), model=None,
+                                   anomalies_folder=os.path.join(results, "anomalies"),
+                                   histograms_folder=os.path.join(results, "histograms"), show_frame=False)
+        with open(os.path.join(results, "tracks", "meta.json"), encoding="utf-8") as f:
+            self.assertTrue(json.load(f)["stopped"])
+
+    def test_tiled_batched(self):
+        """タイル分割の検出をまとめて検出する処理（BATCH_SIZE > 1）で全フレームを処理できること"""
+        print("=== タイル分割とまとめて検出する処理のテスト ===")
+        results = os.path.join(self.tmp.name, "results")
+        calls = []
+
+        def fake_tiled(frame, model, tracker, classes=None, conf=0.5, with_conf=False, roi=None, imgsz=None,
+                       tile_size=640, overlap=0.2):
+            calls.append(frame.shape)
+            x = 5 * len(calls)
+            return [(1, [x, 5, x + 20, 25], 0.9)]
+
+        settings = {"WARM_UP": False, "DETECTION_CACHE": False, "REPLAY_FROM_CACHE": False, "TRACK_EXPORT": False,
+                    "FRAME_LOG": False, "SAVE_ANOMALIES": False, "SAVE_VIDEO": False, "PIPELINE": False,
+                    "BATCH_SIZE": 2, "SCHEDULE_DETECTOR": False, "TILED_INFERENCE": True,
+                    "FRAME_SOURCE_MODE": None, "TARGET_FPS": 30}
+        with mock.patch.multiple(main, **settings), mock.patch.object(main, "perform_yolo_tiled", fake_tiled), \
+                mock.patch.object(main, "create_tracker", lambda model=None: None):
+            summary = main.process_video(self.video, model=None, anomalies_folder=os.path.join(results, "anomalies"),
+                                         histograms_folder=os.path.join(results, "histograms"), show_frame=False,
+                                         histogram_workers=0)
+        self.assertEqual(summary["frames"], 10)
+        self.assertEqual(len(calls), 10)
+        self.assertEqual(summary["tracks"], 1)
+
+    def test_tracker_reset_per_video(self):
+        """同じモデルで続けて処理した動画も, それぞれ初期化したトラッカーから始めること"""
+        print("=== 動画ごとのトラッカーの初期化のテスト ===")
+        results = os.path.join(self.tmp.name, "results")
+        model = PersistentTrackModel()
+        settings = {"WARM_UP": False, "DETECTION_CACHE": False, "REPLAY_FROM_CACHE": False, "TRACK_EXPORT": False,
+                    "FRAME_LOG": False, "SAVE_ANOMALIES": False, "SAVE_VIDEO": False, "PIPELINE": False,
+                    "BATCH_SIZE": 1, "SCHEDULE_DETECTOR": False, "TILED_INFERENCE": False,
+                    "FRAME_SOURCE_MODE": None, "TARGET_FPS": 30}
+        first_ids = []
+        with mock.patch.multiple(main, **settings):
+            for _ in range(2):
+                model.ids.clear()
+                main.process_video(self.video, model, anomalies_folder=os.path.join(results, "anomalies"),
+                                   histograms_folder=os.path.join(results, "histograms"), show_frame=False,
+                                   histogram_workers=0)
+                first_ids.append(model.ids[0])
+                self.assertEqual(len(model.ids), 10)
+        self.assertEqual(first_ids, [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
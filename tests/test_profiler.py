@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src.profiler import StageProfiler, NULL_PROFILER, create_profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stages_per_frame(self):
+        """同じフレーム内の同じ段階は合計され, フレームごとに記録されること"""
+        print("=== 段階ごとの処理時間の記録のテスト ===")
+        profiler = StageProfiler(window=10)
+        for frame_number in range(1, 4):
+            profiler.start_frame(frame_number)
+            for _ in range(2):
+                with profiler.stage("anomaly"):
+                    time.sleep(0.002)
+            with profiler.stage("draw"):
+                pass
+            profiler.end_frame(track_count=frame_number)
+        self.assertEqual([row["frame"] for row in profiler.rows], [1, 2, 3])
+        self.assertEqual(profiler.rows[-1]["tracks"], 3)
+        self.assertGreaterEqual(profiler.rows[0]["anomaly"], 0.004)
+        self.assertEqual(profiler.stages, ["anomaly", "draw"])
+        stats = profiler.percentiles("anomaly")
+        self.assertLessEqual(stats["p50"], stats["p95"])
+        self.assertLessEqual(stats["p95"], stats["p99"])
+        self.assertGreaterEqual(stats["p50"], 4.0)  # ミリ秒
+
+    def test_other_thread_and_outside_frame(self):
+        """別スレッドの記録は集計だけに使い, フレームの外の記録は捨てること"""
+        print("=== 別スレッド・フレーム外の記録のテスト ===")
+        profiler = StageProfiler()
+        profiler.start_frame(1)
+        worker = threading.Thread(target=profiler.add, args=("inference", 0.01))
+        worker.start()
+        worker.join()
+        profiler.end_frame()
+        profiler.add("display", 1.0)    # 一時停止中など
+        self.assertNotIn("inference", profiler.rows[0])
+        self.assertEqual(profiler.summary()["inference"]["count"], 1)
+        self.assertIsNone(profiler.percentiles("display"))
+
+    def test_save(self):
+        """CSV と JSON に保存されること"""
+        print("=== 処理時間の保存のテスト ===")
+        profiler = StageProfiler()
+        profiler.start_frame(1)
+        with profiler.stage("inference"):
+            pass
+        profiler.end_frame(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.save(tmp)
+            with open(os.path.join(tmp, "profile.csv"), encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            with open(os.path.join(tmp, "profile.json"), encoding="utf-8") as f:
+                summary = json.load(f)
+        self.assertEqual(rows[0]["frame"], "1")
+        self.assertEqual(rows[0]["tracks"], "2")
+        self.assertIn("inference", summary["stages_ms"])
+        self.assertIn("p99", summary["stages_ms"]["total"])
+
+    def test_disabled(self):
+        """無効時は何も記録・保存しないこと"""
+        print("=== 無効時の処理時間計測のテスト ===")
+        profiler = create_profiler(False)
+        self.assertIs(profiler, NULL_PROFILER)
+        profiler.start_frame(1)
+        with profiler.stage("inference"):
+            pass
+        profiler.end_frame(1)
+        self.assertEqual(len(profiler.rows), 0)
+        self.assertEqual(profiler.overlay_lines(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.roi import make_roi
+from src.yolo_handler import perform_yolo
+
+
+class Tensor:
+    """boxes の各属性（.cpu().numpy() で配列を返す）の代わり"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class CropModel:
+    """受け取った画像と引数を記録し, 切り出した画像での座標で検出結果を返すモデル"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []
+
+    def track(self, frame, **kwargs):
+        self.calls.append((frame.shape, kwargs))
+        boxes = SimpleNamespace(id=Tensor(range(1, len(self.boxes) + 1)), xyxy=Tensor(self.boxes),
+                                conf=Tensor([0.9] * len(self.boxes)))
+        return [SimpleNamespace(boxes=boxes)]
+
+
+class TestRegionOfInterest(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+
+    def test_rectangle(self):
+        """矩形の ROI で切り出し, 座標をフレーム全体に戻せること"""
+        print("=== 矩形の ROI のテスト ===")
+        roi = make_roi((100, 400, 1100, 900))
+        cropped = roi.crop(self.frame)
+        self.assertEqual(cropped.shape, (500, 1000, 3))
+        np.testing.assert_allclose(roi.to_frame([[0, 0, 10, 20]]), [[100, 400, 110, 420]])
+        self.assertEqual(roi.contains([[150, 450, 200, 500], [0, 0, 50, 50]]).tolist(), [True, False])
+
+    def test_polygon(self):
+        """多角形の ROI は外側を黒にし, 中心が外にある検出を除くこと"""
+        print("=== 多角形の ROI のテスト ===")
+        roi = make_roi([(0, 1080), (960, 500), (1920, 1080)])   # 三角形
+        cropped = roi.crop(self.frame)
+        self.assertEqual(cropped.shape, (580, 1920, 3))
+        self.assertEqual(cropped[0, 0].tolist(), [0, 0, 0])           # 三角形の外
+        self.assertEqual(cropped[-1, 960].tolist(), [255, 255, 255])  # 三角形の内側
+        self.assertEqual(roi.contains([[900, 900, 1000, 1000], [0, 500, 100, 600]]).tolist(), [True, False])
+
+    def test_perform_yolo_with_roi(self):
+        """ROI と推論解像度を指定しても検出結果はフレーム全体の座標で返ること"""
+        print("=== ROI を指定した検出のテスト ===")
+        model = CropModel([[10, 10, 60, 40], [900, 0, 990, 30]])
+        roi = make_roi([(100, 400), (1100, 400), (1100, 900), (100, 900)])
+        detections = perform_yolo(self.frame, model, [2], with_conf=True, roi=roi, imgsz=640)
+        shape, kwargs = model.calls[0]
+        self.assertEqual(shape, (500, 1000, 3))
+        self.assertEqual(kwargs["imgsz"], 640)
+        self.assertEqual([t for t, _, _ in detections], [1, 2])
+        np.testing.assert_allclose(detections[0][1], [110, 410, 160, 440])
+        # ROI なし・解像度なしなら従来どおり
+        model = CropModel([[10, 10, 60, 40]])
+        self.assertEqual(perform_yolo(self.frame, model), [(1, [10.0, 10.0, 60.0, 40.0])])
+        self.assertNotIn("imgsz", model.calls[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
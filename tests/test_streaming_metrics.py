@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from src.streaming_metrics import StreamingMetric, HISTOGRAM_BINS
+
+
+def expected_stats(data):
+    """従来の generate_histogram と同じ計算"""
+    hist, bin_edges = np.histogram(data, bins=HISTOGRAM_BINS)
+    cdf = np.cumsum(hist) / sum(hist)
+    thresholds = {f"{int(p * 100)}%": bin_edges[np.searchsorted(cdf, p, side="left")]
+                  for p in [0.5, 0.4, 0.3, 0.2, 0.1]}
+    return {
+        "mean": np.mean(data),
+        "median": np.median(data),
+        "std_dev": np.std(data),
+        "threshold_top_10%": thresholds,
+        "histogram": {f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}": int(hist[i]) for i in range(len(hist))},
+        "cdf": cdf.tolist()
+    }
+
+
+class TestStreamingMetric(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = np.r_[rng.beta(8, 1, 3000), [0.0, 0.29, 1.0, 1.0]]
+
+    def test_stats_match_lists(self):
+        """保存する統計情報が値のリストから計算したものと同じになること"""
+        print("=== 逐次集計の統計情報のテスト ===")
+        metric = StreamingMetric.from_values(self.data)
+        self.assertEqual(metric.stats(), expected_stats(self.data))
+        self.assertEqual(len(metric), len(self.data))
+
+    def test_running_moments_and_sketch(self):
+        """値を保持しなくなっても平均・分散・分位点が求められること"""
+        print("=== 逐次集計の平均・分散・分位点のテスト ===")
+        metric = StreamingMetric.from_values(self.data, exact_limit=100)
+        self.assertIsNone(metric.values)
+        self.assertAlmostEqual(metric.mean, np.mean(self.data))
+        self.assertAlmostEqual(metric.std_dev, np.std(self.data))
+        for q in (0.1, 0.5, 0.9):
+            self.assertAlmostEqual(metric.quantile(q), np.quantile(self.data, q), delta=2e-3)
+        # ヒストグラム由来の値は保持の有無によらず同じ
+        stats = metric.stats()
+        expected = expected_stats(self.data)
+        self.assertEqual(stats["histogram"], expected["histogram"])
+        self.assertEqual(stats["threshold_top_10%"], expected["threshold_top_10%"])
+
+    def test_query_during_run(self):
+        """集計途中でも CDF と閾値が取り出せること"""
+        print("=== 集計途中の CDF と閾値のテスト ===")
+        metric = StreamingMetric()
+        for i, value in enumerate(self.data, 1):
+            metric.append(value)
+            if i == 1000:
+                np.testing.assert_allclose(metric.cdf(), expected_stats(self.data[:1000])["cdf"])
+                self.assertEqual(metric.thresholds(), expected_stats(self.data[:1000])["threshold_top_10%"])
+
+    def test_merge(self):
+        """2つの集計を足し込むと全体を1つで集計したものと同じになること"""
+        print("=== 逐次集計の結合のテスト ===")
+        first = StreamingMetric.from_values(self.data[:1000], exact_limit=500)
+        second = StreamingMetric.from_values(self.data[1000:])
+        merged = first.merge(second)
+        whole = StreamingMetric.from_values(self.data, exact_limit=500)
+        self.assertEqual(len(merged), len(whole))
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.variance, whole.variance)
+        self.assertEqual(merged.stats()["histogram"], whole.stats()["histogram"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.yolo_handler import make_tiles, nms, detect_tiled
+
+
+class TileModel:
+    """各タイルについて, タイル内に含まれる（切れたものも含む）フレーム座標のボックスをタイル座標で返すモデル"""
+
+    def __init__(self, frame_boxes, tile_origins):
+        self.frame_boxes = np.asarray(frame_boxes, dtype=np.float32)
+        self.tile_origins = tile_origins
+        self.calls = []
+
+    def predict(self, images, **kwargs):
+        self.calls.append((len(images), kwargs))
+        results = []
+        for image, (x, y) in zip(images, self.tile_origins):
+            height, width = image.shape[:2]
+            local = self.frame_boxes - np.array([x, y, x, y], dtype=np.float32)
+            local[:, [0, 2]] = local[:, [0, 2]].clip(0, width)
+            local[:, [1, 3]] = local[:, [1, 3]].clip(0, height)
+            visible = (local[:, 2] - local[:, 0] > 1) & (local[:, 3] - local[:, 1] > 1)
+            xyxy = local[visible]
+            boxes = SimpleNamespace(xyxy=xyxy, conf=np.linspace(0.9, 0.8, len(xyxy), dtype=np.float32),
+                                    cls=np.full(len(xyxy), 2, dtype=np.float32))
+            results.append(SimpleNamespace(boxes=_Boxes(boxes)))
+        return results
+
+
+class _Boxes:
+    """result.boxes の代わり（.cpu().numpy() で自身を返す）"""
+
+    def __init__(self, boxes):
+        self._boxes = boxes
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+    def __len__(self):
+        return len(self._boxes.xyxy)
+
+    def __getattr__(self, name):
+        return getattr(self._boxes, name)
+
+
+class TestTiledInference(unittest.TestCase):
+    def test_make_tiles(self):
+        """タイルがフレーム全体を覆い, 端のタイルはフレーム内に収まること"""
+        print("=== タイル分割のテスト ===")
+        tiles = make_tiles(1920, 1080, tile_size=640, overlap=0.2)
+        self.assertEqual(len(tiles), 4 * 2)
+        self.assertEqual(tiles[0], (0, 0, 640, 640))
+        self.assertEqual(tiles[-1], (1280, 440, 1920, 1080))
+        self.assertTrue(all(x2 - x1 == 640 and y2 - y1 == 640 for x1, y1, x2, y2 in tiles))
+        self.assertEqual(make_tiles(320, 240, tile_size=640), [(0, 0, 320, 240)])
+
+    def test_nms(self):
+        """重なったボックスはスコアの高い方だけ残し, 別クラスは残すこと"""
+        print("=== NMS のテスト ===")
+        bboxes = [[0, 0, 100, 100], [5, 5, 105, 105], [200, 200, 250, 250], [0, 0, 100, 100]]
+        scores = [0.8, 0.9, 0.7, 0.6]
+        self.assertEqual(nms(bboxes, scores, 0.5).tolist(), [1, 2])
+        self.assertEqual(nms(bboxes, scores, 0.5, classes=[2, 2, 2, 7]).tolist(), [1, 2, 3])
+        # タイルの境界で切れたボックスは IoU では残るが IoS では除かれる
+        cut = [[0, 0, 100, 100], [60, 0, 100, 100]]
+        self.assertEqual(nms(cut, [0.9, 0.8], 0.6, metric="iou").tolist(), [0, 1])
+        self.assertEqual(nms(cut, [0.9, 0.8], 0.6, metric="ios").tolist(), [0])
+        self.assertEqual(nms(np.empty((0, 4)), []).tolist(), [])
+        # IoU が既定で, 小さい方のボックスが切れている組だけ IoS で比べる
+        self.assertEqual(nms(cut, [0.9, 0.8], 0.6).tolist(), [0, 1])
+        self.assertEqual(nms(cut, [0.9, 0.8], 0.6, truncated=np.array([False, True])).tolist(), [0])
+        self.assertEqual(nms(cut, [0.9, 0.8], 0.6, truncated=np.array([True, False])).tolist(), [0, 1])
+
+    def test_detect_tiled(self):
+        """タイルを1回のバッチで推論し, 境界で重複したボックスをフレーム座標の1つにまとめること"""
+        print("=== タイル分割の検出のテスト ===")
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        tiles = make_tiles(1920, 1080, 640, 0.2)
+        origins = [(x1, y1) for x1, y1, _, _ in tiles]
+        frame_boxes = [[500, 100, 560, 140],     # 2つのタイルの重なりの中
+                       [1000, 700, 1040, 730]]   # 下段のタイルだけ
+        model = TileModel(frame_boxes, origins)
+        bboxes, scores, labels = detect_tiled(frame, model, classes=[2], conf=0.3, full_frame=False, imgsz=640)
+        self.assertEqual(model.calls[0][0], len(tiles))     # 1回の呼び出しで全タイル
+        self.assertEqual(model.calls[0][1]["imgsz"], 640)
+        self.assertEqual(len(bboxes), 2)
+        order = np.argsort(bboxes[:, 0])
+        np.testing.assert_allclose(bboxes[order], frame_boxes)
+        self.assertTrue((labels == 2).all())
+
+    def test_detect_tiled_keeps_occluded(self):
+        """大きいボックスの中にある小さいボックス（重なった車両）は残し, タイルの境界で切れたボックスだけをまとめること"""
+        print("=== タイル分割の検出で重なった車両を残すテスト ===")
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        tiles = make_tiles(1920, 1080, 640, 0.2)
+        origins = [(x1, y1) for x1, y1, _, _ in tiles] + [(0, 0)]
+        frame_boxes = [[100, 100, 300, 250],     # 手前の車両
+                       [180, 150, 260, 220],     # その中に見える奥の車両（同じクラス）
+                       [600, 300, 700, 360]]     # タイルの境界（x=640）で切れる車両
+        model = TileModel(frame_boxes, origins)
+        bboxes, _, _ = detect_tiled(frame, model, classes=[2], conf=0.3)
+        self.assertEqual(model.calls[0][0], len(tiles) + 1)     # タイル + フレーム全体
+        order = np.argsort(bboxes[:, 0] * 10000 + bboxes[:, 1])
+        np.testing.assert_allclose(bboxes[order], frame_boxes)
+        ios, _, _ = detect_tiled(frame, model, classes=[2], conf=0.3, nms_metric="ios")
+        self.assertEqual(len(ios), 2)   # すべて IoS で比べると奥の車両が除かれる
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.track_export import TrackExportWriter, TrackExport, SOURCE_DETECTION, SOURCE_PREDICTION
+from src.tracking import new_tracking_state, track_frame
+
+
+def moving_box(track_id, frame_number):
+    x, y = 10 * frame_number, 50 * track_id
+    return [x, y, x + 40, y + 30]
+
+
+class TestTrackExport(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "tracks")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def run_video(self, writer, video, num_frames, missing=()):
+        """トラック 1, 2 を追跡し, missing のフレームではトラック 1 を未検出・12 フレーム目は異常値にする"""
+        writer.begin_video(video)
+        state = new_tracking_state({"prediction_method": "linear", "verbose": False})
+        state["track_export"] = writer
+        for frame_number in range(1, num_frames + 1):
+            detections = [(2, moving_box(2, frame_number))]
+            if frame_number == 12:
+                detections.append((1, [500, 500, 900, 520]))
+            elif frame_number not in missing:
+                detections.append((1, moving_box(1, frame_number)))
+            track_frame(frame_number, detections, state)
+        return state
+
+    def test_round_trip(self):
+        """履歴に追加したボックスと同じ行を書き出し, トラック・フレーム範囲で読み出せること"""
+        print("=== 追跡結果の保存と読み込みのテスト ===")
+        writer = TrackExportWriter(self.path, chunk_rows=7)
+        state = self.run_video(writer, "a.mp4", 15, missing=(14,))
+        self.run_video(writer, "b.mp4", 5)
+        rows = writer.close(frames=15)
+
+        export = TrackExport(self.path)
+        self.assertEqual(len(export), rows)
+        self.assertEqual(export.videos, ["a.mp4", "b.mp4"])
+        self.assertIsInstance(export["xyxy"], np.memmap)
+
+        track = export.select(export.track(1, "a.mp4"))
+        self.assertEqual(len(track["frame"]), state["tracked_data"][1].total)
+        self.assertEqual(track["frame"].tolist(), list(range(1, 16)))
+        np.testing.assert_allclose(track["xyxy"][-6:], state["tracked_data"][1][-6:])
+        # 12 フレーム目は異常で予測値に置き換え, 14 フレーム目は未検出で予測値
+        self.assertEqual(track["is_anomaly"].nonzero()[0].tolist(), [11])
+        self.assertEqual((track["source"] == SOURCE_PREDICTION).nonzero()[0].tolist(), [11, 13])
+        self.assertTrue(np.isnan(track["iou"][:4]).all())       # 予測に必要な履歴がないフレームは未計算
+        self.assertTrue((track["iou"][4:11] > 0.9).all())
+        self.assertLess(track["iou"][11], 0.5)
+        self.assertEqual(len(export.track(1)), 15 + 5)           # 全動画
+
+        rows = export.frame_range(3, 5, video=1)
+        self.assertEqual(export["frame"][rows].tolist(), [3, 3, 4, 4])
+        self.assertTrue((export["video"][rows] == 1).all())
+        self.assertTrue((export["source"][rows] == SOURCE_DETECTION).all())
+        self.assertEqual(len(export.frame_range(1, 100)), len(export))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from src.track_lifecycle import TrackLifecycle
+from src.tracking import new_tracking_state, track_frame, bridge_frame
+
+
+class TestTrackLifecycle(unittest.TestCase):
+    def test_matches_missed_counter(self):
+        """全トラックの未検出カウントを毎フレーム進める従来の方法と同じフレームで削除すること"""
+        print("=== トラックの削除タイミングのテスト ===")
+        rng = random.Random(0)
+        max_missed = 4.5
+        lifecycle = TrackLifecycle(max_missed)
+        missed = {}
+        for _ in range(300):
+            detected = {t for t in range(20) if rng.random() < 0.3}
+            # 従来の方法
+            expected = []
+            for track_id in list(missed):
+                if track_id in detected:
+                    continue
+                missed[track_id] += 1
+                if missed[track_id] > max_missed:
+                    del missed[track_id]
+                    expected.append(track_id)
+            missed.update(dict.fromkeys(detected, 0))
+            self.assertEqual(sorted(lifecycle.update(detected)), sorted(expected))
+            self.assertEqual(lifecycle.active, set(missed))
+            for track_id, count in missed.items():
+                self.assertEqual(lifecycle.missed(track_id), count)
+
+    def test_track_frame_expiry(self):
+        """未検出が max_missed_frame を超えたトラックを履歴から削除し, 予測もしないこと"""
+        print("=== 追跡処理でのトラック削除のテスト ===")
+        state = new_tracking_state({"prediction_method": "linear", "max_missed_frame": 3, "verbose": False})
+        for frame_number in range(1, 6):
+            track_frame(frame_number, [(1, [0, 0, 10, 10]), (2, [50, 50, 60, 60])], state)
+        bridge_frame(6, state)     # 予測でつないだフレームは未検出に数えない
+        for frame_number in range(7, 11):
+            _, predictions = track_frame(frame_number, [(1, [0, 0, 10, 10])], state)
+            self.assertEqual(2 in state["tracked_data"], frame_number < 10)
+        self.assertNotIn(2, predictions)
+        self.assertEqual(state["lifecycle"].active, {1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from src.track_store import TrackStore
+from src.yolo_handler import update_tracked_data
+from src.prediction import predict_bbox_linear, predict_bbox_quadratic
+import src.anomaly_handler as anomaly
+
+
+class TestTrackStore(unittest.TestCase):
+    def test_ring_buffer_keeps_latest(self):
+        """容量を超えたら古い履歴から捨てられること"""
+        print("=== TrackStore リングバッファのテスト ===")
+        store = TrackStore(capacity=4)
+        for i in range(10):
+            store.append(1, [i, i, i + 10, i + 10])
+        self.assertEqual(len(store[1]), 4)
+        self.assertEqual(store[1].total, 10)
+        self.assertEqual(store[1][-1], [9, 9, 19, 19])
+        np.testing.assert_array_equal(store[1][-3:][:, 0], [7, 8, 9])
+
+    def test_last_is_zero_copy_view(self):
+        """直近N件の取得がコピーではなくビューであること"""
+        print("=== TrackStore ゼロコピーのテスト ===")
+        store = TrackStore(capacity=5)
+        for i in range(7):
+            store.append(1, [i, i, i, i])
+        window = store.last(1, 3)
+        self.assertFalse(window.flags.owndata)
+        self.assertTrue(np.shares_memory(window, store._buffer))
+
+    def test_slot_reuse_and_flat_memory(self):
+        """削除したトラックのスロットが再利用され、メモリが増えないこと"""
+        print("=== TrackStore スロット再利用のテスト ===")
+        store = TrackStore(capacity=10, max_tracks=4)
+        nbytes = store.nbytes()
+        for track_id in range(1000):
+            for i in range(50):
+                store.append(track_id, [i, i, i, i])
+            if track_id >= 3:
+                del store[track_id - 3]
+        self.assertEqual(store.nbytes(), nbytes)
+        self.assertEqual(len(store), 3)
+
+    def test_compatible_with_existing_functions(self):
+        """dict と同じように既存の関数から使えること"""
+        print("=== TrackStore 既存関数との互換性のテスト ===")
+        store = TrackStore(capacity=10)
+        update_tracked_data(store, [(1, [5, 5, 45, 45]), (2, [15, 15, 55, 55])])
+        anomaly.handle_replace({1: [10, 10, 50, 50]}, {1: [11, 11, 51, 51], 3: [30, 30, 70, 70]},
+                               {1: True}, store)
+        self.assertEqual(store[1].view().tolist(), [[5, 5, 45, 45], [11, 11, 51, 51]])
+        self.assertEqual(store[3].view().tolist(), [[30, 30, 70, 70]])
+
+        for i in range(10):
+            update_tracked_data(store, [(4, [5 * i, 5 * i, 5 * i + 40, 5 * i + 40])])
+        as_dict = {4: store[4].view().tolist()}
+        np.testing.assert_allclose(predict_bbox_linear(store, 4), predict_bbox_linear(as_dict, 4))
+        np.testing.assert_allclose(predict_bbox_quadratic(store, 4), predict_bbox_quadratic(as_dict, 4), atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
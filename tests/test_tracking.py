@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from src.tracking import new_tracking_state, track_frame
+
+
+def moving_box(track_id, frame_number):
+    """トラックごとに位置の違う, 右へ等速で動くボックス"""
+    x, y = 10 * frame_number, 50 * track_id
+    return [x, y, x + 40, y + 30]
+
+
+class TestTrackFrame(unittest.TestCase):
+    def test_history_length_equals_frames(self):
+        """1フレームにつき1トラック1つだけ履歴に追加すること（重複追加の回帰テスト）"""
+        print("=== 履歴の長さとフレーム数のテスト ===")
+        for method in ("linear", "quadratic_weight", "kalman"):
+            state = new_tracking_state({"prediction_method": method, "track_history_size": 100, "verbose": False})
+            num_tracks, num_frames = 100, 20
+            for frame_number in range(1, num_frames + 1):
+                track_frame(frame_number, [(t, moving_box(t, frame_number)) for t in range(num_tracks)], state)
+            self.assertEqual(len(state["tracked_data"]), num_tracks)
+            for track_id, history in state["tracked_data"].items():
+                self.assertEqual(history.total, num_frames, method)
+            self.assertEqual(state["anomaly_count"], 0, method)
+
+    def test_prior_prediction(self):
+        """予測は現フレームの検出値を追加する前の履歴から行うこと"""
+        print("=== 事前予測のテスト ===")
+        state = new_tracking_state({"prediction_method": "linear", "verbose": False})
+        for frame_number in range(1, 12):
+            _, predictions = track_frame(frame_number, [(1, moving_box(1, frame_number))], state)
+        np.testing.assert_allclose(predictions[1], moving_box(1, 11), atol=1e-3)
+
+    def test_replace_and_fill(self):
+        """異常な検出値は予測値に置き換え, 未検出のフレームは予測値で埋めること"""
+        print("=== 置き換えと未検出フレームの補間のテスト ===")
+        state = new_tracking_state({"prediction_method": "linear", "verbose": False})
+        for frame_number in range(1, 12):
+            track_frame(frame_number, [(1, moving_box(1, frame_number))], state)
+        # 大きさも位置も大きく外れた検出値
+        track_frame(12, [(1, [500, 500, 900, 520])], state)
+        self.assertEqual(state["anomaly_count"], 1)
+        np.testing.assert_allclose(state["tracked_data"][1][-1], moving_box(1, 12), atol=1e-3)
+        track_frame(13, [], state)
+        np.testing.assert_allclose(state["tracked_data"][1][-1], moving_box(1, 13), atol=1e-3)
+        self.assertEqual(state["tracked_data"][1].total, 13)
+
+
+if __name__ == '__main__':
+    unittest.main()
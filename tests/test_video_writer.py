@@ -0,0 +1,59 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from src.video_writer import AsyncVideoWriter
+
+
+class TestAsyncVideoWriter(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_write(self):
+        """キューに渡したフレームをすべて書き込み, 大きさの違うフレームはリサイズすること"""
+        print("=== 動画の書き込みのテスト ===")
+        path = os.path.join(self.folder.name, "out", "tracked.avi")
+        writer = AsyncVideoWriter(path, fps=10, queue_size=4)
+        self.assertEqual(writer.codec, "XVID")
+        for i in range(20):
+            size = (120, 160, 3) if i % 5 == 4 else (240, 320, 3)
+            self.assertTrue(writer.write(np.full(size, i * 10, dtype=np.uint8)))
+        stats = writer.close()
+        self.assertEqual((stats["queued"], stats["written"], stats["dropped"], stats["pending"]), (20, 20, 0, 0))
+        self.assertFalse(writer.write(np.zeros((240, 320, 3), dtype=np.uint8)))    # close 後は追加しない
+        cap = cv2.VideoCapture(path)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 20)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 320)
+        self.assertAlmostEqual(cap.get(cv2.CAP_PROP_FPS), 10)
+        cap.release()
+
+    def test_drop_oldest(self):
+        """エンコードが追いつかないとき "drop_oldest" は古いフレームを捨てて待たないこと"""
+        print("=== 動画の書き込みキューの破棄のテスト ===")
+        writer = AsyncVideoWriter(os.path.join(self.folder.name, "drop.mp4"), fps=10, queue_size=2,
+                                  policy="drop_oldest")
+        release = threading.Event()
+        original_open = writer._open
+
+        def slow_open(frame):     # 最初のフレームのエンコードを止めておく
+            release.wait()
+            original_open(frame)
+        writer._open = slow_open
+        for i in range(10):
+            writer.write(np.zeros((64, 64, 3), dtype=np.uint8))
+        release.set()
+        stats = writer.close()
+        self.assertEqual(stats["queued"], 10)
+        self.assertEqual(stats["written"] + stats["dropped"], 10)
+        self.assertGreaterEqual(stats["dropped"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from src.viewer import FrameViewer
+
+
+class FakeViewer(FrameViewer):
+    """ウィンドウを使わず, 表示したフレームを記録し, keys に入れたキーを押したことにするビューアー"""
+
+    def __init__(self, max_fps):
+        self.shown = []
+        self.keys = queue.Queue()
+        self.gui_threads = set()    # 表示・キー入力・ウィンドウを閉じる処理を呼んだスレッド
+        self.destroyed = False
+        super().__init__(max_fps)
+
+    def _show(self, frame):
+        self.gui_threads.add(threading.current_thread())
+        self.shown.append(int(frame[0, 0, 0]))
+
+    def _poll_key(self):
+        self.gui_threads.add(threading.current_thread())
+        try:
+            return self.keys.get_nowait()
+        except queue.Empty:
+            return 0xFF
+
+    def _destroy(self):
+        self.gui_threads.add(threading.current_thread())
+        self.destroyed = True
+
+
+class TestFrameViewer(unittest.TestCase):
+    def test_latest_frame_only(self):
+        """表示が追いつかないフレームは描画せず, 一番新しいフレームを表示すること"""
+        print("=== 最新フレームだけを表示するテスト ===")
+        viewer = FakeViewer(max_fps=20)
+        rendered = []
+
+        def render(frame):
+            rendered.append(int(frame[0, 0, 0]))
+            return frame
+
+        def work():
+            for i in range(200):
+                viewer.submit(i, np.full((4, 4, 3), i % 256, dtype=np.uint8), render)
+                time.sleep(0.001)
+            time.sleep(0.2)
+            return "done"
+        self.assertEqual(viewer.run(work), "done")
+        stats = viewer.stats()
+        self.assertEqual(stats["submitted"], 200)
+        self.assertLess(stats["rendered"], 100)
+        self.assertEqual(rendered, viewer.shown)
+        self.assertEqual(viewer.shown[-1], 199)
+
+    def test_gui_on_calling_thread(self):
+        """表示・キー入力・ウィンドウを閉じる処理は run() を呼んだスレッドで行い, 処理は別スレッドで行うこと"""
+        print("=== 表示をメインスレッドで行うテスト ===")
+        viewer = FakeViewer(max_fps=100)
+        work_threads = []
+
+        def work():
+            work_threads.append(threading.current_thread())
+            viewer.submit(1, np.zeros((4, 4, 3), dtype=np.uint8))
+            time.sleep(0.1)
+        viewer.run(work)
+        self.assertEqual(viewer.gui_threads, {threading.current_thread()})
+        self.assertNotEqual(work_threads, [threading.current_thread()])
+        self.assertTrue(viewer.destroyed)
+
+    def test_work_error(self):
+        """処理スレッドの例外を run() が送出し, ウィンドウを閉じること"""
+        print("=== 処理スレッドの例外のテスト ===")
+        viewer = FakeViewer(max_fps=100)
+
+        def work():
+            viewer.submit(1, np.zeros((4, 4, 3), dtype=np.uint8))
+            time.sleep(0.05)
+            raise RuntimeError("failed")
+        with self.assertRaises(RuntimeError):
+            viewer.run(work)
+        self.assertTrue(viewer.destroyed)
+
+    def test_pause_and_quit(self):
+        """スペースで一時停止して処理側を待たせ, 'q' で終了すること"""
+        print("=== ビューアーの一時停止と終了のテスト ===")
+        viewer = FakeViewer(max_fps=100)
+
+        def work():
+            viewer.submit(1, np.zeros((4, 4, 3), dtype=np.uint8))
+            viewer.keys.put(ord(' '))
+            time.sleep(0.1)
+            paused = viewer.paused
+            threading.Timer(0.1, viewer.keys.put, (ord(' '),)).start()
+            start = time.perf_counter()
+            resumed = viewer.wait_if_paused()   # 一時停止中は再開されるまで待つ
+            waited = time.perf_counter() - start
+            viewer.keys.put(ord('q'))
+            time.sleep(0.1)
+            return paused, resumed, waited, viewer.wait_if_paused()
+        paused, resumed, waited, stopped = viewer.run(work)
+        self.assertTrue(paused)
+        self.assertFalse(resumed)
+        self.assertGreater(waited, 0.05)
+        self.assertTrue(stopped)
+
+
+if __name__ == '__main__':
+    unittest.main()
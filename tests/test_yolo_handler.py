@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import unittest
+
+from src.roi import make_roi
+from src.yolo_handler import warm_up_model, make_tiles
+
+
+class CountingModel:
+    """predict の呼び出しを記録するだけのモデル"""
+
+    def __init__(self):
+        self.shapes = []
+        self.options = []
+
+    def predict(self, frame, conf=0.5, classes=None, verbose=False, **options):
+        self.shapes.append([image.shape for image in frame] if isinstance(frame, list) else frame.shape)
+        self.options.append(options)
+        return []
+
+
+class TestYoloHandler(unittest.TestCase):
+    def test_import_without_model(self):
+        """main を読み込んだだけではモデルも ultralytics も読み込まないこと"""
+        print("=== モデルの遅延読み込みのテスト ===")
+        code = "import sys, src.main; print('ultralytics' in sys.modules, hasattr(src.main, 'YOLO_MODEL'))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip().splitlines()[-1], "False False")
+
+    def test_warm_up_once(self):
+        """ウォームアップは動画の解像度で1回だけ行うこと"""
+        print("=== モデルのウォームアップのテスト ===")
+        model = CountingModel()
+        warm_up_model(model, 640, 360)
+        self.assertEqual(warm_up_model(model, 640.0, 360.0), 0.0)
+        warm_up_model(model, 1920, 1080)
+        self.assertEqual(model.shapes, [(360, 640, 3), (1080, 1920, 3)])
+
+    def test_warm_up_matches_inference(self):
+        """ウォームアップは ROI で切り出した大きさ・imgsz・タイルのバッチ・フレーム数で推論すること"""
+        print("=== 検出と同じ入力でのウォームアップのテスト ===")
+        model = CountingModel()
+        warm_up_model(model, 1920, 1080, roi=make_roi((100, 200, 740, 680)), imgsz=320)
+        self.assertEqual(model.shapes[-1], (480, 640, 3))
+        self.assertEqual(model.options[-1], {"imgsz": 320})
+        self.assertEqual(warm_up_model(model, 1920, 1080, roi=make_roi((100, 200, 740, 680)), imgsz=320), 0.0)
+
+        warm_up_model(model, 1920, 1080, tile_size=640, overlap=0.2)
+        tiles = make_tiles(1920, 1080, 640, 0.2) + [(0, 0, 1920, 1080)]     # タイル + フレーム全体
+        self.assertEqual(model.shapes[-1], [(y2 - y1, x2 - x1, 3) for x1, y1, x2, y2 in tiles])
+
+        warm_up_model(model, 1920, 1080, batch_size=4)
+        self.assertEqual(model.shapes[-1], [(1080, 1920, 3)] * 4)
+        self.assertEqual(len(model.shapes), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()